@@ -0,0 +1 @@
+"""Developer benchmarks for the evaluation harness itself (not model benchmarks)."""
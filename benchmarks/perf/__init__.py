@@ -0,0 +1,8 @@
+"""
+Runner throughput benchmarks.
+
+Drives EvaluationRunner against a simulated backend and reports items/sec,
+event-loop lag, peak RSS and per-stage timings. Run with:
+
+    python -m benchmarks.perf --help
+"""
@@ -0,0 +1,128 @@
+"""
+Sweep runner throughput benchmarks and compare against a saved baseline.
+
+Every configuration runs in a fresh subprocess so peak RSS and the stage
+timer patches are isolated.
+
+Examples:
+    # Default sweep, print a table
+    python -m benchmarks.perf
+
+    # Custom sweep, save the results as a baseline
+    python -m benchmarks.perf --sizes 1000 100000 --parallel 50 500 \\
+        --save-baseline benchmarks/perf/baselines/laptop.json
+
+    # Fail (exit 1) if any configuration got more than 15% slower
+    python -m benchmarks.perf --baseline benchmarks/perf/baselines/laptop.json --tolerance 0.15
+"""
+
+import argparse
+import itertools
+import json
+import os
+import subprocess
+import sys
+from dataclasses import asdict
+from typing import Any, Dict, List
+
+from .harness import PerfConfig, run_config
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def run_isolated(config: PerfConfig) -> Dict[str, Any]:
+    """Run one configuration in a subprocess and return its measurements."""
+    proc = subprocess.run(
+        [sys.executable, "-m", "benchmarks.perf", "--single", json.dumps(asdict(config))],
+        cwd=REPO_ROOT, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, check=True)
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def print_table(results: List[Dict[str, Any]]):
+    """Print one row per configuration."""
+    stages = sorted({stage for r in results for stage in r["stage_us_per_item"]})
+    header = (f"{'configuration':<44} {'items/s':>9} {'cpu us/it':>9} {'rss MB':>7} "
+              f"{'lag p99':>8} " + " ".join(f"{s:>16}" for s in stages))
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(f"{r['key']:<44} {r['items_per_s']:>9.0f} {r['cpu_us_per_item']:>9.1f} "
+              f"{r['peak_rss_mb']:>7.1f} {r['loop_lag_ms']['p99']:>6.1f}ms "
+              + " ".join(f"{r['stage_us_per_item'].get(s, 0.0):>14.1f}us" for s in stages))
+
+
+def compare(results: List[Dict[str, Any]], baseline_path: str, tolerance: float) -> bool:
+    """
+    Compare items/sec against a baseline file; return True if nothing regressed.
+
+    A configuration regresses when its throughput drops by more than
+    `tolerance` (a fraction) relative to the baseline entry with the same key.
+    """
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {r["key"]: r for r in json.load(f)["results"]}
+
+    ok = True
+    for r in results:
+        base = baseline.get(r["key"])
+        if base is None:
+            print(f"{r['key']}: no baseline entry")
+            continue
+        change = r["items_per_s"] / base["items_per_s"] - 1
+        status = "REGRESSION" if change < -tolerance else "ok"
+        ok &= status == "ok"
+        print(f"{r['key']}: {base['items_per_s']:.0f} -> {r['items_per_s']:.0f} items/s "
+              f"({change:+.1%}) {status}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Runner throughput benchmark suite")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000],
+                        help="Dataset sizes to sweep")
+    parser.add_argument("--parallel", type=int, nargs="+", default=[10, 100],
+                        help="max_parallel values to sweep")
+    parser.add_argument("--response-chars", type=int, nargs="+", default=[200, 5000],
+                        help="Response sizes (characters of free text) to sweep")
+    parser.add_argument("--modes", choices=["stream", "run"], nargs="+", default=["stream"],
+                        help="Runner entry points to benchmark")
+    parser.add_argument("--latency", type=float, default=0.01,
+                        help="Mean simulated backend latency in seconds")
+    parser.add_argument("--output", metavar="PATH",
+                        help="Write all measurements as JSON")
+    parser.add_argument("--save-baseline", metavar="PATH",
+                        help="Save measurements as a baseline for later comparison")
+    parser.add_argument("--baseline", metavar="PATH",
+                        help="Compare items/sec against a saved baseline; exit 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Allowed fractional throughput drop before flagging a regression")
+    parser.add_argument("--single", metavar="JSON", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        print(json.dumps(run_config(PerfConfig(**json.loads(args.single)))))
+        return 0
+
+    results = []
+    for mode, n, p, r in itertools.product(args.modes, args.sizes, args.parallel,
+                                            args.response_chars):
+        config = PerfConfig(n_items=n, max_parallel=p, response_chars=r,
+                            latency_mean=args.latency, mode=mode)
+        print(f"running {config.key()}...", file=sys.stderr)
+        results.append(run_isolated(config))
+
+    print_table(results)
+
+    report = {"python": sys.version.split()[0], "platform": sys.platform, "results": results}
+    for path in filter(None, [args.output, args.save_baseline]):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+            f.write('\n')
+
+    if args.baseline and not compare(results, args.baseline, args.tolerance):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,223 @@
+"""
+Measurement harness for a single runner benchmark configuration.
+
+run_config() drives EvaluationRunner over a synthetic benchmark whose
+responses come from a simulated backend, and measures:
+- items/sec over the whole run
+- event-loop lag: how late a 10 ms ticker wakes up while the run is busy
+- peak RSS of the process
+- per-stage time: prompt formatting, response validation, evaluation,
+  to_dict() serialization and checkpoint writes (JSON encoding + I/O)
+
+Stage timers wrap the relevant methods, so a configuration should run in a
+fresh process (see __main__.py) to keep the patches and RSS isolated.
+"""
+
+import asyncio
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, Iterator, Optional, Tuple, Type
+
+from pydantic import BaseModel
+
+from src.benchmark import Benchmark
+from src.checkpoint import CheckpointLog
+from src.offline import LatencyModel, MockClient
+from src.runner import EvaluationItem, EvaluationRunner
+from src.telemetry import CallUsage, LatencyHistogram
+
+
+@dataclass
+class PerfConfig:
+    """One point of the benchmark sweep."""
+    n_items: int = 10000
+    max_parallel: int = 100
+    response_chars: int = 200          # Size of the free-text field of each response
+    latency_mean: float = 0.01         # Simulated backend latency (seconds)
+    latency_distribution: str = "exponential"
+    mode: str = "stream"               # 'stream' (stream_benchmark) or 'run' (run_benchmark)
+    seed: int = 0
+
+    def key(self) -> str:
+        """Stable identifier used to match results against a baseline."""
+        return (f"{self.mode}/n={self.n_items}/p={self.max_parallel}/"
+                f"r={self.response_chars}/lat={self.latency_mean}")
+
+
+class StageTimer:
+    """Accumulates wall time per named stage."""
+
+    def __init__(self):
+        self.seconds: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+
+    def add(self, stage: str, elapsed: float):
+        self.seconds[stage] = self.seconds.get(stage, 0.0) + elapsed
+        self.counts[stage] = self.counts.get(stage, 0) + 1
+
+    def wrap(self, stage: str, fn):
+        """Return a synchronous function that times every call of `fn`."""
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.add(stage, time.perf_counter() - start)
+        return timed
+
+
+class PerfResponse(BaseModel):
+    """Response schema with a letter answer and a variable-size text field."""
+    answer: str
+    reasoning: str
+
+
+class PerfBenchmark(Benchmark[PerfResponse, bool]):
+    """Synthetic MCQ-like benchmark generating examples in memory."""
+
+    def __init__(self, n_items: int, timer: StageTimer, seed: int = 0):
+        self.n_items = n_items
+        self.timer = timer
+        self.seed = seed
+
+    def load_dataset(self, path: str) -> Iterator[Dict[str, Any]]:
+        rng = random.Random(self.seed)
+        for i in range(self.n_items):
+            yield {
+                "id": f"perf-{i}",
+                "question": f"Synthetic question {i}: which option is correct?",
+                "options": [f"option {j} for {i}" for j in range(4)],
+                "answer_idx": rng.randrange(4),
+            }
+
+    def format_prompt(self, example: Dict[str, Any]) -> str:
+        start = time.perf_counter()
+        options = "\n".join(f"{'ABCD'[j]}. {o}" for j, o in enumerate(example["options"]))
+        prompt = f"Answer with one letter.\n\nQuestion:\n{example['question']}\n\nOptions:\n{options}"
+        self.timer.add("format_prompt", time.perf_counter() - start)
+        return prompt
+
+    def response_schema(self) -> Type[PerfResponse]:
+        return PerfResponse
+
+    async def evaluate(self, response: PerfResponse, example: Dict[str, Any]) -> bool:
+        start = time.perf_counter()
+        correct = "ABCD".index(response.answer) == example["answer_idx"]
+        self.timer.add("evaluate", time.perf_counter() - start)
+        return correct
+
+    @property
+    def name(self) -> str:
+        return "perf"
+
+
+class PayloadMockClient(MockClient):
+    """
+    MockClient that returns a JSON payload of configurable size and validates it.
+
+    Validation mirrors what a real client does with the API's JSON response,
+    so its cost scales with response size like it would in production.
+    """
+
+    def __init__(self, response_chars: int, timer: StageTimer, **kwargs):
+        super().__init__(**kwargs)
+        self.timer = timer
+        self.filler = "x" * response_chars
+
+    async def complete_structured_with_usage(self,
+                                             prompt: str,
+                                             response_model: Type[BaseModel],
+                                             system_prompt: Optional[str] = None,
+                                             sample_index: int = 0) -> Tuple[BaseModel, CallUsage]:
+        latency = await self._call(prompt, system_prompt)
+        payload = json.dumps({"answer": "ABCD"[len(prompt) % 4], "reasoning": self.filler})
+        start = time.perf_counter()
+        response = response_model.model_validate_json(payload)
+        self.timer.add("validate", time.perf_counter() - start)
+        return response, CallUsage(prompt_tokens=len(prompt) // 4,
+                                   completion_tokens=len(payload) // 4,
+                                   latency_s=latency)
+
+
+async def _monitor_loop_lag(histogram: LatencyHistogram, interval: float = 0.01):
+    """Record how late the event loop wakes a sleeping task, until cancelled."""
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        histogram.observe(max(0.0, time.perf_counter() - start - interval))
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+async def _drive(config: PerfConfig, output_path: str, timer: StageTimer) -> float:
+    benchmark = PerfBenchmark(config.n_items, timer, seed=config.seed)
+    client = PayloadMockClient(
+        config.response_chars, timer,
+        latency=LatencyModel(config.latency_distribution, config.latency_mean),
+        seed=config.seed)
+    runner = EvaluationRunner(client, max_parallel=config.max_parallel)
+
+    start = time.perf_counter()
+    if config.mode == "stream":
+        await runner.stream_benchmark(benchmark, "<synthetic>", output_path)
+    elif config.mode == "run":
+        await runner.run_benchmark(benchmark, "<synthetic>", output_path)
+    else:
+        raise ValueError(f"Unknown mode: {config.mode!r} (expected 'stream' or 'run')")
+    return time.perf_counter() - start
+
+
+def run_config(config: PerfConfig) -> Dict[str, Any]:
+    """
+    Run one configuration and return its measurements.
+
+    Patches EvaluationItem.to_dict and CheckpointLog.write with stage timers
+    for the lifetime of the process.
+    """
+    timer = StageTimer()
+    EvaluationItem.to_dict = timer.wrap("to_dict", EvaluationItem.to_dict)
+    CheckpointLog.write = timer.wrap("checkpoint_write", CheckpointLog.write)
+
+    lag = LatencyHistogram(min_s=1e-5)
+
+    async def main() -> float:
+        monitor = asyncio.create_task(_monitor_loop_lag(lag))
+        try:
+            return await _drive(config, output_path, timer)
+        finally:
+            monitor.cancel()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        output_path = os.path.join(tmp, "results.jsonl")
+        cpu_start = time.process_time()
+        elapsed = asyncio.run(main())
+        cpu = time.process_time() - cpu_start
+
+    n = config.n_items
+    return {
+        "key": config.key(),
+        "config": asdict(config),
+        "elapsed_s": elapsed,
+        "items_per_s": n / elapsed if elapsed else 0.0,
+        "cpu_s": cpu,
+        "cpu_us_per_item": cpu / n * 1e6 if n else 0.0,
+        "peak_rss_mb": peak_rss_mb(),
+        "loop_lag_ms": {
+            "p50": lag.percentile(50) * 1e3,
+            "p99": lag.percentile(99) * 1e3,
+            "max": lag.percentile(100) * 1e3,
+        },
+        "stage_us_per_item": {stage: seconds / n * 1e6 if n else 0.0
+                              for stage, seconds in sorted(timer.seconds.items())},
+    }
@@ -21,9 +21,7 @@ case "$cmd" in
     python -m src.run_eval mcq baseline "$@"
     ;;
   mcq-robust)
-    # TODO: Implement robust mode with new architecture
-    echo "mcq-robust not yet implemented in new architecture"
-    exit 1
+    python -m src.run_eval mcq robust "$@"
     ;;
   gsm8k-baseline)
     python -m src.run_eval gsm8k baseline "$@"
@@ -33,9 +31,7 @@ case "$cmd" in
     python -m src.run_eval gsm8k baseline "$@"
     ;;
   gsm8k-selfconsistency)
-    # TODO: Implement self-consistency with new architecture
-    echo "gsm8k-selfconsistency not yet implemented in new architecture"
-    exit 1
+    python -m src.run_eval gsm8k self_consistency "$@"
     ;;
   *)
     echo "Unknown command: $cmd"
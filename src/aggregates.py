@@ -0,0 +1,425 @@
+"""
+Precomputed per-run aggregates, kept in sidecar files next to the results.
+
+Summaries used to reparse every results row on every call. A RunAggregate
+holds the counters the summaries are built from (correctness per gold and
+chosen position, per shuffle, per group, error classes, token usage) and is
+saved as `<results>.agg.json`, together with the byte offset of the results
+file it has consumed. update_aggregate() only parses rows appended since
+then, so refreshing a finished run costs one stat() and refreshing a live
+run costs the new rows. A results file that was rewritten rather than
+appended to (resume compaction, shard merge) is detected by its inode and a
+hash of its head and aggregated from scratch.
+
+Per-group counters are needed only to fold in new rows, so they live in a
+separate `<results>.agg.groups.json`; the group-level statistics
+(worst-case and majority accuracy) are maintained incrementally in the main
+sidecar, which stays small however many questions a run has.
+
+Usage:
+    python -m src.aggregates show results/mcq.jsonl
+    python -m src.aggregates compare results/*.jsonl --sort mean_acc
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from dataclasses import dataclass, field, fields
+from typing import Any, Dict, Iterable, List, Optional
+
+from .columnar import RESULTS_FILE, is_columnar, iter_rows
+from .metrics import wilson_ci
+
+LETTERS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+AGGREGATE_VERSION = 2
+HEAD_BYTES = 4096
+
+# Counter fields keyed by an integer position/shuffle index -> [correct, total]
+_INDEXED = ("gold_position", "chosen_position", "shuffle")
+
+
+def aggregate_path(results_path: str) -> str:
+    """Sidecar path of a results file or columnar directory."""
+    return results_path.rstrip(os.sep) + '.agg.json'
+
+
+def _groups_path(results_path: str) -> str:
+    return results_path.rstrip(os.sep) + '.agg.groups.json'
+
+
+def _chosen_position(row: Dict[str, Any]) -> Optional[int]:
+    """Option index the model picked, from the parsed letter answer (MCQ rows)."""
+    parsed = row.get("parsed_response")
+    if not isinstance(parsed, dict):
+        return None
+    answer = str(parsed.get("answer") or "").strip().upper()
+    return LETTERS.index(answer) if len(answer) == 1 and answer in LETTERS else None
+
+
+@dataclass
+class RunAggregate:
+    """
+    Additive counters over the rows of one results file.
+
+    Rows without an evaluation (errors) count towards n_rows and the error
+    classes only. All accuracy statistics are over evaluated rows.
+    """
+    n_rows: int = 0
+    n_evaluated: int = 0
+    n_correct: int = 0
+    n_errors: int = 0
+    n_samples: int = 0
+    error_classes: Dict[str, int] = field(default_factory=dict)
+    gold_position: Dict[int, List[int]] = field(default_factory=dict)
+    chosen_position: Dict[int, List[int]] = field(default_factory=dict)
+    shuffle: Dict[int, List[int]] = field(default_factory=dict)
+    n_groups: int = 0
+    groups_all_correct: int = 0
+    groups_majority: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_prompt_tokens: int = 0
+    # group_id -> [correct, total]; persisted separately (see module docstring)
+    groups: Dict[str, List[int]] = field(default_factory=dict, repr=False)
+
+    def add_row(self, row: Dict[str, Any]):
+        """Fold one results row (EvaluationItem.to_dict() form) into the counters."""
+        metadata = row.get("metadata") or {}
+        self.n_rows += 1
+        self.n_samples += metadata.get("samples_used", 0)
+        usage = metadata.get("usage") or {}
+        self.prompt_tokens += usage.get("prompt_tokens", 0)
+        self.completion_tokens += usage.get("completion_tokens", 0)
+        self.cached_prompt_tokens += usage.get("cached_tokens", 0)
+        if metadata.get("error") is not None:
+            self.n_errors += 1
+            error_class = metadata.get("error_class") or "error"
+            self.error_classes[error_class] = self.error_classes.get(error_class, 0) + 1
+
+        evaluation = row.get("evaluation")
+        if evaluation is None:
+            return
+        ok = int(bool(evaluation))
+        self.n_evaluated += 1
+        self.n_correct += ok
+
+        gold = (row.get("example") or {}).get("answer_idx")
+        if isinstance(gold, int):
+            self._count(self.gold_position, gold, ok)
+        chosen = _chosen_position(row)
+        if chosen is not None:
+            self._count(self.chosen_position, chosen, ok)
+        self._count(self.shuffle, metadata.get("shuffle_id", 0), ok)
+        self._add_to_group(row.get("group_id") or row.get("item_id"), ok)
+
+    @staticmethod
+    def _count(counter: Dict[int, List[int]], key: int, ok: int):
+        entry = counter.setdefault(key, [0, 0])
+        entry[0] += ok
+        entry[1] += 1
+
+    def _add_to_group(self, group_id: str, ok: int):
+        entry = self.groups.get(group_id)
+        if entry is None:
+            entry = self.groups[group_id] = [0, 0]
+            self.n_groups += 1
+        else:
+            # Retract the group's previous contribution before updating it
+            self.groups_all_correct -= entry[0] == entry[1]
+            self.groups_majority -= 2 * entry[0] > entry[1]
+        entry[0] += ok
+        entry[1] += 1
+        self.groups_all_correct += entry[0] == entry[1]
+        self.groups_majority += 2 * entry[0] > entry[1]
+
+    def merge(self, other: 'RunAggregate'):
+        """Add another aggregate's counters (both must have their groups loaded)."""
+        for f in fields(self):
+            if f.name in ("n_groups", "groups_all_correct", "groups_majority", "groups"):
+                continue
+            mine, theirs = getattr(self, f.name), getattr(other, f.name)
+            if isinstance(mine, int):
+                setattr(self, f.name, mine + theirs)
+            elif f.name == "error_classes":
+                for key, count in theirs.items():
+                    mine[key] = mine.get(key, 0) + count
+            else:
+                for key, (c, t) in theirs.items():
+                    entry = mine.setdefault(key, [0, 0])
+                    entry[0] += c
+                    entry[1] += t
+        for group_id, (c, t) in other.groups.items():
+            entry = self.groups.get(group_id)
+            if entry is None:
+                self.groups[group_id] = [c, t]
+                self.n_groups += 1
+                self.groups_all_correct += c == t
+                self.groups_majority += 2 * c > t
+            else:
+                self.groups_all_correct -= entry[0] == entry[1]
+                self.groups_majority -= 2 * entry[0] > entry[1]
+                entry[0] += c
+                entry[1] += t
+                self.groups_all_correct += entry[0] == entry[1]
+                self.groups_majority += 2 * entry[0] > entry[1]
+
+    def summary(self) -> Dict[str, Any]:
+        """Summary statistics derived from the counters alone."""
+        n = self.n_evaluated
+        acc = self.n_correct / n if n else 0.0
+        lo, hi = wilson_ci(acc, n)
+        per_shuffle = [c / t for c, t in self.shuffle.values() if t]
+        mean_shuffle = sum(per_shuffle) / len(per_shuffle) if per_shuffle else 0.0
+        return {
+            "n_rows": self.n_rows,
+            "n": n,
+            "n_errors": self.n_errors,
+            "n_groups": self.n_groups,
+            "mean_acc": acc,
+            "acc_ci": [lo, hi],
+            "per_position_acc": {p: c / t for p, (c, t) in sorted(self.gold_position.items())},
+            "chosen_position_rate": ({p: t / n for p, (c, t) in sorted(self.chosen_position.items())}
+                                     if n else {}),
+            "chosen_position_acc": {p: c / t for p, (c, t) in sorted(self.chosen_position.items())},
+            "shuffle_acc_std": ((sum((a - mean_shuffle) ** 2 for a in per_shuffle) / len(per_shuffle)) ** 0.5
+                                if per_shuffle else 0.0),
+            "worst_case_acc": self.groups_all_correct / self.n_groups if self.n_groups else 0.0,
+            "majority_acc": self.groups_majority / self.n_groups if self.n_groups else 0.0,
+            "error_classes": dict(sorted(self.error_classes.items())),
+            "samples": self.n_samples,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cached_prompt_tokens": self.cached_prompt_tokens,
+        }
+
+    def state(self) -> Dict[str, Any]:
+        """JSON-serializable counters, excluding the per-group table."""
+        return {f.name: getattr(self, f.name) for f in fields(self) if f.name != "groups"}
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> 'RunAggregate':
+        """Rebuild an aggregate from state() (JSON turns integer keys into strings)."""
+        state = dict(state)
+        for name in _INDEXED:
+            state[name] = {int(k): v for k, v in state.get(name, {}).items()}
+        return cls(**state)
+
+
+def _source_state(results_path: str) -> Dict[str, Any]:
+    """Identity and size of the file an aggregate is computed from."""
+    path = os.path.join(results_path, RESULTS_FILE) if is_columnar(results_path) else results_path
+    st = os.stat(path)
+    return {"ino": st.st_ino, "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def _head_hash(path: str, length: int) -> str:
+    with open(path, 'rb') as f:
+        return hashlib.blake2b(f.read(min(length, HEAD_BYTES)), digest_size=12).hexdigest()
+
+
+def _read_appended(path: str, aggregate: RunAggregate, offset: int) -> int:
+    """
+    Fold complete rows after `offset` into `aggregate`; return the new offset.
+
+    A trailing line without a newline may still be being written, so it is
+    left for the next update.
+    """
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b'\n'):
+                break
+            offset += len(line)
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            aggregate.add_row(row)
+    return offset
+
+
+def _load_sidecar(results_path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(aggregate_path(results_path), 'r', encoding='utf-8') as f:
+            sidecar = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    return sidecar if sidecar.get("version") == AGGREGATE_VERSION else None
+
+
+def _load_groups(results_path: str) -> Optional[Dict[str, List[int]]]:
+    try:
+        with open(_groups_path(results_path), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def _write_json(path: str, data: Any):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def save_aggregate(results_path: str, aggregate: RunAggregate, source: Dict[str, Any]):
+    """
+    Write an aggregate's sidecars.
+
+    Failing to write (e.g. a read-only results directory) is not an error:
+    the aggregate is simply recomputed next time.
+    """
+    sidecar = {
+        "version": AGGREGATE_VERSION,
+        "source": source,
+        "aggregate": aggregate.state(),
+        "summary": aggregate.summary(),
+    }
+    try:
+        # Groups first, so a crash in between leaves a sidecar that triggers a rebuild
+        _write_json(_groups_path(results_path), aggregate.groups)
+        _write_json(aggregate_path(results_path), sidecar)
+    except OSError:
+        pass
+
+
+def _is_fresh(sidecar: Optional[Dict[str, Any]], current: Dict[str, Any]) -> bool:
+    if sidecar is None:
+        return False
+    source = sidecar["source"]
+    return all(source.get(k) == current[k] for k in ("ino", "size", "mtime_ns"))
+
+
+def update_aggregate(results_path: str) -> RunAggregate:
+    """
+    Bring a results file's aggregate up to date and return it.
+
+    Uses the sidecar as is when the results file is unchanged, folds in only
+    the appended rows when it grew, and rebuilds it otherwise.
+
+    Args:
+        results_path: Results JSONL file or columnar directory
+
+    Returns:
+        Current aggregate. Its per-group table is only loaded when new rows
+        were folded in; call load_aggregate(..., with_groups=True) to merge.
+    """
+    current = _source_state(results_path)
+    sidecar = _load_sidecar(results_path)
+    if _is_fresh(sidecar, current):
+        return RunAggregate.from_state(sidecar["aggregate"])
+
+    if is_columnar(results_path):
+        # Parquet files are written once, so any change means a full rebuild
+        aggregate = RunAggregate()
+        for row in iter_rows(results_path):
+            aggregate.add_row(row)
+        save_aggregate(results_path, aggregate, current)
+        return aggregate
+
+    aggregate, offset = None, 0
+    if sidecar is not None:
+        source = sidecar["source"]
+        groups = _load_groups(results_path)
+        if (groups is not None
+                and source.get("ino") == current["ino"]
+                and source.get("offset", 0) <= current["size"]
+                and _head_hash(results_path, source.get("offset", 0)) == source.get("head")):
+            aggregate = RunAggregate.from_state(sidecar["aggregate"])
+            aggregate.groups = groups
+            offset = source["offset"]
+    if aggregate is None:
+        aggregate = RunAggregate()
+
+    offset = _read_appended(results_path, aggregate, offset)
+    current.update(offset=offset, head=_head_hash(results_path, offset))
+    save_aggregate(results_path, aggregate, current)
+    return aggregate
+
+
+def load_aggregate(results_path: str, with_groups: bool = False) -> RunAggregate:
+    """Up-to-date aggregate of a results file, optionally with its per-group table."""
+    aggregate = update_aggregate(results_path)
+    if with_groups and aggregate.n_groups and not aggregate.groups:
+        aggregate.groups = _load_groups(results_path) or {}
+        if len(aggregate.groups) != aggregate.n_groups:
+            # Group table lost or stale: rebuild everything from the rows
+            os.remove(aggregate_path(results_path))
+            aggregate = update_aggregate(results_path)
+    return aggregate
+
+
+def save_complete_aggregate(results_path: str, aggregate: RunAggregate):
+    """Save an aggregate already computed over every row of results_path (with its groups)."""
+    current = _source_state(results_path)
+    current.update(offset=current["size"], head=_head_hash(results_path, current["size"]))
+    save_aggregate(results_path, aggregate, current)
+
+
+def merge_aggregates(paths: Iterable[str], output_path: str) -> RunAggregate:
+    """
+    Combine the aggregates of results files that were concatenated into output_path.
+
+    Lets a merged run (e.g. sharded results) get its sidecar without
+    reparsing the rows. Call after output_path has been written.
+    """
+    merged = RunAggregate()
+    for path in paths:
+        merged.merge(load_aggregate(path, with_groups=True))
+    save_complete_aggregate(output_path, merged)
+    return merged
+
+
+def compare_runs(paths: List[str]) -> List[Dict[str, Any]]:
+    """Summaries of many runs from their aggregates, one dict per path (key 'run')."""
+    return [{"run": path, **update_aggregate(path).summary()} for path in paths]
+
+
+def _format_positions(rates: Dict[int, float]) -> str:
+    return " ".join(f"{LETTERS[p]}={r:.2f}" for p, r in rates.items())
+
+
+def print_comparison(rows: List[Dict[str, Any]]):
+    """Print one line per run."""
+    width = max([len("run")] + [len(r["run"]) for r in rows])
+    print(f"{'run':<{width}} {'n':>8} {'acc':>7} {'95% CI':>15} {'worst':>7} {'major':>7} "
+          f"{'errors':>7}  chosen position")
+    for r in rows:
+        lo, hi = r["acc_ci"]
+        print(f"{r['run']:<{width}} {r['n']:>8} {r['mean_acc']:>7.4f} {lo:>7.4f}-{hi:<7.4f} "
+              f"{r['worst_case_acc']:>7.4f} {r['majority_acc']:>7.4f} {r['n_errors']:>7}  "
+              f"{_format_positions(r['chosen_position_rate'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precomputed per-run result aggregates")
+    sub = parser.add_subparsers(dest="command", required=True)
+    show = sub.add_parser("show", help="Update and print one run's aggregate summary")
+    show.add_argument("results_path", help="Results JSONL file or columnar directory")
+    compare = sub.add_parser("compare", help="Compare many runs from their aggregates")
+    compare.add_argument("results_paths", nargs="+", help="Results JSONL files or columnar directories")
+    compare.add_argument("--sort", metavar="KEY", help="Sort by a summary key (e.g. mean_acc), descending")
+    compare.add_argument("--json", action="store_true", help="Print JSON instead of a table")
+    args = parser.parse_args()
+
+    if args.command == "show":
+        print(json.dumps(update_aggregate(args.results_path).summary(), indent=2))
+        return 0
+
+    rows = compare_runs(args.results_paths)
+    if args.sort:
+        rows.sort(key=lambda r: r[args.sort], reverse=True)
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print_comparison(rows)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
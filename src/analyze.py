@@ -1,6 +1,8 @@
 import json, os
 from typing import List, Dict, Any
-from collections import defaultdict
+
+from . import aggregates
+from .aggregates import update_aggregate
 
 def load_jsonl(path: str) -> List[Dict[str, Any]]:
     arr = []
@@ -12,18 +14,25 @@ def load_jsonl(path: str) -> List[Dict[str, Any]]:
     return arr
 
 def summarize_mcq(results_path: str) -> Dict[str, Any]:
-    data = load_jsonl(results_path)
-    n = len(data)
-    pos_acc = defaultdict(lambda: [0,0])  # position -> [correct, total]
-    for r in data:
-        pos = r.get("chosen_position")
-        if pos is not None:
-            pos_acc[pos][1] += 1
-            if r.get("is_correct"):
-                pos_acc[pos][0] += 1
-    per_pos = {int(k): (v[0]/v[1] if v[1] else 0.0) for k,v in pos_acc.items()}
+    """MCQ summary: overall accuracy (errors count as wrong) and accuracy by chosen position.
+    Served from the run's aggregate sidecar (see aggregates.py), updated with any new rows."""
+    agg = update_aggregate(results_path)
     return {
-        "n": n,
-        "overall_acc": sum(int(r.get("is_correct", False)) for r in data)/n if n else 0.0,
-        "per_position_acc": per_pos,
+        "n": agg.n_rows,
+        "overall_acc": agg.n_correct/agg.n_rows if agg.n_rows else 0.0,
+        "per_position_acc": {p: c/t for p,(c,t) in sorted(agg.chosen_position.items())},
     }
+
+def summarize_robust(results_path: str) -> Dict[str, Any]:
+    """RobustMC summary of runner output (rows with group_id / shuffle_id metadata).
+    Reports mean accuracy over all variants, accuracy per gold-answer position,
+    how often each position is chosen, the spread of accuracy across shuffle
+    indices, and worst-case (all variants correct) / majority group accuracy."""
+    summary = update_aggregate(results_path).summary()
+    keys = ["n", "n_groups", "mean_acc", "per_position_acc", "chosen_position_rate",
+            "shuffle_acc_std", "worst_case_acc", "majority_acc"]
+    return {k: summary[k] for k in keys}
+
+def compare_runs(results_paths: List[str]) -> List[Dict[str, Any]]:
+    """Summaries of many runs, read from their aggregate sidecars rather than the raw rows."""
+    return aggregates.compare_runs(results_paths)
@@ -3,13 +3,31 @@ Async Grok API client using the official xAI SDK.
 
 This module provides a unified client for making async API calls with
 structured output support via Pydantic models.
+
+With `stream=True`, structured completions are streamed token by token
+instead of returned whole. This records the time to first token and the
+inter-token latency. It also stops paying for runaway generations:
+- a generation producing more than `token_budget` output tokens (reasoning
+  included) is aborted mid-stream
+- a stream with no new chunk for `stall_timeout` seconds is aborted
+- a generation the API stopped at max_tokens is reported as truncated
+  instead of failing schema validation like a malformed answer
+All three raise GenerationAborted, carrying the usage of the partial call.
 """
 
+import asyncio
+import contextlib
+import inspect
 import os
-from typing import Type, TypeVar, Optional
+import time
+from typing import Any, Dict, Protocol, Tuple, Type, TypeVar, Optional, runtime_checkable
 from dotenv import load_dotenv
 from pydantic import BaseModel
 
+from .cache import ResponseCache, make_cache_key
+from .ratelimit import TRANSIENT, TRUNCATED
+from .telemetry import CallUsage
+
 try:
     from xai_sdk import AsyncClient
     from xai_sdk.chat import user, system
@@ -26,6 +44,56 @@ DEFAULT_TOP_P = float(os.getenv("XAI_TOP_P", "1.0"))
 DEFAULT_MAX_TOKENS = int(os.getenv("XAI_MAX_OUTPUT_TOKENS", "4096"))
 DEFAULT_TIMEOUT = int(os.getenv("XAI_TIMEOUT", "300"))  # 5 minutes
 
+# Finish reasons meaning the output hit the token limit (xai_sdk proto name, OpenAI style)
+_LENGTH_FINISH_REASONS = {"REASON_MAX_LEN", "LENGTH", "MAX_TOKENS"}
+
+
+class GenerationAborted(Exception):
+    """
+    A streamed generation that ended without a complete answer.
+
+    `reason` is 'max_tokens' (stopped by the API at max_tokens),
+    'token_budget' (aborted by the client) or 'stalled' (no progress for
+    stall_timeout seconds). Truncations are classified TRUNCATED and not
+    retried; stalls are TRANSIENT. `usage` holds the tokens already paid for.
+    """
+
+    def __init__(self, message: str, reason: str, usage: CallUsage):
+        super().__init__(message)
+        self.reason = reason
+        self.usage = usage
+        self.error_class = TRANSIENT if reason == "stalled" else TRUNCATED
+
+
+@runtime_checkable
+class LLMClient(Protocol):
+    """
+    Interface the runner expects from an inference backend.
+
+    GrokClient talks to the xAI API; MockClient and ReplayClient (src/offline.py)
+    implement the same methods without network access. `model` and
+    `max_tokens` are used for pricing and rate budgeting.
+    """
+    model: str
+    max_tokens: int
+
+    async def complete(self, prompt: str, system_prompt: Optional[str] = None) -> str:
+        ...
+
+    async def complete_structured(self,
+                                  prompt: str,
+                                  response_model: Type[T],
+                                  system_prompt: Optional[str] = None,
+                                  sample_index: int = 0) -> T:
+        ...
+
+    async def complete_structured_with_usage(self,
+                                             prompt: str,
+                                             response_model: Type[T],
+                                             system_prompt: Optional[str] = None,
+                                             sample_index: int = 0) -> Tuple[T, CallUsage]:
+        ...
+
 
 class GrokClient:
     """
@@ -33,6 +101,11 @@ class GrokClient:
 
     Uses AsyncClient from xai_sdk for native async support with automatic
     prompt caching and structured outputs via Pydantic models.
+
+    An optional ResponseCache short-circuits structured completions whose
+    inputs (model, prompts, sampling params, schema) have been seen before.
+    Concurrent identical structured requests are coalesced ("single-flight"):
+    only the first is sent and the others await its result.
     """
 
     def __init__(self,
@@ -41,7 +114,13 @@ class GrokClient:
                  temperature: float = DEFAULT_TEMPERATURE,
                  top_p: float = DEFAULT_TOP_P,
                  max_tokens: int = DEFAULT_MAX_TOKENS,
-                 timeout: int = DEFAULT_TIMEOUT):
+                 timeout: int = DEFAULT_TIMEOUT,
+                 cache: Optional[ResponseCache] = None,
+                 coalesce: bool = True,
+                 stream: bool = False,
+                 token_budget: Optional[int] = None,
+                 stall_timeout: Optional[float] = None,
+                 pool: Optional[Any] = None):
         """
         Initialize the Grok client.
 
@@ -52,22 +131,74 @@ class GrokClient:
             top_p: Nucleus sampling parameter (default: 1.0)
             max_tokens: Maximum output tokens (default: 4096)
             timeout: Request timeout in seconds (default: 300)
+            cache: Optional response cache. A read-only (replay) cache serves
+                every request from disk, so no API key or SDK is required.
+            coalesce: Share one in-flight call among concurrent identical requests
+            stream: Stream structured completions, recording time to first
+                token and inter-token latency
+            token_budget: Streaming: abort generations exceeding this many
+                output (completion + reasoning) tokens
+            stall_timeout: Streaming: abort a stream with no new chunk for this
+                many seconds (including the wait for the first one)
+            pool: Optional ClientPool (src/pool.py) whose connections this
+                client shares; without one the client opens its own
         """
+        self.model = model
+        self.temperature = temperature
+        self.top_p = top_p
+        self.max_tokens = max_tokens
+        self.cache = cache
+        self.coalesce = coalesce
+        self.stream = stream
+        self.token_budget = token_budget
+        self.stall_timeout = stall_timeout
+        self.pool = pool
+
+        # Single-flight state: request key -> future of the call in progress
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.coalesced_calls = 0  # Requests answered by another request's call
+
+        self.api_key = api_key or os.getenv("XAI_API_KEY")
+
+        # Replay mode never reaches the network, so skip SDK/key requirements
+        if cache is not None and cache.read_only:
+            self.client = None
+            return
+
+        # Pooled clients lease the pool's connections per call
+        if pool is not None:
+            self.client = None
+            return
+
         if AsyncClient is None:
             raise ImportError("xai-sdk required. Run: pip install xai-sdk")
 
-        self.api_key = api_key or os.getenv("XAI_API_KEY")
         if not self.api_key:
             raise ValueError("XAI_API_KEY not set. Put it in environment or .env")
 
-        self.model = model
-        self.temperature = temperature
-        self.top_p = top_p
-        self.max_tokens = max_tokens
-
         # Initialize xAI AsyncClient
         self.client = AsyncClient(api_key=self.api_key, timeout=timeout)
 
+    def _connection(self):
+        """Async context manager yielding the SDK client to make one call on."""
+        if self.pool is not None:
+            return self.pool.lease()
+        return contextlib.nullcontext(self.client)
+
+    async def aclose(self):
+        """Close this client's own connection (a pool's connections are closed by the pool)."""
+        if self.client is not None:
+            await close_sdk_client(self.client)
+            self.client = None
+
+    def _sampling_params(self) -> dict:
+        """Sampling parameters that affect the output (used for cache keys)."""
+        return {
+            "temperature": self.temperature,
+            "top_p": self.top_p,
+            "max_tokens": self.max_tokens,
+        }
+
     async def complete(self,
                        prompt: str,
                        system_prompt: Optional[str] = None) -> str:
@@ -81,31 +212,19 @@ class GrokClient:
         Returns:
             Generated text response
         """
-        # Build messages
-        messages = []
-        if system_prompt:
-            messages.append(system(system_prompt))
-        messages.append(user(prompt))
-
-        # Create chat
-        chat = self.client.chat.create(
-            model=self.model,
-            messages=messages
-        )
+        async with self._connection() as sdk:
+            chat = self._create_chat(sdk, prompt, system_prompt)
 
-        # Sample response
-        response = await chat.sample(
-            temperature=self.temperature,
-            top_p=self.top_p,
-            max_tokens=self.max_tokens
-        )
+            # Sample response
+            response = await chat.sample()
 
-        return response
+        return response.content
 
     async def complete_structured(self,
                                   prompt: str,
                                   response_model: Type[T],
-                                  system_prompt: Optional[str] = None) -> T:
+                                  system_prompt: Optional[str] = None,
+                                  sample_index: int = 0) -> T:
         """
         Async structured output completion using Pydantic models.
 
@@ -116,31 +235,219 @@ class GrokClient:
             prompt: User prompt text
             response_model: Pydantic BaseModel class defining output structure
             system_prompt: Optional system prompt
+            sample_index: Index of an independent sample of the same request
+                (self-consistency). Distinct indices get distinct cache
+                entries and are never coalesced.
 
         Returns:
             Instance of response_model with parsed structured output
+
+        Raises:
+            CacheMissError: If the cache is in replay mode and has no entry
+        """
+        response, _ = await self.complete_structured_with_usage(
+            prompt, response_model, system_prompt, sample_index)
+        return response
+
+    async def complete_structured_with_usage(self,
+                                             prompt: str,
+                                             response_model: Type[T],
+                                             system_prompt: Optional[str] = None,
+                                             sample_index: int = 0) -> Tuple[T, CallUsage]:
         """
+        Structured completion that also reports token usage and latency.
+
+        Same arguments and caching/coalescing behavior as complete_structured().
+        Responses served from the local cache or shared with an identical
+        in-flight call report zero tokens and are flagged as such, since they
+        cost nothing.
+
+        Returns:
+            Tuple of (parsed response, CallUsage)
+        """
+        start = time.monotonic()
+        params = self._sampling_params()
+        if sample_index:
+            # Only non-zero indices enter the key, so single-sample keys are unchanged
+            params["sample_index"] = sample_index
+        key = make_cache_key(self.model, prompt, system_prompt, params, response_model)
+        if self.cache is not None:
+            cached = self.cache.get_model(key, response_model)
+            if cached is not None:
+                return cached, CallUsage(latency_s=time.monotonic() - start, from_cache=True)
+
+        if not self.coalesce:
+            return await self._sample_structured(key, prompt, response_model, system_prompt)
+
+        # An identical request is already in flight: wait for its result instead
+        # of paying for a second call. shield() keeps a cancelled follower from
+        # cancelling the leader's call.
+        existing = self._inflight.get(key)
+        if existing is not None:
+            self.coalesced_calls += 1
+            response = await asyncio.shield(existing)
+            return response, CallUsage(latency_s=time.monotonic() - start, coalesced=True)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            response, usage = await self._sample_structured(key, prompt, response_model,
+                                                            system_prompt)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception retrieved so asyncio doesn't warn when no follower awaited it
+            future.exception()
+            raise
+        else:
+            future.set_result(response)
+            return response, usage
+        finally:
+            self._inflight.pop(key, None)
+
+    def _create_chat(self, sdk: Any, prompt: str, system_prompt: Optional[str], **kwargs):
+        """Create a chat on SDK client `sdk` with the messages and this client's sampling parameters."""
         # Build messages
         messages = []
         if system_prompt:
             messages.append(system(system_prompt))
         messages.append(user(prompt))
 
-        # Create chat
-        chat = self.client.chat.create(
+        # Sampling parameters are set when the chat is created
+        return sdk.chat.create(
             model=self.model,
-            messages=messages
-        )
-
-        # Sample with structured output
-        response = await chat.sample(
-            output_model=response_model,
+            messages=messages,
             temperature=self.temperature,
             top_p=self.top_p,
-            max_tokens=self.max_tokens
+            max_tokens=self.max_tokens,
+            **kwargs
         )
 
-        return response
+    async def _sample_structured(self,
+                                 key: str,
+                                 prompt: str,
+                                 response_model: Type[T],
+                                 system_prompt: Optional[str]) -> Tuple[T, CallUsage]:
+        """Make the actual structured API call and store the result in the cache."""
+        async with self._connection() as sdk:
+            if self.stream:
+                response, usage = await self._stream_structured(sdk, prompt, response_model,
+                                                                system_prompt)
+            else:
+                chat = self._create_chat(sdk, prompt, system_prompt)
+
+                # Sample with structured output; parse() returns the raw response
+                # (which carries usage) alongside the validated Pydantic instance
+                start = time.monotonic()
+                raw, response = await chat.parse(response_model)
+                usage = usage_from_response(raw, time.monotonic() - start)
+
+        if self.cache is not None:
+            self.cache.put_model(key, response)
+
+        return response, usage
+
+    async def _stream_structured(self,
+                                 sdk: Any,
+                                 prompt: str,
+                                 response_model: Type[T],
+                                 system_prompt: Optional[str]) -> Tuple[T, CallUsage]:
+        """
+        Stream one structured completion, enforcing the token budget and stall timeout.
+
+        Raises:
+            GenerationAborted: If the generation was truncated, over budget or stalled
+        """
+        chat = self._create_chat(sdk, prompt, system_prompt, response_format=response_model)
+        start = time.monotonic()
+        first = last = None
+        gaps, n_gaps = 0.0, 0
+        streamed_chars = 0
+        raw = None
+
+        def usage_so_far(truncated: bool = False) -> CallUsage:
+            usage = usage_from_response(raw, time.monotonic() - start)
+            if not (usage.completion_tokens or usage.reasoning_tokens):
+                # The stream reported no usage yet: estimate from what it delivered
+                usage.completion_tokens = streamed_chars // 4
+            usage.ttft_s = first - start if first is not None else None
+            usage.inter_token_s = gaps / n_gaps if n_gaps else None
+            usage.truncated = truncated
+            return usage
+
+        stream = chat.stream().__aiter__()
+        try:
+            while True:
+                try:
+                    raw, chunk = await asyncio.wait_for(stream.__anext__(), self.stall_timeout)
+                except StopAsyncIteration:
+                    break
+                except asyncio.TimeoutError:
+                    raise GenerationAborted(f"Stream stalled: no tokens for {self.stall_timeout}s",
+                                            "stalled", usage_so_far()) from None
+                delta = (len(getattr(chunk, "content", "") or "")
+                         + len(getattr(chunk, "reasoning_content", "") or ""))
+                if not delta:
+                    continue
+                streamed_chars += delta
+                now = time.monotonic()
+                if first is None:
+                    first = now
+                else:
+                    gaps += now - last
+                    n_gaps += 1
+                last = now
+                if self.token_budget is not None:
+                    usage = getattr(raw, "usage", None)
+                    # Usage is not sent with every chunk; the streamed text (about 4
+                    # characters per token) bounds the generation when it is missing
+                    generated = max((getattr(usage, "completion_tokens", 0) or 0)
+                                    + (getattr(usage, "reasoning_tokens", 0) or 0),
+                                    streamed_chars // 4)
+                    if generated > self.token_budget:
+                        raise GenerationAborted(
+                            f"Generation aborted after {generated} tokens "
+                            f"(token budget {self.token_budget})",
+                            "token_budget", usage_so_far(truncated=True))
+        finally:
+            # Closing the stream cancels the request, so an aborted generation stops billing
+            if hasattr(stream, "aclose"):
+                await stream.aclose()
+
+        if str(getattr(raw, "finish_reason", "")).upper() in _LENGTH_FINISH_REASONS:
+            raise GenerationAborted(f"Generation truncated at max_tokens ({self.max_tokens})",
+                                    "max_tokens", usage_so_far(truncated=True))
+        return response_model.model_validate_json(raw.content), usage_so_far()
+
+
+async def close_sdk_client(sdk: Any):
+    """Close an xai_sdk client's gRPC channel(s)."""
+    close = getattr(sdk, "close", None)
+    if close is not None:
+        result = close()
+        if inspect.isawaitable(result):
+            await result
+        return
+    for name in ("_api_channel", "_management_channel", "_channel"):
+        channel = getattr(sdk, name, None)
+        if channel is not None and hasattr(channel, "close"):
+            result = channel.close()
+            if inspect.isawaitable(result):
+                await result
+
+
+def usage_from_response(raw: Any, latency_s: float) -> CallUsage:
+    """Extract token usage from an xai_sdk response (missing fields count as 0)."""
+    usage = getattr(raw, "usage", None)
+    return CallUsage(
+        prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+        completion_tokens=getattr(usage, "completion_tokens", 0) or 0,
+        cached_tokens=getattr(usage, "cached_prompt_text_tokens", 0) or 0,
+        reasoning_tokens=getattr(usage, "reasoning_tokens", 0) or 0,
+        latency_s=latency_s,
+    )
 
 
 # Legacy alias for backward compatibility
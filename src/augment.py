@@ -1,23 +1,62 @@
 import random
 import copy
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 LETTER_MAP = ['A','B','C','D','E','F','G','H']
 
-def shuffle_options(example: Dict[str, Any], seed: int) -> Dict[str, Any]:
-    rng = random.Random(seed)
-    options = example['options']
-    idx = example['answer_idx']
-    pairs = list(enumerate(options))
-    rng.shuffle(pairs)
-    new_options = [opt for _, opt in pairs]
-    # find where the correct one moved
-    new_idx = [i for i,(old_i,_) in enumerate(pairs) if old_i == idx][0]
+PERMUTATION_STRATEGIES = ("cyclic", "latin", "random")
+
+def apply_permutation(example: Dict[str, Any], perm: List[int]) -> Dict[str, Any]:
+    """Reorder options so that new position i holds old option perm[i]; the gold
+    index follows the correct option to its new position."""
     out = copy.deepcopy(example)
-    out['options'] = new_options
-    out['answer_idx'] = new_idx
+    out['options'] = [example['options'][old_i] for old_i in perm]
+    out['answer_idx'] = perm.index(example['answer_idx'])
     return out
 
+def random_permutation(n: int, seed: int) -> List[int]:
+    rng = random.Random(seed)
+    perm = list(range(n))
+    rng.shuffle(perm)
+    return perm
+
+def shuffle_options(example: Dict[str, Any], seed: int) -> Dict[str, Any]:
+    return apply_permutation(example, random_permutation(len(example['options']), seed))
+
+def cyclic_permutations(n: int, k: Optional[int] = None) -> List[List[int]]:
+    """k rotations of n options, evenly spaced. With k = n every option visits every
+    position exactly once, the fewest calls that remove position bias; larger k
+    would only repeat rotations, so it is capped at n."""
+    k = n if k is None else min(k, n)
+    shifts = sorted({round(j * n / k) % n for j in range(k)})
+    return [[(i + s) % n for i in range(n)] for s in shifts]
+
+def latin_square_permutations(n: int, k: Optional[int] = None) -> List[List[int]]:
+    """Rows of a balanced (Williams) Latin square: like cyclic rotations every
+    option visits every position once over n rows, and for even n each option
+    also immediately follows every other option exactly once, balancing
+    neighbour effects. First row is 0, 1, n-1, 2, n-2, ...; row r adds r mod n."""
+    k = n if k is None else min(k, n)
+    first, lo, hi = [0], 1, n - 1
+    while len(first) < n:
+        first.append(lo); lo += 1
+        if len(first) < n:
+            first.append(hi); hi -= 1
+    rows = [[(v + r) % n for v in first] for r in range(n)]
+    return [rows[round(j * n / k) % n] for j in range(k)]
+
+def permutation_set(n: int, k: Optional[int], strategy: str = "cyclic", seed: int = 7) -> List[List[int]]:
+    """Deterministic set of k option permutations for an n-option question.
+    'cyclic' and 'latin' cover positions systematically; 'random' draws k seeded shuffles."""
+    if strategy == "cyclic":
+        return cyclic_permutations(n, k)
+    if strategy == "latin":
+        return latin_square_permutations(n, k)
+    if strategy == "random":
+        rng = random.Random(seed)
+        return [random_permutation(n, rng.randint(0, 10**9)) for _ in range(k or n)]
+    raise ValueError(f"Unknown permutation strategy: {strategy!r} (expected one of {PERMUTATION_STRATEGIES})")
+
 def remap_answer_letters(example: Dict[str, Any], offset: int = 1) -> Dict[str, Any]:
     """Shifts A/B/C/D label mapping by an offset, preserving correctness when
     evaluated by *content*, not label identity. This is mainly for analysis/visualization
@@ -0,0 +1,418 @@
+"""
+Batch execution mode for large offline evaluations.
+
+Instead of issuing one interactive request per item, BatchRunner packs item
+prompts into bulk jobs, submits them to a BatchBackend, polls until each job
+completes, and streams the results back through Benchmark.evaluate(). Because
+it reuses EvaluationRunner's pipeline entry points, it writes the same JSONL
+schema and supports streaming, checkpointing and resume unchanged.
+
+Backends:
+- FileBatchBackend: a file-based bulk endpoint. Each job is a directory holding
+  `requests.jsonl`; a worker (LocalBatchServer) fulfils it and writes
+  `results.jsonl`. The worker can run in-process (as a local stub for tests),
+  as a separate process, or on another host sharing the filesystem.
+
+Provider-native batch APIs plug in by implementing BatchBackend.
+
+Usage (worker process):
+    python -m src.batch serve results/batch_jobs --max-parallel 32
+"""
+
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import socket
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Set, Type
+
+from pydantic import BaseModel
+
+from .benchmark import Benchmark
+from .judge import EvaluationStage
+from .runner import EvaluationItem, EvaluationRunner
+from .ratelimit import classify_error
+from .telemetry import CallUsage
+
+# Job lifecycle states
+PENDING = "pending"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+
+def model_path(model: Type[BaseModel]) -> str:
+    """Import path ('module:QualName') used to identify a response schema in a job file."""
+    return f"{model.__module__}:{model.__qualname__}"
+
+
+def resolve_model(path: str) -> Type[BaseModel]:
+    """Import a response schema class from a path produced by model_path()."""
+    module_name, _, qualname = path.partition(":")
+    obj: Any = importlib.import_module(module_name)
+    for part in qualname.split("."):
+        obj = getattr(obj, part)
+    return obj
+
+
+class BatchBackend(ABC):
+    """
+    Interface to a bulk inference endpoint.
+
+    A request is a dict with `custom_id`, `prompt`, `system_prompt` and
+    `response_model` (see model_path()). A result is a dict with `custom_id`
+    and either `response` (JSON text matching the schema) or `error`.
+    """
+
+    @abstractmethod
+    async def submit(self, requests: List[Dict[str, Any]]) -> str:
+        """Submit a batch of requests and return its job id."""
+
+    @abstractmethod
+    async def status(self, job_id: str) -> str:
+        """Return the job state (PENDING, RUNNING, COMPLETED or FAILED)."""
+
+    @abstractmethod
+    async def results(self, job_id: str) -> AsyncIterator[Dict[str, Any]]:
+        """Yield the results of a completed job."""
+
+
+class FileBatchBackend(BatchBackend):
+    """
+    Batch backend that exchanges jobs through a shared directory.
+
+    Layout per job: `<root>/<job_id>/requests.jsonl`, `results.jsonl` and
+    `status.json`, plus a `claim` file created by the worker that runs it.
+    Status updates are written atomically and jobs are claimed with an
+    exclusive create, so submitters and workers may live in different
+    processes or on different hosts.
+    """
+
+    def __init__(self, root: str):
+        """
+        Args:
+            root: Directory holding one subdirectory per job
+        """
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def job_dir(self, job_id: str) -> str:
+        return os.path.join(self.root, job_id)
+
+    def write_status(self, job_id: str, state: str, **extra):
+        """Atomically replace the job's status file."""
+        path = os.path.join(self.job_dir(job_id), "status.json")
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"state": state, "updated_at": time.time(), **extra}, f)
+        os.replace(tmp, path)
+
+    def read_status(self, job_id: str) -> Dict[str, Any]:
+        with open(os.path.join(self.job_dir(job_id), "status.json"), encoding="utf-8") as f:
+            return json.load(f)
+
+    def claim(self, job_id: str) -> bool:
+        """
+        Atomically claim a job for this worker.
+
+        The claim file is created with O_CREAT | O_EXCL, which succeeds for
+        exactly one of several workers racing for the same job.
+
+        Returns:
+            True if this worker now owns the job, False if another worker does
+        """
+        try:
+            fd = os.open(os.path.join(self.job_dir(job_id), "claim"),
+                         os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(f"{socket.gethostname()}:{os.getpid()}\n")
+        return True
+
+    def list_jobs(self, state: Optional[str] = None) -> List[str]:
+        """Job ids in submission order, optionally filtered by state."""
+        jobs = []
+        for name in sorted(os.listdir(self.root)):
+            if not os.path.exists(os.path.join(self.root, name, "status.json")):
+                continue
+            if state is None or self.read_status(name)["state"] == state:
+                jobs.append(name)
+        return jobs
+
+    async def submit(self, requests: List[Dict[str, Any]]) -> str:
+        # Time-prefixed ids keep list_jobs() in submission order
+        job_id = f"{time.time_ns()}-{uuid.uuid4().hex[:8]}"
+        os.makedirs(self.job_dir(job_id))
+        with open(os.path.join(self.job_dir(job_id), "requests.jsonl"), "w", encoding="utf-8") as f:
+            for request in requests:
+                f.write(json.dumps(request) + "\n")
+        # Status is written last so workers never see a half-written job
+        self.write_status(job_id, PENDING, n_requests=len(requests))
+        return job_id
+
+    async def status(self, job_id: str) -> str:
+        return self.read_status(job_id)["state"]
+
+    async def results(self, job_id: str) -> AsyncIterator[Dict[str, Any]]:
+        with open(os.path.join(self.job_dir(job_id), "results.jsonl"), encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+class LocalBatchServer:
+    """
+    Worker that fulfils FileBatchBackend jobs with an ordinary async client.
+
+    Serves as the local stub endpoint for tests and small setups: it claims
+    pending jobs, runs their requests concurrently through
+    `client.complete_structured`, and writes results in the backend format.
+    """
+
+    def __init__(self, backend: FileBatchBackend, client, max_parallel: int = 16):
+        """
+        Args:
+            backend: File backend whose jobs this server processes
+            client: Async client with complete_structured()
+            max_parallel: Maximum concurrent requests across all jobs
+        """
+        self.backend = backend
+        self.client = client
+        self.semaphore = asyncio.Semaphore(max_parallel)
+
+    async def _fulfil(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        async with self.semaphore:
+            try:
+                kwargs = dict(prompt=request["prompt"],
+                              response_model=resolve_model(request["response_model"]),
+                              system_prompt=request.get("system_prompt"))
+                if hasattr(self.client, "complete_structured_with_usage"):
+                    response, usage = await self.client.complete_structured_with_usage(**kwargs)
+                    return {"custom_id": request["custom_id"],
+                            "response": response.model_dump_json(), "usage": usage.to_dict()}
+                response = await self.client.complete_structured(**kwargs)
+                return {"custom_id": request["custom_id"], "response": response.model_dump_json()}
+            except Exception as e:
+                return {"custom_id": request["custom_id"], "error": str(e),
+                        "error_class": classify_error(e)}
+
+    async def process_job(self, job_id: str) -> bool:
+        """
+        Claim one job, run every request of it and mark it completed.
+
+        Returns:
+            False if another worker had already claimed the job (it is not run)
+        """
+        if not self.backend.claim(job_id):
+            return False
+        self.backend.write_status(job_id, RUNNING)
+        job_dir = self.backend.job_dir(job_id)
+        with open(os.path.join(job_dir, "requests.jsonl"), encoding="utf-8") as f:
+            requests = [json.loads(line) for line in f if line.strip()]
+        try:
+            results = await asyncio.gather(*(self._fulfil(r) for r in requests))
+        except Exception as e:
+            self.backend.write_status(job_id, FAILED, error=str(e))
+            return True
+        tmp = os.path.join(job_dir, "results.jsonl.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            for result in results:
+                f.write(json.dumps(result) + "\n")
+        os.replace(tmp, os.path.join(job_dir, "results.jsonl"))
+        self.backend.write_status(job_id, COMPLETED, n_results=len(results))
+        return True
+
+    async def process_pending(self) -> int:
+        """Process all currently pending jobs concurrently; return how many this worker ran."""
+        jobs = self.backend.list_jobs(PENDING)
+        ran = await asyncio.gather(*(self.process_job(job_id) for job_id in jobs))
+        return sum(ran)
+
+    async def serve_forever(self, poll_interval: float = 1.0):
+        """Keep picking up pending jobs until cancelled."""
+        while True:
+            if not await self.process_pending():
+                await asyncio.sleep(poll_interval)
+
+
+class BatchRunner(EvaluationRunner):
+    """
+    Evaluation runner that submits items as bulk jobs instead of live calls.
+
+    Items are grouped into jobs of `batch_size`, with at most `max_open_jobs`
+    submitted but unfinished at any time (bounding memory just like the
+    streaming pipeline). Completed jobs are evaluated and yielded as they
+    finish, so run_benchmark(), stream_benchmark() and resume behave exactly
+    as with EvaluationRunner.
+    """
+
+    def __init__(self,
+                 backend: BatchBackend,
+                 batch_size: int = 1000,
+                 max_open_jobs: int = 4,
+                 poll_interval: float = 5.0,
+                 system_prompt: Optional[str] = None,
+                 evaluator: Optional[EvaluationStage] = None,
+                 **kwargs):
+        """
+        Args:
+            backend: Bulk endpoint to submit jobs to
+            batch_size: Maximum requests per job
+            max_open_jobs: Maximum jobs submitted but not yet collected
+            poll_interval: Seconds between job status checks
+            system_prompt: System prompt attached to every request
+                (default: the benchmark's system_prompt())
+            evaluator: Evaluation stage for the collected responses (default:
+                EvaluationStage() without a judge client)
+            **kwargs: Other EvaluationRunner options, e.g. dedupe_prompts,
+                early_stop, num_shards, shard_index or example_ids
+        """
+        super().__init__(client=None, max_parallel=max_open_jobs,
+                         evaluator=evaluator or EvaluationStage(), **kwargs)
+        self.backend = backend
+        self.batch_size = batch_size
+        self.max_open_jobs = max_open_jobs
+        self.poll_interval = poll_interval
+        self.system_prompt = system_prompt
+
+    async def _iter_inferred(
+        self,
+        benchmark: Benchmark,
+        examples: Iterable[Dict[str, Any]],
+        max_in_flight: Optional[int] = None,
+        skip_ids: Optional[Set[str]] = None,
+        stop: Optional[asyncio.Event] = None
+    ) -> AsyncIterator[EvaluationItem]:
+        """
+        Submit items in bulk jobs and yield items with their responses as jobs complete.
+
+        The inherited iter_results() evaluates them in the evaluation stage.
+
+        Args:
+            benchmark: The benchmark to evaluate
+            examples: Iterable of dataset examples (consumed lazily)
+            max_in_flight: Overrides max_open_jobs when given
+            skip_ids: item_ids to leave out (already completed in a resumed run)
+            stop: When set, no new jobs are submitted; open jobs are still collected
+
+        Yields:
+            Items with responses (or errors), job by job
+        """
+        max_open = max_in_flight or self.max_open_jobs
+        schema = benchmark.response_schema()
+        system_prompt = (self.system_prompt if self.system_prompt is not None
+                         else benchmark.system_prompt())
+        open_jobs: Dict[str, Dict[str, EvaluationItem]] = {}
+
+        async def submit(chunk: List[EvaluationItem]):
+            requests = [{
+                "custom_id": item.item_id,
+                "prompt": item.prompt,
+                "system_prompt": system_prompt,
+                "response_model": model_path(schema),
+            } for item in chunk]
+            job_id = await self.backend.submit(requests)
+            open_jobs[job_id] = {item.item_id: item for item in chunk}
+
+        chunk: List[EvaluationItem] = []
+        items = self._prepare_eval_items(benchmark, examples, skip_ids)
+        exhausted = False
+        while not exhausted or open_jobs:
+            if stop is not None and stop.is_set():
+                exhausted = True
+            # Top up submitted jobs until the open-job budget is used
+            while not exhausted and len(open_jobs) < max_open:
+                item = next(items, None)
+                if item is None:
+                    exhausted = True
+                    if chunk:
+                        await submit(chunk)
+                        chunk = []
+                    break
+                chunk.append(item)
+                if len(chunk) >= self.batch_size:
+                    await submit(chunk)
+                    chunk = []
+
+            if not open_jobs:
+                continue
+
+            # Collect every finished job; wait a poll interval if none finished
+            finished = [job_id for job_id in list(open_jobs)
+                        if await self.backend.status(job_id) in (COMPLETED, FAILED)]
+            if not finished:
+                await asyncio.sleep(self.poll_interval)
+                continue
+            for job_id in finished:
+                async for item in self._collect(benchmark, job_id, open_jobs.pop(job_id)):
+                    yield item
+
+    async def _collect(self,
+                       benchmark: Benchmark,
+                       job_id: str,
+                       job_items: Dict[str, EvaluationItem]) -> AsyncIterator[EvaluationItem]:
+        """Parse the results of one finished job."""
+        schema = benchmark.response_schema()
+        if await self.backend.status(job_id) == FAILED:
+            for item in job_items.values():
+                item.metadata['error'] = f"batch job {job_id} failed"
+                for out in self._fan_out(item):
+                    yield out
+            return
+
+        async for result in self.backend.results(job_id):
+            item = job_items.pop(result["custom_id"], None)
+            if item is None:
+                continue
+            item.metadata['batch_job'] = job_id
+            if result.get("usage") is not None:
+                self._record_usage(item, CallUsage(**result["usage"]), 0)
+            try:
+                if result.get("error") is not None:
+                    item.metadata['error_class'] = result.get("error_class", "fatal")
+                    raise RuntimeError(result["error"])
+                item.parsed_response = schema.model_validate_json(result["response"])
+            except Exception as e:
+                item.metadata['error'] = str(e)
+                item.evaluation = None
+            for out in self._fan_out(item):
+                yield out
+
+        # Requests the backend silently dropped are reported, not lost
+        for item in job_items.values():
+            item.metadata['error'] = f"missing from batch job {job_id} results"
+            for out in self._fan_out(item):
+                yield out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve file-based batch jobs")
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve = sub.add_parser("serve", help="Process pending jobs in a batch directory")
+    serve.add_argument("job_dir", help="Directory shared with BatchRunner (--batch-dir)")
+    serve.add_argument("--max-parallel", type=int, default=16,
+                       help="Maximum concurrent API calls")
+    serve.add_argument("--poll-interval", type=float, default=1.0,
+                       help="Seconds between scans for new jobs")
+    serve.add_argument("--once", action="store_true",
+                       help="Process currently pending jobs and exit")
+    args = parser.parse_args()
+
+    from .api import GrokClient
+
+    server = LocalBatchServer(FileBatchBackend(args.job_dir), GrokClient(),
+                              max_parallel=args.max_parallel)
+    if args.once:
+        asyncio.run(server.process_pending())
+    else:
+        asyncio.run(server.serve_forever(args.poll_interval))
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
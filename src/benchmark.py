@@ -6,8 +6,10 @@ must implement. Benchmarks handle dataset loading, prompt formatting, response
 schema definition, and correctness evaluation.
 """
 
+import string
 from abc import ABC, abstractmethod
-from typing import Iterator, Dict, Any, Type, TypeVar, Generic
+from contextvars import ContextVar
+from typing import Iterable, Dict, Any, Hashable, Optional, Type, TypeVar, Generic
 from pydantic import BaseModel
 
 # Generic type variable for the response schema
@@ -17,6 +19,25 @@ TResponse = TypeVar('TResponse', bound=BaseModel)
 # Can be bool for binary, Enum for categorical, or any custom type
 TEvaluation = TypeVar('TEvaluation')
 
+# Evaluation stage running the current evaluate() call; set by
+# judge.EvaluationStage for the duration of each call, so benchmarks shared
+# by several stages (e.g. a sweep) route judge calls to the right one
+current_judge_stage: ContextVar = ContextVar('current_judge_stage', default=None)
+
+def template_prefix(template: str) -> str:
+    """
+    Return the literal text of a str.format template before its first placeholder.
+
+    This is the part of every prompt rendered from the template that is
+    identical across examples, i.e. the prefix a provider can cache.
+    """
+    prefix = []
+    for literal, field, _, _ in string.Formatter().parse(template):
+        prefix.append(literal)
+        if field is not None:
+            break
+    return "".join(prefix)
+
 
 class Benchmark(ABC, Generic[TResponse, TEvaluation]):
     """
@@ -36,14 +57,19 @@ class Benchmark(ABC, Generic[TResponse, TEvaluation]):
     2. format_prompt() converts each example into a model prompt
     3. response_schema() provides the Pydantic schema for structured outputs
     4. Model generates a structured response (handled by EvaluationRunner)
-    5. evaluate() checks response quality (may involve async LLM judge calls)
+    5. evaluate() checks response quality (may involve async LLM judge calls,
+       made through judge() in a separate evaluation stage)
     """
 
     @abstractmethod
-    def load_dataset(self, path: str) -> Iterator[Dict[str, Any]]:
+    def load_dataset(self, path: str) -> Iterable[Dict[str, Any]]:
         """
         Load and yield dataset examples from a file.
 
+        May return a generator or a lazily parsed dataset such as
+        datasets.indexed.IndexedJsonl, which lets the runner count, filter
+        and reorder examples without parsing them all.
+
         Each yielded dictionary represents one example in the dataset's native format.
         The structure is benchmark-specific, but typically includes:
         - 'id': unique identifier for the example
@@ -58,8 +84,8 @@ class Benchmark(ABC, Generic[TResponse, TEvaluation]):
         Args:
             path: Path to the dataset file (typically JSONL format)
 
-        Yields:
-            Dictionary containing a single dataset example in its native format
+        Returns:
+            Iterable of dictionaries, each a single dataset example in its native format
         """
         pass
 
@@ -156,15 +182,91 @@ class Benchmark(ABC, Generic[TResponse, TEvaluation]):
                 return CodeEvaluation(True, True, False, [True, True, False])
 
             LLM-based judge (Essay grading):
-                # Make async LLM call to judge model
-                judge_response = await self.judge_client.complete(
+                # Judge call through the runner's evaluation stage (see judge())
+                judge_response = await self.judge(
                     prompt=f"Grade this essay: {response.text}",
-                    schema=EssayGrade
+                    response_model=EssayGrade
                 )
                 return judge_response.grade  # Returns Enum from judge
         """
         pass
 
+    # True if evaluate() makes judge calls; such benchmarks are rescored in
+    # the evaluation stage rather than in a process pool (see src/rescore.py)
+    uses_judge = False
+
+    async def judge(self,
+                    prompt: str,
+                    response_model: Type[BaseModel],
+                    system_prompt: Optional[str] = None) -> BaseModel:
+        """
+        Make an LLM-judge call from evaluate().
+
+        The call goes through the evaluation stage (see src/judge.py): the
+        judge client and its response cache, and a concurrency limit and
+        retries of its own, so judge calls never hold inference slots.
+
+        Args:
+            prompt: Judge prompt
+            response_model: Pydantic model class of the judge's verdict
+            system_prompt: Optional judge system prompt
+
+        Returns:
+            Parsed judge response
+
+        Raises:
+            RuntimeError: If evaluate() is not run by an evaluation stage with a judge client
+        """
+        stage = current_judge_stage.get()
+        if stage is None:
+            raise RuntimeError(f"{self.name}: judge() called outside an evaluation stage")
+        return await stage.judge(prompt, response_model, system_prompt)
+
+    def system_prompt(self) -> Optional[str]:
+        """
+        Return the system prompt sent with every request, or None for no system message.
+
+        The system prompt is identical for all examples, so it forms the start
+        of the shared prefix that provider-side prompt caching can reuse.
+        """
+        return None
+
+    def prompt_prefix(self, example: Dict[str, Any]) -> str:
+        """
+        Return the static leading part of format_prompt(example).
+
+        Prompts should put everything that does not depend on the example
+        (instructions, few-shot demonstrations) first and the per-item content
+        last, so that consecutive requests share a long cacheable prefix. The
+        runner groups and orders requests by this prefix (together with
+        system_prompt()). Prefixes may differ between examples, e.g. per-subject
+        few-shot sets; the default is no declared prefix.
+
+        Args:
+            example: A dataset example dictionary
+
+        Returns:
+            A string that format_prompt(example) starts with
+        """
+        return ""
+
+    def vote_key(self, response: TResponse) -> Hashable:
+        """
+        Return the part of a response that self-consistency votes on.
+
+        Two samples vote for the same answer when their keys are equal. The
+        default compares entire responses; benchmarks whose responses carry
+        free-form reasoning should override this to return only the answer
+        (e.g. GSM8K votes on final_answer, not on the reasoning text).
+
+        Args:
+            response: Structured response from the model
+
+        Returns:
+            Hashable answer key
+        """
+        return response.model_dump_json()
+
     @property
     @abstractmethod
     def name(self) -> str:
@@ -1,9 +1,9 @@
 """GSM8K math reasoning benchmark implementation."""
 
-from typing import Dict, Any, Iterator, Type
+from typing import Dict, Any, Hashable, Iterable, Optional, Type
 from pydantic import BaseModel, Field
 
-from ..benchmark import Benchmark
+from ..benchmark import Benchmark, template_prefix
 from ..datasets.gsm8k import read_gsm8k_jsonl
 
 
@@ -21,14 +21,17 @@ class GSM8KBenchmark(Benchmark[GSM8KResponse, bool]):
     the gold answer, incorrect (False) otherwise.
     """
 
-    def __init__(self, prompt_template: str | None = None):
+    def __init__(self, prompt_template: str | None = None, system_prompt: str | None = None):
         """
         Initialize GSM8K benchmark.
 
         Args:
             prompt_template: Optional custom prompt template with {question} placeholder
+            system_prompt: Optional system prompt (default: none)
         """
         self.prompt_template = prompt_template or self._default_prompt()
+        self._system_prompt = system_prompt
+        self._prefix = template_prefix(self.prompt_template)
 
     def _default_prompt(self) -> str:
         return """Solve the following math word problem. Think step by step, then provide the final numeric answer.
@@ -37,7 +40,15 @@ class GSM8KBenchmark(Benchmark[GSM8KResponse, bool]):
 
 Provide your reasoning and the final answer."""
 
-    def load_dataset(self, path: str) -> Iterator[Dict[str, Any]]:
+    def system_prompt(self) -> Optional[str]:
+        """Return the system prompt shared by all problems."""
+        return self._system_prompt
+
+    def prompt_prefix(self, example: Dict[str, Any]) -> str:
+        """Return the template text before the first placeholder."""
+        return self._prefix
+
+    def load_dataset(self, path: str) -> Iterable[Dict[str, Any]]:
         """Load GSM8K dataset from JSONL file."""
         return read_gsm8k_jsonl(path)
 
@@ -59,6 +70,10 @@ Provide your reasoning and the final answer."""
         gold = int(example["answer"])
         return response.final_answer == gold
 
+    def vote_key(self, response: GSM8KResponse) -> Hashable:
+        """Vote on the numeric answer only; reasoning text differs between samples."""
+        return response.final_answer
+
     @property
     def name(self) -> str:
         return "gsm8k"
@@ -1,9 +1,9 @@
 """Multiple Choice Question benchmark implementation."""
 
-from typing import Dict, Any, Iterator, Type
+from typing import Dict, Any, Hashable, Iterable, Optional, Type
 from pydantic import BaseModel, Field
 
-from ..benchmark import Benchmark
+from ..benchmark import Benchmark, template_prefix
 from ..datasets.mcq_json import read_mcq_jsonl
 
 
@@ -20,14 +20,17 @@ class MCQBenchmark(Benchmark[MCQResponse, bool]):
     the gold answer index, incorrect (False) otherwise.
     """
 
-    def __init__(self, prompt_template: str | None = None):
+    def __init__(self, prompt_template: str | None = None, system_prompt: str | None = None):
         """
         Initialize MCQ benchmark.
 
         Args:
             prompt_template: Optional custom prompt template with {question} and {options_block} placeholders
+            system_prompt: Optional system prompt (default: none)
         """
         self.prompt_template = prompt_template or self._default_prompt()
+        self._system_prompt = system_prompt
+        self._prefix = template_prefix(self.prompt_template)
 
     def _default_prompt(self) -> str:
         return """You will be given a question and multiple answer options.
@@ -41,7 +44,15 @@ Options:
 
 Reply with just the letter (A, B, C, ...)."""
 
-    def load_dataset(self, path: str) -> Iterator[Dict[str, Any]]:
+    def system_prompt(self) -> Optional[str]:
+        """Return the system prompt shared by all questions."""
+        return self._system_prompt
+
+    def prompt_prefix(self, example: Dict[str, Any]) -> str:
+        """Return the template text before the first placeholder."""
+        return self._prefix
+
+    def load_dataset(self, path: str) -> Iterable[Dict[str, Any]]:
         """Load MCQ dataset from JSONL file."""
         return read_mcq_jsonl(path)
 
@@ -76,6 +87,10 @@ Reply with just the letter (A, B, C, ...)."""
         # Compare to gold answer
         return pred_idx == example["answer_idx"]
 
+    def vote_key(self, response: MCQResponse) -> Hashable:
+        """Vote on the normalized answer letter."""
+        return response.answer.strip().upper()
+
     @property
     def name(self) -> str:
         return "mcq"
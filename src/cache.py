@@ -0,0 +1,307 @@
+"""
+Persistent, content-addressed cache for structured model responses.
+
+Every structured completion is fully determined (up to sampling noise) by the
+model, the prompts, the sampling parameters and the response schema. This module
+hashes all of those inputs into a single key and stores the validated response
+JSON in a local SQLite database, so re-running an evaluation with unchanged
+inputs costs zero API calls.
+
+The cache supports:
+- LRU eviction bounded by entry count and/or total payload size
+- Hit/miss counters for reporting
+- A read-only "replay" mode that never writes and fails loudly on misses,
+  guaranteeing a run makes no API calls at all
+"""
+
+import functools
+import hashlib
+import json
+import os
+import pathlib
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Type
+
+from pydantic import BaseModel
+
+
+class CacheMissError(KeyError):
+    """Raised in replay mode when a request has no cached response."""
+
+
+@functools.lru_cache(maxsize=None)
+def _schema_of(response_model: Type[BaseModel]) -> Dict[str, Any]:
+    """JSON schema of a response model, memoized since keys are computed per request."""
+    return response_model.model_json_schema()
+
+
+def make_cache_key(model: str,
+                   prompt: str,
+                   system_prompt: Optional[str],
+                   params: Dict[str, Any],
+                   response_model: Optional[Type[BaseModel]] = None) -> str:
+    """
+    Compute the content-addressed key for a completion request.
+
+    The key covers everything that can change the model output: model name,
+    user prompt, system prompt, sampling parameters, and the JSON schema of the
+    structured response model (so editing a Pydantic field invalidates old entries).
+
+    Args:
+        model: Model identifier
+        prompt: User prompt text
+        system_prompt: Optional system prompt
+        params: Sampling parameters (temperature, top_p, max_tokens, ...)
+        response_model: Optional Pydantic model class for structured outputs
+
+    Returns:
+        Hex SHA-256 digest identifying the request
+    """
+    payload = {
+        "model": model,
+        "prompt": prompt,
+        "system_prompt": system_prompt,
+        "params": params,
+        "schema": _schema_of(response_model) if response_model is not None else None,
+    }
+    blob = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+# Hits whose last-access update is buffered before it is written
+_TOUCH_BATCH = 100
+# Writes after which the in-memory totals are recounted from the database
+_RECOUNT_EVERY = 1000
+
+
+class ResponseCache:
+    """
+    Disk-backed response cache stored in a single SQLite file.
+
+    Entries are (key -> response JSON) rows with a last-access timestamp used
+    for LRU eviction. Eviction runs after writes once either bound is exceeded:
+    the least recently used entries are removed until the cache is back under
+    both `max_entries` and `max_bytes`.
+
+    Entry and byte totals are kept in memory (counted once at open, adjusted
+    on every write and eviction, and recounted every `_RECOUNT_EVERY` writes
+    so processes sharing the file converge), so a write does not scan the
+    table. Cache hits do not commit: their last-access times are buffered and
+    written in batches of `_TOUCH_BATCH`, before every write, and by flush(),
+    stats() and close().
+    """
+
+    def __init__(self,
+                 path: str,
+                 max_entries: Optional[int] = None,
+                 max_bytes: Optional[int] = None,
+                 read_only: bool = False):
+        """
+        Open (or create) a response cache.
+
+        Args:
+            path: Path to the SQLite database file
+            max_entries: Optional upper bound on number of cached responses
+            max_bytes: Optional upper bound on total cached payload size in bytes
+            read_only: Replay mode; never write, and raise CacheMissError on misses
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.read_only = read_only
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if read_only and not os.path.exists(path):
+            raise FileNotFoundError(f"Replay mode requires an existing cache file: {path}")
+
+        # The runner calls into the cache from a single event loop thread, but a
+        # lock keeps the connection safe if the client is shared across threads.
+        self._lock = threading.Lock()
+        # Last-access times of hits not yet written (key -> timestamp)
+        self._touched: Dict[str, float] = {}
+        self._writes = 0
+        if read_only:
+            # Replays must leave the recording untouched and work from read-only
+            # files and mounts: no journal mode change, no schema writes. A
+            # cache whose writers have all closed has no -wal file and is opened
+            # immutable, so SQLite creates no -shm/-wal files next to it either
+            uri = pathlib.Path(path).absolute().as_uri() + "?mode=ro"
+            if not os.path.exists(path + "-wal"):
+                uri += "&immutable=1"
+            self._conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            self._count_entries()
+            return
+
+        parent = os.path.dirname(os.path.abspath(path))
+        os.makedirs(parent, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                   key TEXT PRIMARY KEY,
+                   value TEXT NOT NULL,
+                   size INTEGER NOT NULL,
+                   created_at REAL NOT NULL,
+                   last_access REAL NOT NULL
+               )"""
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS responses_last_access ON responses(last_access)"
+        )
+        self._conn.commit()
+        self._count_entries()
+
+    def _count_entries(self):
+        """Recount the in-memory entry and byte totals from the database."""
+        self._entries, self._bytes = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+
+    def _write_touches(self):
+        """Write buffered last-access times (the caller commits)."""
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE responses SET last_access = ? WHERE key = ?",
+                [(ts, key) for key, ts in self._touched.items()],
+            )
+            self._touched.clear()
+
+    def flush(self):
+        """Write the buffered last-access times of recent hits."""
+        with self._lock:
+            if self._touched:
+                self._write_touches()
+                self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up a cached response payload.
+
+        Args:
+            key: Request key from make_cache_key()
+
+        Returns:
+            Cached JSON payload, or None on a miss (outside replay mode)
+
+        Raises:
+            CacheMissError: On a miss when the cache is in read-only replay mode
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                if self.read_only:
+                    raise CacheMissError(f"No cached response for key {key[:12]}... (replay mode)")
+                return None
+
+            self.hits += 1
+            if not self.read_only:
+                # Touch the entry so LRU eviction keeps recently used responses
+                self._touched[key] = time.time()
+                if len(self._touched) >= _TOUCH_BATCH:
+                    self._write_touches()
+                    self._conn.commit()
+            return row[0]
+
+    def put(self, key: str, value: str):
+        """
+        Store a response payload (no-op in replay mode).
+
+        Args:
+            key: Request key from make_cache_key()
+            value: JSON payload to store
+        """
+        if self.read_only:
+            return
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        with self._lock:
+            # Eviction must see the latest access times
+            self._write_touches()
+            old = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                """INSERT OR REPLACE INTO responses (key, value, size, created_at, last_access)
+                   VALUES (?, ?, ?, ?, ?)""",
+                (key, value, size, now, now),
+            )
+            if old is None:
+                self._entries += 1
+                self._bytes += size
+            else:
+                self._bytes += size - old[0]
+            self._writes += 1
+            if self._writes % _RECOUNT_EVERY == 0:
+                self._count_entries()
+            self._evict()
+            self._conn.commit()
+
+    def get_model(self, key: str, response_model: Type[BaseModel]) -> Optional[BaseModel]:
+        """Look up a cached response and validate it into `response_model`."""
+        value = self.get(key)
+        if value is None:
+            return None
+        return response_model.model_validate_json(value)
+
+    def put_model(self, key: str, response: BaseModel):
+        """Store a Pydantic response under `key`."""
+        self.put(key, response.model_dump_json())
+
+    def _evict(self):
+        """Drop least recently used entries until both size bounds hold."""
+        excess_entries = self._entries - self.max_entries if self.max_entries is not None else 0
+        excess_bytes = self._bytes - self.max_bytes if self.max_bytes is not None else 0
+        if excess_entries <= 0 and excess_bytes <= 0:
+            return
+        # Walk entries oldest-first, collecting keys until both bounds hold
+        doomed = []
+        freed = 0
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM responses ORDER BY last_access ASC"
+        ):
+            if excess_entries <= 0 and excess_bytes <= 0:
+                break
+            doomed.append((key,))
+            freed += size
+            excess_entries -= 1
+            excess_bytes -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", doomed)
+        self._entries -= len(doomed)
+        self._bytes -= freed
+        self.evictions += len(doomed)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current cache occupancy."""
+        self.flush()
+        with self._lock:
+            count, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": count,
+            "bytes": total,
+            "read_only": self.read_only,
+        }
+
+    def close(self):
+        """Write buffered access times and close the underlying database connection."""
+        self.flush()
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+        return count
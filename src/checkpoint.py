@@ -0,0 +1,154 @@
+"""
+Crash-safe, append-only checkpointing for evaluation runs.
+
+Results are appended to the output JSONL one line per finished item, with
+fsync batched by record count and elapsed time, so a run that dies part-way
+loses at most the last unsynced batch. On resume, the existing file is indexed
+by item_id: successfully evaluated items are skipped, while items whose
+metadata recorded an error (and any torn final line from the crash) are
+dropped so they get re-run.
+"""
+
+import json
+import os
+import time
+from typing import Any, Dict, Iterator, Optional, TextIO
+
+
+class CheckpointLog:
+    """
+    Append-only JSONL writer with batched fsync.
+
+    Every record is flushed to the OS immediately (so other processes can tail
+    the file), but the comparatively expensive fsync to stable storage happens
+    only every `fsync_every` records or `fsync_interval` seconds, whichever
+    comes first.
+    """
+
+    def __init__(self,
+                 path: str,
+                 append: bool = False,
+                 fsync_every: int = 100,
+                 fsync_interval: float = 1.0):
+        """
+        Open a checkpoint log.
+
+        Args:
+            path: Path to the JSONL file
+            append: Keep existing records (resume) instead of truncating
+            fsync_every: Sync to disk after this many unsynced records
+            fsync_interval: Sync to disk when this many seconds passed since the last sync
+        """
+        self.path = path
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self._file: Optional[TextIO] = open(path, 'a' if append else 'w', encoding='utf-8')
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def write(self, record: Dict[str, Any]):
+        """Append one record, syncing to disk if the batch thresholds are hit."""
+        self._file.write(json.dumps(record) + '\n')
+        self._file.flush()
+        self._unsynced += 1
+        if (self._unsynced >= self.fsync_every
+                or time.monotonic() - self._last_sync >= self.fsync_interval):
+            self.sync()
+
+    def sync(self):
+        """Force all written records to stable storage."""
+        if self._file is None or self._unsynced == 0:
+            return
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def close(self):
+        """Sync outstanding records and close the file."""
+        if self._file is None:
+            return
+        self.sync()
+        self._file.close()
+        self._file = None
+
+    def __enter__(self) -> 'CheckpointLog':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def iter_checkpoint_rows(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Yield parsed rows from a checkpoint file, skipping a torn trailing line.
+
+    A crash mid-write can leave the final line incomplete; any line that fails
+    to parse is treated as never written.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def prepare_resume(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Compact a checkpoint file for resumption and return its remaining rows.
+
+    Keeps the latest successful row per item_id and drops rows whose metadata
+    has an `error` (they will be re-run) as well as unparseable lines. The file
+    is rewritten atomically so that appending can continue from a clean state.
+
+    Compaction streams the file twice: the first pass maps each item_id to the
+    byte offset of its last successful row, the second copies those lines
+    verbatim. Memory is proportional to the number of items, not the size of
+    the rows.
+
+    Args:
+        path: Results JSONL written by a previous (possibly interrupted) run
+
+    Returns:
+        Lazy iterator over the retained rows, i.e. items that do not need to
+        be re-run. Empty if the file does not exist yet.
+    """
+    if not os.path.exists(path):
+        return iter(())
+
+    # Later rows win so that a successful rerun supersedes an earlier attempt
+    last_good: Dict[str, int] = {}
+    with open(path, 'rb') as f:
+        offset = 0
+        for line in f:
+            line_offset, offset = offset, offset + len(line)
+            try:
+                row = json.loads(line)
+            except ValueError:
+                continue
+            item_id = row.get('item_id') if isinstance(row, dict) else None
+            if item_id is None:
+                continue
+            if (row.get('metadata') or {}).get('error') is not None:
+                last_good.pop(item_id, None)
+            else:
+                last_good[item_id] = line_offset
+    keep = set(last_good.values())
+    del last_good
+
+    tmp_path = path + '.tmp'
+    with open(path, 'rb') as src, open(tmp_path, 'wb') as dst:
+        offset = 0
+        for line in src:
+            line_offset, offset = offset, offset + len(line)
+            if line_offset in keep:
+                dst.write(line if line.endswith(b'\n') else line + b'\n')
+        dst.flush()
+        os.fsync(dst.fileno())
+    os.replace(tmp_path, path)
+
+    return iter_checkpoint_rows(path)
@@ -0,0 +1,266 @@
+"""
+Columnar (Parquet) results store, written alongside the JSONL results.
+
+JSONL rows repeat the full prompt and example on every row, and analysis has
+to parse all of it even when it only needs correctness. The columnar store is
+a directory with two Parquet files:
+- results.parquet: one row per item with the columns analysis uses
+  (ids, correctness, answer index, shuffle id, error) promoted to typed
+  columns; the response, evaluation and remaining metadata kept as JSON
+  strings; and the prompt and example replaced by content hashes
+- texts.parquet: each distinct prompt and example stored once, by hash
+
+Readers load only the columns they ask for, and rebuild full JSONL-style
+rows (joined with the text table) only on request.
+
+Requires pyarrow (pip install pyarrow), which is optional for the rest of
+the harness.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+
+from .checkpoint import iter_checkpoint_rows
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None  # type: ignore
+    pq = None  # type: ignore
+
+RESULTS_FILE = "results.parquet"
+TEXTS_FILE = "texts.parquet"
+
+# Columns needed by the analysis summaries and aggregates (no prompt/example text)
+ANALYSIS_COLUMNS = ["item_id", "group_id", "correct", "evaluation", "parsed_response",
+                    "answer_idx", "shuffle_id", "error", "metadata"]
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError("pyarrow required for columnar results. Run: pip install pyarrow")
+
+
+def _results_schema() -> 'pa.Schema':
+    return pa.schema([
+        ("item_id", pa.string()),
+        ("group_id", pa.string()),
+        ("prompt_hash", pa.string()),
+        ("example_hash", pa.string()),
+        ("correct", pa.bool_()),            # Null unless the evaluation is a bool
+        ("evaluation", pa.string()),        # JSON
+        ("parsed_response", pa.string()),   # JSON
+        ("answer_idx", pa.int64()),
+        ("shuffle_id", pa.int64()),
+        ("error", pa.string()),
+        ("metadata", pa.string()),          # JSON
+    ])
+
+
+def _texts_schema() -> 'pa.Schema':
+    return pa.schema([("hash", pa.string()), ("kind", pa.string()), ("text", pa.string())])
+
+
+def text_hash(text: str) -> str:
+    """Content hash used to deduplicate prompts and examples."""
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=12).hexdigest()
+
+
+def is_columnar(path: str) -> bool:
+    """Whether `path` is a columnar results directory."""
+    return os.path.isdir(path) and os.path.exists(os.path.join(path, RESULTS_FILE))
+
+
+class ColumnarWriter:
+    """
+    Streaming writer for a columnar results directory.
+
+    Rows (as produced by EvaluationItem.to_dict()) are buffered and flushed
+    as Parquet row groups of `row_group_size` rows, so memory stays bounded;
+    only the hashes of texts already written are kept to deduplicate them.
+    """
+
+    def __init__(self, path: str, row_group_size: int = 50000):
+        """
+        Args:
+            path: Output directory (created if missing)
+            row_group_size: Rows buffered per Parquet row group
+        """
+        _require_pyarrow()
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.row_group_size = row_group_size
+        self._results = pq.ParquetWriter(os.path.join(path, RESULTS_FILE), _results_schema())
+        self._texts = pq.ParquetWriter(os.path.join(path, TEXTS_FILE), _texts_schema())
+        self._rows: Dict[str, List[Any]] = {name: [] for name in _results_schema().names}
+        self._new_texts: Dict[str, List[str]] = {"hash": [], "kind": [], "text": []}
+        self._seen: Set[str] = set()
+        self.n_rows = 0
+
+    def _add_text(self, kind: str, text: str) -> str:
+        digest = text_hash(text)
+        if digest not in self._seen:
+            self._seen.add(digest)
+            self._new_texts["hash"].append(digest)
+            self._new_texts["kind"].append(kind)
+            self._new_texts["text"].append(text)
+        return digest
+
+    def write(self, row: Dict[str, Any]):
+        """Append one results row."""
+        example = row.get("example") or {}
+        metadata = dict(row.get("metadata") or {})
+        evaluation = row.get("evaluation")
+        shuffle_id = metadata.pop("shuffle_id", None)
+        error = metadata.pop("error", None)
+        answer_idx = example.get("answer_idx")
+
+        columns = self._rows
+        columns["item_id"].append(row.get("item_id"))
+        columns["group_id"].append(row.get("group_id"))
+        columns["prompt_hash"].append(self._add_text("prompt", row.get("prompt") or ""))
+        columns["example_hash"].append(
+            self._add_text("example", json.dumps(example, sort_keys=True, ensure_ascii=False)))
+        columns["correct"].append(evaluation if isinstance(evaluation, bool) else None)
+        columns["evaluation"].append(None if evaluation is None else json.dumps(evaluation))
+        columns["parsed_response"].append(
+            None if row.get("parsed_response") is None else json.dumps(row["parsed_response"]))
+        columns["answer_idx"].append(answer_idx if isinstance(answer_idx, int) else None)
+        columns["shuffle_id"].append(shuffle_id)
+        columns["error"].append(error)
+        columns["metadata"].append(json.dumps(metadata) if metadata else None)
+        self.n_rows += 1
+
+        if len(columns["item_id"]) >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        """Write buffered rows and new texts as row groups."""
+        if self._rows["item_id"]:
+            self._results.write_table(pa.table(self._rows, schema=_results_schema()))
+            for values in self._rows.values():
+                values.clear()
+        if self._new_texts["hash"]:
+            self._texts.write_table(pa.table(self._new_texts, schema=_texts_schema()))
+            for values in self._new_texts.values():
+                values.clear()
+
+    def close(self):
+        """Flush remaining rows and finalize both Parquet files."""
+        self.flush()
+        self._results.close()
+        self._texts.close()
+
+    def __enter__(self) -> 'ColumnarWriter':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def write_columnar(rows: Iterable[Dict[str, Any]], path: str) -> int:
+    """Write results rows to a columnar directory; return the number of rows."""
+    with ColumnarWriter(path) as writer:
+        for row in rows:
+            writer.write(row)
+    return writer.n_rows
+
+
+def jsonl_to_columnar(jsonl_path: str, path: Optional[str] = None) -> str:
+    """
+    Convert a results JSONL file to a columnar directory.
+
+    Args:
+        jsonl_path: Results JSONL (e.g. written by the runner)
+        path: Output directory (default: '<jsonl_path without .jsonl>.parquet')
+
+    Returns:
+        Path of the columnar directory
+    """
+    path = path or os.path.splitext(jsonl_path)[0] + ".parquet"
+    write_columnar(iter_checkpoint_rows(jsonl_path), path)
+    return path
+
+
+def read_columns(path: str, columns: Optional[List[str]] = None) -> 'pa.Table':
+    """
+    Read selected columns of the results table.
+
+    Args:
+        path: Columnar results directory
+        columns: Column names to load (default: all)
+
+    Returns:
+        pyarrow Table with the requested columns
+    """
+    _require_pyarrow()
+    return pq.read_table(os.path.join(path, RESULTS_FILE), columns=columns)
+
+
+def read_texts(path: str) -> Dict[str, str]:
+    """Load the hash -> text side table."""
+    _require_pyarrow()
+    table = pq.read_table(os.path.join(path, TEXTS_FILE), columns=["hash", "text"])
+    return dict(zip(table.column("hash").to_pylist(), table.column("text").to_pylist()))
+
+
+def iter_rows(path: str, with_texts: bool = False) -> Iterator[Dict[str, Any]]:
+    """
+    Yield JSONL-style result rows from a columnar directory.
+
+    By default rows carry only what analysis needs: ids, evaluation, parsed
+    response, `example.answer_idx` and the full metadata (usage, error
+    class, samples used...), without loading prompt or example text. With
+    `with_texts`, rows are the full to_dict() form, joined with the text side
+    table.
+    """
+    columns = None if with_texts else ANALYSIS_COLUMNS
+    table = read_columns(path, columns)
+    texts = read_texts(path) if with_texts else None
+    for batch in table.to_batches():
+        for record in batch.to_pylist():
+            metadata = json.loads(record["metadata"]) if record.get("metadata") else {}
+            if record["shuffle_id"] is not None:
+                metadata["shuffle_id"] = record["shuffle_id"]
+            if record["error"] is not None:
+                metadata["error"] = record["error"]
+            if texts is not None:
+                example = json.loads(texts[record["example_hash"]])
+            else:
+                example = {} if record["answer_idx"] is None else {"answer_idx": record["answer_idx"]}
+            row = {
+                "item_id": record["item_id"],
+                "group_id": record["group_id"],
+                "example": example,
+                "metadata": metadata,
+                "parsed_response": (json.loads(record["parsed_response"])
+                                    if record["parsed_response"] is not None else None),
+                "evaluation": (json.loads(record["evaluation"])
+                               if record["evaluation"] is not None else None),
+            }
+            if texts is not None:
+                row["prompt"] = texts[record["prompt_hash"]]
+            yield row
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Columnar (Parquet) results store")
+    sub = parser.add_subparsers(dest="command", required=True)
+    convert = sub.add_parser("convert", help="Convert a results JSONL file to Parquet")
+    convert.add_argument("jsonl_path", help="Results JSONL file")
+    convert.add_argument("output", nargs="?", help="Output directory (default: <name>.parquet)")
+    args = parser.parse_args()
+
+    path = jsonl_to_columnar(args.jsonl_path, args.output)
+    n = read_columns(path, ["item_id"]).num_rows
+    print(f"Wrote {n} rows to {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+"""
+Run configuration files (configs/*.json).
+
+A RunConfig holds everything about a run that changes the model's outputs:
+model, sampling parameters, seed, output token limit, and the system prompt
+and prompt template files, plus how responses are streamed. The seed drives
+answer-option permutations, the early-stop processing order and the mock
+backend; it is not sent to the API, so it does not make the model's sampling
+deterministic. `run_eval --config` loads one; a sweep (src/sweep.py) expands
+one per cell of its matrix. config_hash() identifies
+a configuration, including the contents of its prompt files, so that
+results of identical configurations land in the same place.
+"""
+
+import hashlib
+import json
+from dataclasses import asdict, dataclass, fields
+from typing import Any, Dict, Optional
+
+from .api import DEFAULT_MAX_TOKENS, DEFAULT_MODEL, DEFAULT_TEMPERATURE, DEFAULT_TOP_P, GrokClient
+from .benchmark import Benchmark
+from .benchmarks import GSM8KBenchmark, MCQBenchmark
+from .cache import ResponseCache
+
+BENCHMARKS = {"mcq": MCQBenchmark, "gsm8k": GSM8KBenchmark}
+
+
+def _read_text(path: str) -> str:
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read().strip()
+
+
+def config_hash(config: Dict[str, Any]) -> str:
+    """Short stable hash of a JSON-serializable configuration."""
+    canonical = json.dumps(config, sort_keys=True, separators=(',', ':'))
+    return hashlib.blake2b(canonical.encode('utf-8'), digest_size=6).hexdigest()
+
+
+@dataclass
+class RunConfig:
+    """Model, sampling and prompt settings of a run (the keys of configs/config.example.json)."""
+    model: str = DEFAULT_MODEL
+    temperature: float = DEFAULT_TEMPERATURE
+    top_p: float = DEFAULT_TOP_P
+    seed: int = 7                               # Permutations, early-stop order, mock backend; not sent to the API
+    max_output_tokens: int = DEFAULT_MAX_TOKENS
+    system_prompt_path: Optional[str] = None    # Default: no system prompt
+    prompt_template_path: Optional[str] = None  # str.format template; default: the benchmark's own
+    stream: bool = False                        # Stream responses (TTFT, inter-token latency)
+    token_budget: Optional[int] = None          # Streaming: abort generations beyond this many tokens
+    stall_timeout_s: Optional[float] = None     # Streaming: abort streams idle this long
+
+    # Keys that change how responses are fetched, not what they are
+    _TRANSPORT_KEYS = ("stream", "stall_timeout_s")
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'RunConfig':
+        """
+        Build a config from a dict, e.g. parsed from a config file.
+
+        Raises:
+            ValueError: On keys that are not RunConfig fields
+        """
+        known = {f.name for f in fields(cls)}
+        unknown = sorted(set(data) - known)
+        if unknown:
+            raise ValueError(f"Unknown config keys {unknown}; expected some of {sorted(known)}")
+        return cls(**data)
+
+    @classmethod
+    def load(cls, path: str) -> 'RunConfig':
+        """Load a config file."""
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    def identity(self) -> Dict[str, Any]:
+        """
+        The config plus digests of its prompt files, so that editing a prompt changes the hash.
+
+        Streaming settings are left out (streamed and unstreamed responses are
+        the same), as is an unset token budget, so they do not move results.
+        """
+        identity = {k: v for k, v in self.to_dict().items() if k not in self._TRANSPORT_KEYS}
+        if identity["token_budget"] is None:
+            del identity["token_budget"]
+        for key in ("system_prompt_path", "prompt_template_path"):
+            if identity[key] is not None:
+                identity[key.replace("_path", "_digest")] = config_hash({"text": _read_text(identity[key])})
+        return identity
+
+    def make_benchmark(self, name: str) -> Benchmark:
+        """Benchmark `name` ('mcq' or 'gsm8k') using this config's prompt files."""
+        if name not in BENCHMARKS:
+            raise ValueError(f"Unknown benchmark {name!r}; expected one of {sorted(BENCHMARKS)}")
+        template = _read_text(self.prompt_template_path) if self.prompt_template_path else None
+        system_prompt = _read_text(self.system_prompt_path) if self.system_prompt_path else None
+        return BENCHMARKS[name](prompt_template=template, system_prompt=system_prompt)
+
+    def make_client(self, cache: Optional[ResponseCache] = None, pool=None) -> GrokClient:
+        """xAI client with this config's model and sampling parameters, on `pool`'s connections if given."""
+        kwargs = dict(model=self.model, temperature=self.temperature, top_p=self.top_p,
+                      max_tokens=self.max_output_tokens, cache=cache, stream=self.stream,
+                      token_budget=self.token_budget, stall_timeout=self.stall_timeout_s)
+        return pool.client(**kwargs) if pool is not None else GrokClient(**kwargs)
@@ -0,0 +1,283 @@
+"""
+Indexed, cached access to JSONL datasets.
+
+The first time a dataset is opened, every line is parsed and validated
+once to record its byte offsets, line number and example id. The index is
+cached on disk (see DEFAULT_CACHE_DIR) and keyed by the file's size and
+mtime, with a content hash to recognise a file that was only touched. Cache
+files are .npz archives of plain int64 arrays plus JSON (ids and validity
+key), loaded without pickle, so a cache directory shared between hosts
+cannot be used to run code.
+Later opens load the index instead of reparsing the file. Examples are
+then parsed lazily from a memory map, so:
+- len(), ids and id lookups need no parsing at all
+- a shard, a subset or a shuffled order parses only the examples it yields
+- a run's first request does not wait for the whole dataset to load
+
+Lines are parsed with orjson when it is installed (pip install orjson) and
+the standard library otherwise. Malformed lines and failed validation raise
+DatasetFormatError with the line number.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import zipfile
+from array import array
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    orjson = None  # type: ignore
+    _loads = json.loads
+
+CACHE_VERSION = 2
+_INDEX_ARRAYS = ("starts", "ends", "lines")
+DEFAULT_CACHE_DIR = os.environ.get(
+    "GROK_EVALS_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "grok-evals", "datasets"))
+
+# Validators raise ValueError with a message describing what is wrong
+Validator = Callable[[Dict[str, Any]], None]
+
+
+class DatasetFormatError(ValueError):
+    """A dataset line that is not valid JSON or fails validation."""
+
+    def __init__(self, path: str, line: int, message: str):
+        super().__init__(f"{path}, line {line}: {message}")
+        self.path = path
+        self.line = line
+
+
+def _file_hash(path: str) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _build_index(path: str, validate: Optional[Validator]) -> Dict[str, Any]:
+    """Parse and validate every line; return offsets, line numbers and ids."""
+    starts, ends, lines = array('q'), array('q'), array('q')
+    ids: List[Any] = []
+    offset = 0
+    with open(path, 'rb') as f:
+        for line_no, raw in enumerate(f, 1):
+            start, offset = offset, offset + len(raw)
+            body = raw.strip()
+            if not body:
+                continue
+            try:
+                example = _loads(body)
+            except ValueError as e:
+                raise DatasetFormatError(path, line_no, f"invalid JSON ({e})") from None
+            if not isinstance(example, dict):
+                raise DatasetFormatError(path, line_no, "expected a JSON object")
+            if validate is not None:
+                try:
+                    validate(example)
+                except ValueError as e:
+                    raise DatasetFormatError(path, line_no, str(e)) from None
+            starts.append(start)
+            ends.append(offset)
+            lines.append(line_no)
+            # Same default as the runner: position among the examples
+            ids.append(example.get('id', f'item_{len(ids)}'))
+    return {"starts": starts, "ends": ends, "lines": lines, "ids": ids}
+
+
+def _cache_path(path: str, validate: Optional[Validator], cache_dir: str) -> str:
+    validator = getattr(validate, '__qualname__', '') if validate is not None else ''
+    key = hashlib.blake2b(f"{os.path.abspath(path)}\x00{validator}".encode('utf-8'),
+                          digest_size=16).hexdigest()
+    return os.path.join(cache_dir, f"{key}.idx.npz")
+
+
+def _write_cache(cache_path: str, cached: Dict[str, Any]):
+    """Write {version, size, mtime_ns, hash, index} as int64 arrays plus a JSON 'meta' entry."""
+    index = cached["index"]
+    meta = {k: v for k, v in cached.items() if k != "index"}
+    meta["ids"] = index["ids"]
+    # The cache is an optimization: an unwritable cache directory is not an error
+    try:
+        meta_bytes = json.dumps(meta).encode('utf-8')
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, meta=np.frombuffer(meta_bytes, dtype=np.uint8),
+                     **{name: np.frombuffer(index[name], dtype=np.int64) for name in _INDEX_ARRAYS})
+        os.replace(tmp_path, cache_path)
+    except (OSError, TypeError, ValueError):
+        pass
+
+
+def _read_cache(cache_path: str) -> Optional[Dict[str, Any]]:
+    """Read a cache file written by _write_cache(); None if missing or unreadable."""
+    try:
+        with np.load(cache_path, allow_pickle=False) as data:
+            meta = json.loads(data["meta"].tobytes())
+            index: Dict[str, Any] = {name: array('q', data[name].astype(np.int64).tobytes())
+                                     for name in _INDEX_ARRAYS}
+    except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+        return None
+    index["ids"] = meta.pop("ids")
+    return {**meta, "index": index}
+
+
+def load_index(path: str, validate: Optional[Validator] = None,
+               cache_dir: Optional[str] = DEFAULT_CACHE_DIR) -> Dict[str, Any]:
+    """
+    Index of a JSONL dataset, from the cache when it is still valid.
+
+    Args:
+        path: JSONL dataset
+        validate: Per-example validator; part of the cache key, so a file
+            validated for one benchmark is revalidated for another
+        cache_dir: Index cache directory (None disables caching)
+
+    Returns:
+        Dict with 'starts' / 'ends' (byte offsets), 'lines' (1-based line
+        numbers) and 'ids' of the examples, in file order
+
+    Raises:
+        DatasetFormatError: If a line is malformed or fails validation
+    """
+    st = os.stat(path)
+    cache_path = _cache_path(path, validate, cache_dir) if cache_dir else None
+    if cache_path is not None:
+        cached = _read_cache(cache_path)
+        if (cached is not None and cached.get("version") == CACHE_VERSION
+                and cached["size"] == st.st_size):
+            if cached["mtime_ns"] == st.st_mtime_ns:
+                return cached["index"]
+            if cached["hash"] == _file_hash(path):
+                # Touched but unchanged: keep the index, remember the new mtime
+                cached["mtime_ns"] = st.st_mtime_ns
+                _write_cache(cache_path, cached)
+                return cached["index"]
+
+    index = _build_index(path, validate)
+    if cache_path is not None:
+        _write_cache(cache_path, {"version": CACHE_VERSION, "size": st.st_size,
+                                  "mtime_ns": st.st_mtime_ns, "hash": _file_hash(path),
+                                  "index": index})
+    return index
+
+
+class IndexedJsonl:
+    """
+    Random-access, lazily parsed view of a JSONL dataset.
+
+    Iterating yields example dicts in view order (file order unless the
+    view was reordered with take()). Views share the index of the dataset
+    they were derived from and map the file on first use; close() (or using
+    the dataset as a context manager) releases the map.
+    """
+
+    def __init__(self, path: str, validate: Optional[Validator] = None,
+                 cache_dir: Optional[str] = DEFAULT_CACHE_DIR):
+        """
+        Args:
+            path: JSONL dataset
+            validate: Per-example validator (raises ValueError)
+            cache_dir: Index cache directory (None disables caching)
+        """
+        self.path = path
+        self._index = load_index(path, validate, cache_dir)
+        self._positions: Optional[List[int]] = None  # None: all examples in file order
+        self._mm: Optional[mmap.mmap] = None
+        self._by_id: Optional[Dict[Any, int]] = None
+
+    def _view(self, positions: List[int]) -> 'IndexedJsonl':
+        view = object.__new__(IndexedJsonl)
+        view.path = self.path
+        view._index = self._index
+        view._positions = positions
+        view._mm = None
+        view._by_id = None
+        return view
+
+    def _position_list(self) -> Iterable[int]:
+        return range(len(self._index["ids"])) if self._positions is None else self._positions
+
+    def _map(self) -> mmap.mmap:
+        if self._mm is None:
+            with open(self.path, 'rb') as f:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mm
+
+    def close(self):
+        """Release the memory map (it is reopened if the dataset is used again)."""
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+
+    def __enter__(self) -> 'IndexedJsonl':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _parse(self, position: int) -> Dict[str, Any]:
+        return _loads(self._map()[self._index["starts"][position]:self._index["ends"][position]])
+
+    def _parse_all(self, positions: Iterable[int]) -> Iterator[Dict[str, Any]]:
+        mm, starts, ends, loads = self._map(), self._index["starts"], self._index["ends"], _loads
+        for position in positions:
+            yield loads(mm[starts[position]:ends[position]])
+
+    def __len__(self) -> int:
+        return len(self._index["ids"]) if self._positions is None else len(self._positions)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        if not len(self):
+            return iter(())
+        return self._parse_all(self._position_list())
+
+    def __getitem__(self, key: Union[int, slice]) -> Union[Dict[str, Any], 'IndexedJsonl']:
+        """Example at a view position, or a sub-view for a slice."""
+        positions = self._position_list()
+        if isinstance(key, slice):
+            return self._view(list(positions[key]))
+        return self._parse(positions[key])
+
+    @property
+    def ids(self) -> List[Any]:
+        """Example ids in view order."""
+        ids = self._index["ids"]
+        return list(ids) if self._positions is None else [ids[p] for p in self._positions]
+
+    def get(self, example_id: Any) -> Dict[str, Any]:
+        """
+        Example with the given id.
+
+        Raises:
+            KeyError: If no example in the dataset has this id
+        """
+        if self._by_id is None:
+            self._by_id = {example_id: p for p, example_id in enumerate(self._index["ids"])}
+        return self._parse(self._by_id[example_id])
+
+    def take(self, positions: Iterable[int]) -> 'IndexedJsonl':
+        """View of the examples at the given view positions, in that order."""
+        current = self._position_list()
+        return self._view([current[i] for i in positions])
+
+    def identified(self, predicate: Optional[Callable[[Any], bool]] = None
+                   ) -> Iterator[Tuple[Any, Dict[str, Any]]]:
+        """
+        (id, example) pairs in view order, parsing only examples whose id passes `predicate`.
+
+        Ids are those of the file (default 'item_<i>' by file position), so
+        they stay stable in reordered or filtered views.
+        """
+        ids = self._index["ids"]
+        for position in self._position_list():
+            if predicate is None or predicate(ids[position]):
+                yield ids[position], self._parse(position)
@@ -1,5 +1,6 @@
-from typing import Iterator, Dict, Any, List
-import json
+from typing import Dict, Any
+
+from .indexed import IndexedJsonl
 
 # Expected JSONL format (one per line):
 # {
@@ -9,13 +10,16 @@ import json
 #   "answer_idx": 2
 # }
 
-def read_mcq_jsonl(path: str) -> Iterator[Dict[str, Any]]:
-    with open(path, 'r', encoding='utf-8') as f:
-        for line in f:
-            line = line.strip()
-            if not line: continue
-            ex = json.loads(line)
-            # Basic validation
-            assert isinstance(ex.get("options"), list) and len(ex["options"]) >= 2
-            assert isinstance(ex.get("answer_idx"), int)
-            yield ex
+def validate_mcq(ex: Dict[str, Any]):
+    opts = ex.get("options")
+    if not isinstance(opts, list) or len(opts) < 2:
+        raise ValueError("'options' must be a list of at least 2 options")
+    idx = ex.get("answer_idx")
+    if not isinstance(idx, int) or isinstance(idx, bool):
+        raise ValueError("'answer_idx' must be an integer")
+    if not 0 <= idx < len(opts):
+        raise ValueError(f"'answer_idx' {idx} out of range for {len(opts)} options")
+
+def read_mcq_jsonl(path: str) -> IndexedJsonl:
+    """Validated MCQ examples; raises DatasetFormatError (with the line number) on bad lines."""
+    return IndexedJsonl(path, validate=validate_mcq)
@@ -0,0 +1,296 @@
+"""
+Evaluation stage: runs Benchmark.evaluate() separately from inference.
+
+The runner's inference workers only fetch model responses. Finished
+responses are handed to an EvaluationStage, which evaluates them with its
+own worker pool. LLM-judge calls made from evaluate() (via Benchmark.judge())
+also go through the stage's own concurrency limiter, retry policy and judge
+client. So a slow judge queues behind other judge calls instead of holding
+generation workers. The judge can run on a different model than the one
+under evaluation, and has its own response cache and usage accounting.
+
+Judge results can be recomputed later from the stored parsed_responses of a
+results file, without regenerating them:
+
+    python -m src.judge gsm8k results/gsm8k.jsonl --output results/gsm8k.rejudged.jsonl \\
+        --judge-model grok-4 --judge-cache cache/judge.sqlite
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from typing import Any, AsyncIterable, AsyncIterator, Dict, Optional, Tuple, Type, TypeVar
+
+from pydantic import BaseModel
+
+from .benchmark import current_judge_stage
+from .ratelimit import ConcurrencyLimiter, RetryPolicy, classify_error
+from .telemetry import CallUsage, RunTelemetry
+
+T = TypeVar('T', bound=BaseModel)
+
+_DONE = object()  # Sentinel closing the stage's queues
+
+
+class EvaluationStage:
+    """
+    Worker pool that evaluates items whose model responses are already known.
+
+    Items without a parsed response (inference failed) pass through
+    unchanged. Evaluation errors are recorded in the item's metadata like
+    inference errors.
+    """
+
+    def __init__(self,
+                 judge_client=None,
+                 max_parallel: int = 10,
+                 limiter: Optional[ConcurrencyLimiter] = None,
+                 retry_policy: Optional[RetryPolicy] = None):
+        """
+        Args:
+            judge_client: Client for judge calls made through Benchmark.judge()
+                (must have complete_structured); None if evaluation needs no judge
+            max_parallel: Items evaluated concurrently, and the judge call
+                concurrency when no limiter is given
+            limiter: Optional concurrency limiter for judge calls
+            retry_policy: Retry policy for failed judge calls (default: RetryPolicy())
+        """
+        self.judge_client = judge_client
+        self.max_parallel = max_parallel
+        self.limiter = limiter or ConcurrencyLimiter(max_parallel)
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.in_flight = 0   # Items being evaluated
+        self.queued = 0      # Items with a response waiting for an evaluation worker
+        # Judge usage is kept apart from the inference telemetry of the runner
+        self.telemetry = RunTelemetry(model=getattr(judge_client, 'model', None))
+
+    async def judge(self,
+                    prompt: str,
+                    response_model: Type[T],
+                    system_prompt: Optional[str] = None) -> T:
+        """
+        Make one structured judge call, retrying recoverable errors.
+
+        Raises:
+            RuntimeError: If the stage has no judge client
+        """
+        if self.judge_client is None:
+            raise RuntimeError("This benchmark makes judge calls but no judge client is "
+                               "configured (e.g. --judge-model)")
+        call_kwargs: Dict[str, Any] = {}
+        if system_prompt is not None:
+            call_kwargs['system_prompt'] = system_prompt
+        self.telemetry.start()
+        attempt = 0
+        while True:
+            async with self.limiter:
+                start = time.monotonic()
+                try:
+                    if hasattr(self.judge_client, 'complete_structured_with_usage'):
+                        response, usage = await self.judge_client.complete_structured_with_usage(
+                            prompt=prompt, response_model=response_model, **call_kwargs)
+                    else:
+                        response = await self.judge_client.complete_structured(
+                            prompt=prompt, response_model=response_model, **call_kwargs)
+                        usage = CallUsage(latency_s=time.monotonic() - start)
+                except Exception as e:
+                    if isinstance(getattr(e, 'usage', None), CallUsage):
+                        self.telemetry.record_call(e.usage)
+                    error_class = classify_error(e)
+                    self.limiter.on_error(error_class)
+                    delay = self.retry_policy.next_delay(error_class, attempt)
+                    if delay is None:
+                        raise
+                else:
+                    self.limiter.on_success(time.monotonic() - start)
+                    self.telemetry.record_call(usage)
+                    self.telemetry.stop()
+                    return response
+            # Back off outside the limiter slot so other judge calls can use it
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def evaluate(self, benchmark, item):
+        """Evaluate one item in place (no-op if it has no parsed response) and return it."""
+        if item.parsed_response is None:
+            return item
+        # Benchmark.judge() calls made by this evaluate() go through this stage
+        token = current_judge_stage.set(self)
+        self.in_flight += 1
+        try:
+            item.evaluation = await benchmark.evaluate(item.parsed_response, item.example)
+        except Exception as e:
+            item.metadata['error'] = str(e)
+            item.metadata['error_class'] = classify_error(e)
+            item.evaluation = None
+        finally:
+            self.in_flight -= 1
+            current_judge_stage.reset(token)
+        return item
+
+    async def run(self, benchmark, items: AsyncIterable) -> AsyncIterator:
+        """
+        Evaluate items as they arrive, max_parallel at a time.
+
+        Args:
+            benchmark: Benchmark whose evaluate() is applied
+            items: Async iterable of items with parsed responses (e.g. the
+                runner's inference pipeline), consumed lazily
+
+        Yields:
+            Evaluated items, in completion order
+        """
+        n_workers = self.max_parallel
+        pending: asyncio.Queue = asyncio.Queue(maxsize=n_workers)
+        finished: asyncio.Queue = asyncio.Queue(maxsize=n_workers)
+
+        async def feed():
+            error = None
+            try:
+                async for item in items:
+                    self.queued += 1
+                    await pending.put(item)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                error = e
+            finally:
+                # Close the source so it cancels its own workers
+                if hasattr(items, 'aclose'):
+                    await items.aclose()
+            # Release the workers, even if the source raised
+            for _ in range(n_workers):
+                await pending.put(_DONE)
+            if error is not None:
+                raise error
+
+        async def work():
+            while True:
+                item = await pending.get()
+                if item is _DONE:
+                    await finished.put(_DONE)
+                    return
+                self.queued -= 1
+                await finished.put(await self.evaluate(benchmark, item))
+
+        feeder = asyncio.create_task(feed())
+        workers = [asyncio.create_task(work()) for _ in range(n_workers)]
+        try:
+            n_done = 0
+            while n_done < n_workers:
+                item = await finished.get()
+                if item is _DONE:
+                    n_done += 1
+                    continue
+                yield item
+            # Surface errors raised by the source (e.g. dataset loading errors)
+            await feeder
+        finally:
+            for task in [feeder, *workers]:
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(feeder, *workers, return_exceptions=True)
+            self.queued = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Evaluation queue depth, items being evaluated and judge concurrency."""
+        return {"queued": self.queued, "in_flight": self.in_flight,
+                "judge_concurrency": self.limiter.stats()}
+
+
+async def evaluate_stored(benchmark,
+                          results_path: str,
+                          output_path: str,
+                          stage: Optional[EvaluationStage] = None) -> Tuple[Any, int]:
+    """
+    Recompute the evaluations of a results file from its stored responses.
+
+    Rows are streamed: each parsed_response is revalidated with the
+    benchmark's response schema and evaluated again; no model is called
+    except the judge. Rows without a response (failed inference) are copied
+    unchanged. Errors from the previous evaluation are cleared first, since
+    a row with a response can only have failed during evaluation.
+
+    Args:
+        benchmark: Benchmark that produced the results
+        results_path: Results JSONL to re-evaluate
+        output_path: Where to write the re-evaluated rows (may equal results_path)
+        stage: Evaluation stage (default: one without a judge client)
+
+    Returns:
+        Tuple of (RunStats over the new evaluations, number of rows whose evaluation changed)
+    """
+    # Imported here: runner imports this module
+    from .runner import EvaluationItem, RunStats
+
+    stage = stage or EvaluationStage()
+    schema = benchmark.response_schema()
+    stats = RunStats()
+    n_changed = 0
+
+    async def stored_items():
+        with open(results_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                item = EvaluationItem.from_dict(json.loads(line), schema)
+                item.metadata['previous_evaluation'] = item.evaluation
+                if item.parsed_response is not None:
+                    item.metadata.pop('error', None)
+                    item.metadata.pop('error_class', None)
+                    item.evaluation = None
+                yield item
+
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as out:
+        async for item in stage.run(benchmark, stored_items()):
+            row = item.to_dict()
+            previous = item.metadata.pop('previous_evaluation')
+            row['metadata'] = item.metadata
+            n_changed += row['evaluation'] != previous
+            out.write(json.dumps(row) + '\n')
+            stats.record(item)
+    os.replace(tmp_path, output_path)
+    return stats, n_changed
+
+
+def main():
+    # Imported here: run_eval imports this module
+    from .benchmarks import GSM8KBenchmark, MCQBenchmark
+    from .cache import ResponseCache
+    from .pool import ClientPool
+
+    parser = argparse.ArgumentParser(description="Re-evaluate stored results (judge calls only, no inference)")
+    parser.add_argument("benchmark", choices=["mcq", "gsm8k"], help="Benchmark that produced the results")
+    parser.add_argument("results_path", help="Results JSONL to re-evaluate")
+    parser.add_argument("--output", metavar="PATH", help="Output JSONL (default: overwrite results_path)")
+    parser.add_argument("--judge-model", default=None, help="Model for judge calls")
+    parser.add_argument("--judge-cache", metavar="PATH", help="SQLite response cache for judge calls")
+    parser.add_argument("--judge-parallel", type=int, default=10, help="Concurrent evaluations / judge calls")
+    args = parser.parse_args()
+
+    benchmark = MCQBenchmark() if args.benchmark == "mcq" else GSM8KBenchmark()
+    judge_client = pool = None
+    if args.judge_model:
+        pool = ClientPool()
+        judge_client = pool.client(model=args.judge_model,
+                                   cache=ResponseCache(args.judge_cache) if args.judge_cache else None)
+    stage = EvaluationStage(judge_client, max_parallel=args.judge_parallel)
+    output_path = args.output or args.results_path
+    coro = evaluate_stored(benchmark, args.results_path, output_path, stage)
+    stats, n_changed = asyncio.run(pool.run(coro) if pool is not None else coro)
+    acc, lo, hi, n = stats.binary_accuracy()
+    print(f"Re-evaluated {stats.n_items} rows into {output_path}: {n_changed} evaluations changed, "
+          f"{stats.n_errors} errors")
+    print(f"Accuracy: {acc:.4f} (95% CI {lo:.4f}-{hi:.4f}, n={n})")
+    if stage.telemetry.calls:
+        summary = stage.telemetry.summary()
+        print(f"Judge usage: {summary['billed_calls']} API calls, {summary['prompt_tokens']} prompt / "
+              f"{summary['completion_tokens']} completion tokens")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,347 @@
+"""
+Offline inference backends for load testing and deterministic reruns.
+
+Both clients implement the LLMClient protocol (see api.py), so they can be
+passed to EvaluationRunner wherever a GrokClient is accepted:
+- MockClient synthesizes schema-valid responses after a simulated latency,
+  with configurable error injection, truncation and provider-side rate
+  limiting, and optionally simulated streaming timings, so the
+  runner's throughput, backpressure and retry behavior can be exercised at
+  scale without network access or an API key
+- ReplayClient serves responses recorded in results JSONL files, keyed by
+  prompt, for reproducing a previous run exactly
+"""
+
+import asyncio
+import glob
+import json
+import math
+import os
+import random
+import time
+import zlib
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, List, Optional, Tuple, Type, TypeVar
+
+from pydantic import BaseModel
+
+from .api import GenerationAborted
+from .cache import CacheMissError
+from .telemetry import CallUsage
+
+T = TypeVar('T', bound=BaseModel)
+
+LATENCY_DISTRIBUTIONS = ("constant", "uniform", "exponential", "lognormal")
+
+
+class MockAPIError(Exception):
+    """Simulated API failure; `status_code` lets classify_error() treat it like an HTTP error."""
+
+    def __init__(self, message: str, status_code: int):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+@dataclass
+class LatencyModel:
+    """
+    Distribution of simulated call latencies.
+
+    `mean` is the mean latency in seconds for every distribution; `sigma` is
+    the log-space standard deviation for 'lognormal' (higher = heavier tail).
+    """
+    distribution: str = "lognormal"
+    mean: float = 0.5
+    sigma: float = 0.5
+
+    def __post_init__(self):
+        if self.distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution: {self.distribution!r} "
+                             f"(expected one of {', '.join(LATENCY_DISTRIBUTIONS)})")
+
+    def sample(self, rng: random.Random) -> float:
+        """Draw one latency in seconds."""
+        if self.distribution == "constant":
+            return self.mean
+        if self.distribution == "uniform":
+            return rng.uniform(0, 2 * self.mean)
+        if self.distribution == "exponential":
+            return rng.expovariate(1 / self.mean) if self.mean > 0 else 0.0
+        if self.mean <= 0:
+            return 0.0
+        # Choose mu so that the distribution's mean equals self.mean
+        mu = math.log(self.mean) - self.sigma ** 2 / 2
+        return rng.lognormvariate(mu, self.sigma)
+
+
+def synthesize_response(response_model: Type[T], rng: random.Random,
+                        choices: str = "ABCD") -> T:
+    """
+    Build a schema-valid instance of a flat Pydantic response model.
+
+    String fields get a random letter from `choices` (so MCQ answers are
+    valid options), numbers a small random value and booleans a coin flip.
+    Fields of other types must have defaults.
+    """
+    values: Dict[str, Any] = {}
+    for name, field in response_model.model_fields.items():
+        annotation = field.annotation
+        if annotation is str:
+            values[name] = rng.choice(choices)
+        elif annotation is bool:
+            values[name] = rng.random() < 0.5
+        elif annotation is int:
+            values[name] = rng.randint(0, 100)
+        elif annotation is float:
+            values[name] = rng.random()
+    return response_model(**values)
+
+
+class MockClient:
+    """
+    Simulated LLM backend with configurable latency, errors and rate limits.
+
+    Each call sleeps for a latency drawn from `latency`, then either fails or
+    returns a synthesized response. Failure modes:
+    - error_rate: fraction of calls failing with a transient 503
+    - rpm: provider requests-per-minute limit; calls beyond it fail with 429
+    - capacity: provider concurrency limit; calls arriving while `capacity`
+      calls are already in flight fail immediately with 429
+    - truncation_rate: fraction of calls that run into max_tokens, raising
+      GenerationAborted like a truncated stream
+
+    With stream=True, usage reports a time to first token and inter-token
+    latency, splitting each call's latency 20/80 between the two, and the
+    streaming limits of GrokClient apply:
+    - token_budget: a call generating more tokens is aborted at the budget
+    - stall_timeout: a call whose time to first token would exceed it is
+      aborted as stalled after stall_timeout seconds
+
+    Responses depend only on (seed, prompt, sample_index), so reruns with the
+    same seed produce the same answers regardless of scheduling order.
+    """
+
+    def __init__(self,
+                 model: str = "mock",
+                 latency: Optional[LatencyModel] = None,
+                 error_rate: float = 0.0,
+                 rpm: Optional[float] = None,
+                 capacity: Optional[int] = None,
+                 max_tokens: int = 256,
+                 seed: int = 0,
+                 truncation_rate: float = 0.0,
+                 stream: bool = False,
+                 token_budget: Optional[int] = None,
+                 stall_timeout: Optional[float] = None):
+        """
+        Args:
+            model: Model name reported to telemetry
+            latency: Latency distribution (default: lognormal, mean 0.5s)
+            error_rate: Probability that a call fails with a transient error
+            rpm: Optional simulated requests-per-minute limit
+            capacity: Optional simulated maximum number of concurrent calls
+            max_tokens: Maximum output tokens (used by the runner's token estimates)
+            seed: Seed for latencies, errors and responses
+            truncation_rate: Probability that a call is truncated at max_tokens
+            stream: Report simulated streaming timings in usage
+            token_budget: Streaming: abort generations exceeding this many tokens
+            stall_timeout: Streaming: abort calls with no first token after this
+                many seconds
+        """
+        self.model = model
+        self.latency = latency or LatencyModel()
+        self.error_rate = error_rate
+        self.rpm = rpm
+        self.capacity = capacity
+        self.max_tokens = max_tokens
+        self.seed = seed
+        self.truncation_rate = truncation_rate
+        self.stream = stream
+        self.token_budget = token_budget
+        self.stall_timeout = stall_timeout
+        self.cache = None
+
+        self._rng = random.Random(seed)
+        self._window: Deque[float] = deque()  # Start times of calls in the last minute
+        self.in_flight = 0
+        self.calls = 0
+        self.rate_limited = 0
+        self.errors = 0
+        self.truncated = 0
+        self.stalled = 0
+
+    def _admit(self):
+        """Apply the simulated provider limits to a new call."""
+        now = time.monotonic()
+        if self.rpm is not None:
+            while self._window and now - self._window[0] >= 60.0:
+                self._window.popleft()
+            if len(self._window) >= self.rpm:
+                self.rate_limited += 1
+                raise MockAPIError("429 rate limit exceeded (requests per minute)", 429)
+            self._window.append(now)
+        if self.capacity is not None and self.in_flight >= self.capacity:
+            self.rate_limited += 1
+            raise MockAPIError("429 rate limit exceeded (concurrency)", 429)
+
+    async def _call(self, prompt: str, system_prompt: Optional[str]) -> float:
+        """Simulate one API round trip and return its latency."""
+        self.calls += 1
+        self._admit()
+        self.in_flight += 1
+        start = time.monotonic()
+        try:
+            latency = self.latency.sample(self._rng)
+            if self.stream and self.stall_timeout is not None and 0.2 * latency > self.stall_timeout:
+                await asyncio.sleep(self.stall_timeout)
+                self.stalled += 1
+                usage = CallUsage(prompt_tokens=(len(prompt) + len(system_prompt or "")) // 4,
+                                  latency_s=time.monotonic() - start)
+                raise GenerationAborted(f"Stream stalled: no tokens for {self.stall_timeout}s",
+                                        "stalled", usage)
+            await asyncio.sleep(latency)
+            if self._rng.random() < self.error_rate:
+                self.errors += 1
+                raise MockAPIError("503 service unavailable (injected)", 503)
+        finally:
+            self.in_flight -= 1
+        return time.monotonic() - start
+
+    async def complete(self, prompt: str, system_prompt: Optional[str] = None) -> str:
+        """Simulated text completion."""
+        await self._call(prompt, system_prompt)
+        return "mock response"
+
+    async def complete_structured(self,
+                                  prompt: str,
+                                  response_model: Type[T],
+                                  system_prompt: Optional[str] = None,
+                                  sample_index: int = 0) -> T:
+        """Simulated structured completion."""
+        response, _ = await self.complete_structured_with_usage(
+            prompt, response_model, system_prompt, sample_index)
+        return response
+
+    async def complete_structured_with_usage(self,
+                                             prompt: str,
+                                             response_model: Type[T],
+                                             system_prompt: Optional[str] = None,
+                                             sample_index: int = 0) -> Tuple[T, CallUsage]:
+        """Simulated structured completion with synthetic token usage."""
+        latency = await self._call(prompt, system_prompt)
+        rng = random.Random(zlib.crc32(f"{self.seed}:{sample_index}:{prompt}".encode('utf-8')))
+        response = synthesize_response(response_model, rng)
+        usage = CallUsage(
+            prompt_tokens=(len(prompt) + len(system_prompt or "")) // 4,
+            completion_tokens=len(response.model_dump_json()) // 4,
+            latency_s=latency,
+        )
+        if self._rng.random() < self.truncation_rate:
+            self.truncated += 1
+            usage.completion_tokens = self.max_tokens
+            usage.truncated = True
+        if self.stream:
+            usage.ttft_s = 0.2 * latency
+            usage.inter_token_s = 0.8 * latency / max(1, usage.completion_tokens)
+            if self.token_budget is not None and usage.completion_tokens > self.token_budget:
+                # Aborting the stream stops billing at the budget
+                self.truncated += not usage.truncated
+                usage.completion_tokens = self.token_budget
+                usage.truncated = True
+                raise GenerationAborted(f"Generation aborted after {self.token_budget} tokens "
+                                        f"(token budget {self.token_budget})", "token_budget", usage)
+        if usage.truncated:
+            raise GenerationAborted(f"Generation truncated at max_tokens ({self.max_tokens})",
+                                    "max_tokens", usage)
+        return response, usage
+
+
+class ReplayClient:
+    """
+    Serve structured responses recorded in results JSONL files.
+
+    Rows are indexed by prompt; the first successful row for a prompt wins.
+    Requests for prompts that were never recorded raise CacheMissError, so
+    a replay can never silently diverge from the recording. An optional
+    LatencyModel adds simulated latency for load testing.
+    """
+
+    def __init__(self,
+                 paths: List[str],
+                 model: str = "replay",
+                 latency: Optional[LatencyModel] = None,
+                 seed: int = 0):
+        """
+        Args:
+            paths: Results JSONL files, or directories searched for *.jsonl
+            model: Model name reported to telemetry
+            latency: Optional simulated latency (default: respond immediately)
+            seed: Seed for simulated latencies
+        """
+        self.model = model
+        self.max_tokens = 0
+        self.latency = latency
+        self.cache = None
+        self._rng = random.Random(seed)
+        self.responses: Dict[str, str] = {}
+        self.misses = 0
+
+        for path in paths:
+            files = (sorted(glob.glob(os.path.join(path, "*.jsonl")))
+                     if os.path.isdir(path) else [path])
+            for file_path in files:
+                self._load(file_path)
+
+    def _load(self, path: str):
+        """Index the successful rows of one results file by prompt."""
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                prompt = row.get("prompt")
+                parsed = row.get("parsed_response")
+                if prompt is None or parsed is None or prompt in self.responses:
+                    continue
+                self.responses[prompt] = json.dumps(parsed)
+
+    async def complete(self, prompt: str, system_prompt: Optional[str] = None) -> str:
+        """Return the recorded response JSON for a prompt."""
+        return self._lookup(prompt)
+
+    def _lookup(self, prompt: str) -> str:
+        value = self.responses.get(prompt)
+        if value is None:
+            self.misses += 1
+            raise CacheMissError(f"No recorded response for prompt {prompt[:40]!r}...")
+        return value
+
+    async def complete_structured(self,
+                                  prompt: str,
+                                  response_model: Type[T],
+                                  system_prompt: Optional[str] = None,
+                                  sample_index: int = 0) -> T:
+        """Return the recorded response for a prompt."""
+        response, _ = await self.complete_structured_with_usage(
+            prompt, response_model, system_prompt, sample_index)
+        return response
+
+    async def complete_structured_with_usage(self,
+                                             prompt: str,
+                                             response_model: Type[T],
+                                             system_prompt: Optional[str] = None,
+                                             sample_index: int = 0) -> Tuple[T, CallUsage]:
+        """Return the recorded response; replays are reported as cache hits."""
+        start = time.monotonic()
+        if self.latency is not None:
+            await asyncio.sleep(self.latency.sample(self._rng))
+        response = response_model.model_validate_json(self._lookup(prompt))
+        return response, CallUsage(latency_s=time.monotonic() - start, from_cache=True)
+
+    def __len__(self) -> int:
+        return len(self.responses)
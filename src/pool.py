@@ -0,0 +1,270 @@
+"""
+Shared, bounded pool of xAI API connections.
+
+A standalone GrokClient opens its own SDK client (one gRPC channel, i.e.
+one HTTP/2 connection), so a process running several benchmarks and a judge
+holds one connection per client. A ClientPool owns a fixed number of
+channels instead. GrokClients created with pool.client(...) lease a channel
+for each call, whatever their model or sampling parameters:
+
+    async with ClientPool(connections=2) as pool:
+        client = pool.client(model="grok-4")
+        judge = pool.client(model="grok-3-mini")
+        ...
+
+- Each channel carries at most `max_streams` concurrent calls (HTTP/2
+  streams). Calls go to the least-loaded channel and wait for a free stream
+  when all are full
+- Channels send keepalive pings, so idle connections survive NAT and
+  load-balancer timeouts between benchmarks
+- Opening the pool warms every channel up with a cheap call, so the TLS
+  handshake and authentication errors happen before the run starts
+- Closing the pool stops new leases, waits up to `drain_timeout` seconds
+  for calls in flight to finish, then closes the channels
+
+stats() reports stream utilization: calls in flight per channel, the peak,
+the time-averaged share of capacity in use, and how often and how long calls
+waited for a stream.
+"""
+
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Dict, List, Optional, TypeVar
+
+from .api import DEFAULT_TIMEOUT, AsyncClient, GrokClient, close_sdk_client
+
+R = TypeVar('R')
+
+DEFAULT_CONNECTIONS = 2
+# Concurrent streams per HTTP/2 connection (the common server-side limit)
+DEFAULT_MAX_STREAMS = 100
+
+
+class _Channel:
+    """One pooled SDK client and its load."""
+
+    def __init__(self, sdk: Any):
+        self.sdk = sdk
+        self.in_flight = 0
+        self.leases = 0
+
+
+class ClientPool:
+    """
+    Async context manager owning a bounded set of xAI SDK connections.
+
+    Shared by every GrokClient created with client(); see the module docstring.
+    """
+
+    def __init__(self,
+                 api_key: Optional[str] = None,
+                 connections: int = DEFAULT_CONNECTIONS,
+                 max_streams: int = DEFAULT_MAX_STREAMS,
+                 keepalive_s: float = 30.0,
+                 timeout: int = DEFAULT_TIMEOUT,
+                 warmup: bool = True,
+                 drain_timeout: float = 30.0):
+        """
+        Args:
+            api_key: xAI API key (defaults to XAI_API_KEY env var)
+            connections: Number of connections (gRPC channels) to open
+            max_streams: Concurrent calls per connection
+            keepalive_s: Interval of keepalive pings on each connection
+            timeout: Request timeout in seconds
+            warmup: Make a cheap call on every connection when the pool opens
+            drain_timeout: Seconds close() waits for calls in flight
+        """
+        if connections < 1 or max_streams < 1:
+            raise ValueError("ClientPool needs at least one connection and one stream per connection")
+        self.api_key = api_key
+        self.connections = connections
+        self.max_streams = max_streams
+        self.keepalive_s = keepalive_s
+        self.timeout = timeout
+        self.warmup = warmup
+        self.drain_timeout = drain_timeout
+
+        self._channels: List[_Channel] = []
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._idle: Optional[asyncio.Event] = None
+        self._closing = False
+
+        # Utilization counters
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.leases = 0
+        self.waited_leases = 0      # Leases that found every stream busy
+        self.wait_s = 0.0           # Total time spent waiting for a stream
+        self._opened_at: Optional[float] = None
+        self._closed_at: Optional[float] = None
+        self._busy_s = 0.0          # Integral of in_flight over time
+        self._last_change = 0.0
+
+    @property
+    def is_open(self) -> bool:
+        return bool(self._channels)
+
+    @property
+    def capacity(self) -> int:
+        """Calls the pool can carry at once."""
+        return self.connections * self.max_streams
+
+    def channel_options(self) -> List[tuple]:
+        """gRPC options of the pooled channels."""
+        keepalive_ms = int(self.keepalive_s * 1000)
+        return [
+            ("grpc.keepalive_time_ms", keepalive_ms),
+            ("grpc.keepalive_timeout_ms", min(keepalive_ms, 20000)),
+            ("grpc.keepalive_permit_without_calls", 1),
+            ("grpc.http2.max_pings_without_data", 0),
+            # Give every channel its own connection instead of gRPC's shared subchannels
+            ("grpc.use_local_subchannel_pool", 1),
+        ]
+
+    def client(self, **kwargs) -> GrokClient:
+        """GrokClient making its calls on this pool's connections (kwargs as for GrokClient)."""
+        return GrokClient(api_key=self.api_key, pool=self, **kwargs)
+
+    async def start(self):
+        """
+        Open (and warm up) the connections; a no-op if the pool is open.
+
+        Raises:
+            ImportError: If xai-sdk is not installed
+            ValueError: If no API key is set
+            Exception: Whatever the warmup call raised (e.g. an invalid API key);
+                the connections are closed again first
+        """
+        if self.is_open:
+            return
+        if AsyncClient is None:
+            raise ImportError("xai-sdk required. Run: pip install xai-sdk")
+        api_key = self.api_key or os.getenv("XAI_API_KEY")
+        if not api_key:
+            raise ValueError("XAI_API_KEY not set. Put it in environment or .env")
+        self._channels = [_Channel(AsyncClient(api_key=api_key, timeout=self.timeout,
+                                               channel_options=self.channel_options()))
+                          for _ in range(self.connections)]
+        self._slots = asyncio.Semaphore(self.capacity)
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._closing = False
+        self._opened_at = self._last_change = time.monotonic()
+        self._closed_at = None
+        if self.warmup:
+            try:
+                await asyncio.gather(*(self._warm(channel.sdk) for channel in self._channels))
+            except BaseException:
+                await self._close_channels()
+                raise
+
+    async def _warm(self, sdk: Any):
+        # Listing models is the cheapest authenticated call: it opens the
+        # connection and checks the key without sampling anything
+        models = getattr(sdk, "models", None)
+        if models is not None and hasattr(models, "list_language_models"):
+            await models.list_language_models()
+
+    def _account(self, delta: int):
+        now = time.monotonic()
+        self._busy_s += self.in_flight * (now - self._last_change)
+        self._last_change = now
+        self.in_flight += delta
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        if self.in_flight:
+            self._idle.clear()
+        else:
+            self._idle.set()
+
+    @asynccontextmanager
+    async def lease(self) -> AsyncIterator[Any]:
+        """
+        Hold one stream on the least-loaded connection for the duration of a call.
+
+        Yields:
+            The connection's xai_sdk AsyncClient
+
+        Raises:
+            RuntimeError: If the pool is not open or is shutting down
+        """
+        if not self.is_open or self._closing:
+            raise RuntimeError("ClientPool is not open; use `async with pool:` around the run")
+        start = time.monotonic()
+        waited = self._slots.locked()
+        await self._slots.acquire()
+        if waited:
+            self.waited_leases += 1
+            self.wait_s += time.monotonic() - start
+        # Holding a slot guarantees a channel below max_streams: the
+        # least-loaded one is at most at the average load
+        channel = min(self._channels, key=lambda c: c.in_flight)
+        channel.in_flight += 1
+        channel.leases += 1
+        self.leases += 1
+        self._account(+1)
+        try:
+            yield channel.sdk
+        finally:
+            channel.in_flight -= 1
+            self._account(-1)
+            self._slots.release()
+
+    async def close(self):
+        """
+        Stop new leases, let calls in flight finish (up to drain_timeout) and
+        close the connections. Calls still running afterwards are cancelled by
+        the closing channels.
+        """
+        if not self.is_open:
+            return
+        self._closing = True
+        try:
+            await asyncio.wait_for(self._idle.wait(), self.drain_timeout)
+        except asyncio.TimeoutError:
+            pass
+        await self._close_channels()
+
+    async def _close_channels(self):
+        if self._opened_at is not None:
+            self._account(0)
+            self._closed_at = time.monotonic()
+        channels, self._channels = self._channels, []
+        await asyncio.gather(*(close_sdk_client(channel.sdk) for channel in channels),
+                             return_exceptions=True)
+
+    async def run(self, coro: Awaitable[R]) -> R:
+        """Await `coro` with the pool open, closing it afterwards (e.g. asyncio.run(pool.run(main())))."""
+        async with self:
+            return await coro
+
+    async def __aenter__(self) -> 'ClientPool':
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Stream utilization of the pool, overall and per connection."""
+        elapsed = 0.0
+        if self._opened_at is not None:
+            elapsed = (self._closed_at or time.monotonic()) - self._opened_at
+        busy_s = self._busy_s
+        if self.is_open:
+            busy_s += self.in_flight * (time.monotonic() - self._last_change)
+        return {
+            "open": self.is_open,
+            "connections": self.connections,
+            "max_streams": self.max_streams,
+            "capacity": self.capacity,
+            "in_flight": self.in_flight,
+            "utilization": self.in_flight / self.capacity,
+            "mean_utilization": busy_s / (elapsed * self.capacity) if elapsed else 0.0,
+            "peak_in_flight": self.peak_in_flight,
+            "leases": self.leases,
+            "waited_leases": self.waited_leases,
+            "wait_s": self.wait_s,
+            "per_connection": [{"in_flight": c.in_flight, "leases": c.leases} for c in self._channels],
+        }
@@ -0,0 +1,424 @@
+"""
+Concurrency control, rate budgets and retry policy for API calls.
+
+This module provides the pieces EvaluationRunner uses to keep throughput close
+to the provider's limits without manual `--max-parallel` tuning:
+- ConcurrencyLimiter: fixed cap on concurrent calls (the original semaphore behavior)
+- AdaptiveConcurrencyLimiter: AIMD controller that grows the concurrency limit
+  additively while calls succeed quickly and cuts it multiplicatively on
+  rate-limit errors or latency above a target
+- FairShareLimiter: one concurrency cap shared by several runners (e.g. all
+  sweep cells of one model), granting free slots to the share with the
+  fewest calls in flight
+- RateBudget: token buckets enforcing requests-per-minute and tokens-per-minute
+- RetryPolicy: jittered exponential backoff with per-error-class retry limits
+"""
+
+import asyncio
+import random
+import re
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Optional, Set
+
+# Error classes returned by classify_error()
+RATE_LIMIT = "rate_limit"
+TRANSIENT = "transient"
+FATAL = "fatal"
+TRUNCATED = "truncated"  # Generation cut off at max_tokens or a token budget (not retried)
+
+# gRPC status codes (as used by xai_sdk) grouped by how they should be handled
+_RATE_LIMIT_CODES = {"RESOURCE_EXHAUSTED"}
+_TRANSIENT_CODES = {"UNAVAILABLE", "DEADLINE_EXCEEDED", "ABORTED", "INTERNAL", "UNKNOWN"}
+# Rate-limit wording in messages of errors without a status code. A bare "429"
+# is not enough: it also appears in unrelated messages (e.g. a quoted answer).
+_RATE_LIMIT_MESSAGE = re.compile(
+    r"\b(?:status(?: code)?[ :=]*429|http[ /]\S* 429|429 too many requests|too many requests"
+    r"|rate[ -]limit(?:ed| exceeded)|resource_exhausted)\b")
+
+
+def classify_error(exc: BaseException) -> str:
+    """
+    Classify an API exception as rate-limit, transient, truncated or fatal.
+
+    Exceptions carrying an `error_class` attribute (e.g. api.GenerationAborted)
+    are classified by it. Otherwise understands gRPC errors (xai_sdk raises
+    grpc.aio.AioRpcError, whose code() is a StatusCode enum), HTTP-style
+    errors exposing `status_code`, and standard timeout/connection errors.
+    Other errors count as rate limits only if their message says so explicitly
+    (e.g. "status 429", "429 Too Many Requests", "rate limit exceeded").
+    Anything unrecognized is fatal, so programming and validation errors are
+    not retried.
+
+    Args:
+        exc: Exception raised by the client
+
+    Returns:
+        One of RATE_LIMIT, TRANSIENT, TRUNCATED or FATAL
+    """
+    error_class = getattr(exc, "error_class", None)
+    if error_class in (RATE_LIMIT, TRANSIENT, TRUNCATED, FATAL):
+        return error_class
+
+    code = getattr(exc, "code", None)
+    if callable(code):
+        try:
+            name = getattr(code(), "name", str(code()))
+        except Exception:
+            name = ""
+        if name in _RATE_LIMIT_CODES:
+            return RATE_LIMIT
+        if name in _TRANSIENT_CODES:
+            return TRANSIENT
+
+    status = getattr(exc, "status_code", None)
+    if isinstance(status, int):
+        if status == 429:
+            return RATE_LIMIT
+        if status >= 500 or status == 408:
+            return TRANSIENT
+
+    if isinstance(exc, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return TRANSIENT
+
+    if _RATE_LIMIT_MESSAGE.search(str(exc).lower()):
+        return RATE_LIMIT
+
+    return FATAL
+
+
+class ConcurrencyLimiter:
+    """
+    Fixed cap on concurrent API calls.
+
+    Used as `async with limiter:` around each call. The on_success/on_error
+    hooks are no-ops here and exist so the adaptive subclass can be swapped in.
+    """
+
+    def __init__(self, limit: int):
+        """
+        Args:
+            limit: Maximum number of concurrent calls
+        """
+        self.limit = float(limit)
+        self.in_flight = 0
+        self._cond = asyncio.Condition()
+
+    async def acquire(self):
+        """Wait until a slot is free and take it."""
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.in_flight < max(1, int(self.limit)))
+            self.in_flight += 1
+
+    async def release(self):
+        """Return a slot and wake waiters."""
+        async with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.release()
+
+    def on_success(self, latency: float):
+        """Feedback hook: a call succeeded after `latency` seconds."""
+
+    def on_error(self, error_class: str):
+        """Feedback hook: a call failed with the given error class."""
+
+    def stats(self) -> Dict[str, Any]:
+        """Current limit and occupancy."""
+        return {"limit": self.limit, "in_flight": self.in_flight}
+
+
+class AdaptiveConcurrencyLimiter(ConcurrencyLimiter):
+    """
+    AIMD (additive-increase, multiplicative-decrease) concurrency controller.
+
+    Like TCP congestion control: each successful call raises the limit by
+    1/limit (about +1 per "window" of calls), while a rate-limit error, or a
+    call slower than `latency_target`, multiplies the limit by `backoff`.
+    Decreases are rate-limited to one per `cooldown` seconds, so a burst of
+    429s from requests that were already in flight only counts once.
+    """
+
+    def __init__(self,
+                 initial: int = 10,
+                 min_limit: int = 1,
+                 max_limit: int = 256,
+                 backoff: float = 0.5,
+                 latency_target: Optional[float] = None,
+                 cooldown: float = 1.0):
+        """
+        Args:
+            initial: Starting concurrency limit
+            min_limit: Lower bound on the limit
+            max_limit: Upper bound on the limit
+            backoff: Multiplicative decrease factor applied on congestion
+            latency_target: Optional latency (seconds) above which calls count as congestion
+            cooldown: Minimum seconds between two multiplicative decreases
+        """
+        super().__init__(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.latency_target = latency_target
+        self.cooldown = cooldown
+        self.decreases = 0
+        self._last_decrease = 0.0
+        # Wake-up tasks in flight; the loop only keeps weak references to tasks
+        self._wake_tasks: Set[asyncio.Task] = set()
+
+    def _decrease(self):
+        now = time.monotonic()
+        if now - self._last_decrease < self.cooldown:
+            return
+        self._last_decrease = now
+        self.limit = max(float(self.min_limit), self.limit * self.backoff)
+        self.decreases += 1
+
+    def on_success(self, latency: float):
+        if self.latency_target is not None and latency > self.latency_target:
+            self._decrease()
+            return
+        old = int(self.limit)
+        self.limit = min(float(self.max_limit), self.limit + 1.0 / max(self.limit, 1.0))
+        if int(self.limit) > old:
+            # A new slot opened up; wake a waiter without holding the condition here
+            task = asyncio.get_running_loop().create_task(self._wake())
+            self._wake_tasks.add(task)
+            task.add_done_callback(self._wake_tasks.discard)
+
+    async def _wake(self):
+        async with self._cond:
+            self._cond.notify_all()
+
+    def on_error(self, error_class: str):
+        if error_class == RATE_LIMIT:
+            self._decrease()
+
+    def stats(self) -> Dict[str, Any]:
+        return {**super().stats(), "decreases": self.decreases}
+
+
+class FairShareLimiter(ConcurrencyLimiter):
+    """
+    Concurrency cap shared fairly between several consumers.
+
+    Each consumer (tenant) takes slots through its own share(), which can be
+    passed to a runner wherever a ConcurrencyLimiter is expected. While
+    slots are contended, a freed slot goes to the waiting tenant with the
+    fewest calls in flight relative to its weight (max-min fairness), so a
+    tenant with many queued items cannot starve the others; an idle
+    tenant's slots are used by the busy ones.
+    """
+
+    def __init__(self, limit: int):
+        """
+        Args:
+            limit: Maximum number of concurrent calls across all shares
+        """
+        super().__init__(limit)
+        self._shares: Dict[str, 'LimiterShare'] = {}
+        self._waiting: Dict[str, Deque[asyncio.Future]] = {}
+
+    def share(self, tenant: str, weight: float = 1.0) -> 'LimiterShare':
+        """The share of `tenant` (created on first use) with the given relative weight."""
+        if tenant not in self._shares:
+            self._shares[tenant] = LimiterShare(self, tenant, weight)
+            self._waiting[tenant] = deque()
+        return self._shares[tenant]
+
+    async def _acquire(self, tenant: str):
+        share = self._shares[tenant]
+        if self.in_flight < max(1, int(self.limit)) and not any(self._waiting.values()):
+            self.in_flight += 1
+            share.in_flight += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._waiting[tenant].append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted just as we were cancelled: hand the slot on
+                self._release(tenant)
+            else:
+                self._waiting[tenant].remove(future)
+            raise
+
+    def _release(self, tenant: str):
+        self.in_flight -= 1
+        self._shares[tenant].in_flight -= 1
+        self._grant()
+
+    def _grant(self):
+        while self.in_flight < max(1, int(self.limit)):
+            waiting = [t for t, q in self._waiting.items() if q]
+            if not waiting:
+                return
+            tenant = min(waiting, key=lambda t: self._shares[t].in_flight / self._shares[t].weight)
+            future = self._waiting[tenant].popleft()
+            self.in_flight += 1
+            self._shares[tenant].in_flight += 1
+            future.set_result(None)
+
+    async def acquire(self):
+        await self.share("default").acquire()
+
+    async def release(self):
+        await self.share("default").release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {**super().stats(),
+                "shares": {t: s.in_flight for t, s in self._shares.items()},
+                "waiting": sum(len(q) for q in self._waiting.values())}
+
+
+class LimiterShare(ConcurrencyLimiter):
+    """One tenant's view of a FairShareLimiter (see FairShareLimiter.share())."""
+
+    def __init__(self, parent: FairShareLimiter, tenant: str, weight: float = 1.0):
+        self.parent = parent
+        self.tenant = tenant
+        self.weight = weight
+        self.in_flight = 0
+
+    @property
+    def limit(self) -> float:
+        return self.parent.limit
+
+    async def acquire(self):
+        await self.parent._acquire(self.tenant)
+
+    async def release(self):
+        self.parent._release(self.tenant)
+
+    def on_success(self, latency: float):
+        self.parent.on_success(latency)
+
+    def on_error(self, error_class: str):
+        self.parent.on_error(error_class)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"limit": self.parent.limit, "in_flight": self.in_flight,
+                "shared_in_flight": self.parent.in_flight}
+
+
+class _TokenBucket:
+    """Continuous-refill token bucket holding at most one minute of capacity."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` tokens are available (0 if available now)."""
+        self._refill()
+        # Requests larger than the bucket only need a full bucket, else they never run
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount: float):
+        self._refill()
+        self.tokens -= amount
+
+
+class RateBudget:
+    """
+    Requests-per-minute and tokens-per-minute budget.
+
+    Callers acquire() an estimated token cost before each request, and may
+    reconcile() with the actual usage afterwards so the bucket tracks reality.
+    """
+
+    def __init__(self, rpm: Optional[float] = None, tpm: Optional[float] = None):
+        """
+        Args:
+            rpm: Maximum requests per minute (None for unlimited)
+            tpm: Maximum tokens per minute (None for unlimited)
+        """
+        self.requests = _TokenBucket(rpm) if rpm else None
+        self.tokens = _TokenBucket(tpm) if tpm else None
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, estimated_tokens: float = 0.0):
+        """Block until one request and `estimated_tokens` tokens fit in the budget."""
+        # The lock makes waiters queue FIFO instead of all waking at once
+        async with self._lock:
+            while True:
+                wait = 0.0
+                if self.requests is not None:
+                    wait = max(wait, self.requests.wait_time(1))
+                if self.tokens is not None:
+                    wait = max(wait, self.tokens.wait_time(estimated_tokens))
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+            if self.requests is not None:
+                self.requests.take(1)
+            if self.tokens is not None:
+                self.tokens.take(estimated_tokens)
+
+    def reconcile(self, estimated_tokens: float, actual_tokens: float):
+        """Correct the token bucket once the true token usage of a call is known."""
+        if self.tokens is not None:
+            self.tokens.take(actual_tokens - estimated_tokens)
+
+
+def estimate_tokens(prompt: str, max_tokens: int, system_prompt: Optional[str] = None) -> int:
+    """
+    Rough token cost of a request for budgeting before the call is made.
+
+    Uses the common ~4 characters/token heuristic for the input and charges
+    a quarter of max_tokens for the completion; reconcile() fixes the
+    difference once real usage is reported.
+    """
+    chars = len(prompt) + len(system_prompt or "")
+    return chars // 4 + max_tokens // 4
+
+
+@dataclass
+class RetryPolicy:
+    """
+    Jittered exponential backoff keyed on error class.
+
+    The delay before retry n (0-based) is drawn uniformly from
+    [0, min(max_delay, base_delay * 2**n)] ("full jitter"), which spreads
+    retries out so clients hitting the same limit don't retry in lockstep.
+    Rate-limit errors start from a larger base delay than transient ones.
+    """
+    max_retries: Dict[str, int] = field(
+        default_factory=lambda: {RATE_LIMIT: 8, TRANSIENT: 4, FATAL: 0})
+    base_delay: Dict[str, float] = field(
+        default_factory=lambda: {RATE_LIMIT: 2.0, TRANSIENT: 0.5, FATAL: 0.0})
+    max_delay: float = 60.0
+
+    def next_delay(self, error_class: str, attempt: int) -> Optional[float]:
+        """
+        Delay before retrying after a failure, or None if retries are exhausted.
+
+        Args:
+            error_class: Class of the error (from classify_error)
+            attempt: Number of retries already made for this item
+
+        Returns:
+            Seconds to wait before the next attempt, or None to give up
+        """
+        if attempt >= self.max_retries.get(error_class, 0):
+            return None
+        cap = min(self.max_delay, self.base_delay.get(error_class, 1.0) * (2 ** attempt))
+        return random.uniform(0, cap)
@@ -0,0 +1,174 @@
+"""
+Re-score stored results: rerun Benchmark.evaluate() without inference.
+
+After a fix to a benchmark's evaluate(), the responses in a results file
+are still valid; only their evaluations are stale. rescore() streams the
+file in byte-range chunks, rebuilds each parsed_response through
+response_schema().model_validate(), reruns evaluate() and writes the rows
+with their new evaluations. The aggregate sidecar (see src/aggregates.py)
+is built from the same rows on the way, so nothing is parsed twice. No
+model is called.
+
+Chunks are processed in a process pool (one process per CPU by default; in
+this process when there is a single CPU) and written back in file order.
+Benchmarks whose evaluate() makes judge calls (Benchmark.uses_judge) are
+re-evaluated in the async evaluation stage instead (see judge.evaluate_stored).
+
+Usage:
+    python -m src.run_eval mcq rescore results/mcq.jsonl results/mcq.rescored.jsonl
+"""
+
+import asyncio
+import json
+import os
+import shutil
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Deque, List, Optional, Tuple
+
+from .aggregates import RunAggregate, save_complete_aggregate
+from .ratelimit import classify_error
+from .runner import RunStats, serialize_evaluation
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    orjson = None  # type: ignore
+    _loads = json.loads
+
+# Bytes of results per chunk handed to a worker
+CHUNK_BYTES = 4 << 20
+
+# Per-process state of pool workers (set by _init_worker)
+_benchmark = None
+_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _init_worker(benchmark):
+    global _benchmark, _loop
+    _benchmark = benchmark
+    _loop = asyncio.new_event_loop()
+
+
+def chunk_ranges(path: str, chunk_bytes: int = CHUNK_BYTES) -> List[Tuple[int, int]]:
+    """Split a JSONL file into (start, end) byte ranges of about chunk_bytes, on line boundaries."""
+    size = os.path.getsize(path)
+    ranges = []
+    with open(path, 'rb') as f:
+        start = 0
+        while start < size:
+            f.seek(min(start + chunk_bytes, size))
+            f.readline()  # Move to the end of the line the boundary falls in
+            end = min(f.tell(), size)
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+async def _rescore_rows(lines: List[bytes]) -> Tuple[List[str], RunAggregate, int]:
+    schema = _benchmark.response_schema()
+    out, aggregate, n_changed = [], RunAggregate(), 0
+    for line in lines:
+        if not line.strip():
+            continue
+        row = _loads(line)
+        parsed = row.get('parsed_response')
+        if parsed is not None:
+            metadata = row.get('metadata') or {}
+            # A row with a response can only have failed during evaluation
+            metadata.pop('error', None)
+            metadata.pop('error_class', None)
+            previous = row.get('evaluation')
+            try:
+                response = schema.model_validate(parsed)
+                row['parsed_response'] = response.model_dump()
+                row['evaluation'] = serialize_evaluation(
+                    await _benchmark.evaluate(response, row.get('example', {})))
+            except Exception as e:
+                metadata['error'] = str(e)
+                metadata['error_class'] = classify_error(e)
+                row['evaluation'] = None
+            row['metadata'] = metadata
+            n_changed += row['evaluation'] != previous
+        aggregate.add_row(row)
+        out.append(json.dumps(row) + '\n')
+    return out, aggregate, n_changed
+
+
+def _rescore_range(path: str, start: int, end: int) -> Tuple[str, RunAggregate, int]:
+    """Rescore the rows in one byte range of the results file (runs in a worker)."""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        lines = f.read(end - start).splitlines()
+    out, aggregate, n_changed = _loop.run_until_complete(_rescore_rows(lines))
+    return ''.join(out), aggregate, n_changed
+
+
+def rescore(benchmark,
+            results_path: str,
+            output_path: str,
+            workers: Optional[int] = None,
+            chunk_bytes: int = CHUNK_BYTES) -> Tuple[RunStats, int]:
+    """
+    Re-evaluate every row of a results file from its stored response.
+
+    Rows without a response (failed inference) are copied unchanged. The
+    output may be the results file itself; it is replaced once complete. When
+    writing elsewhere, the run's usage metrics (<results>.metrics.json) are
+    copied along, since the responses and their cost are unchanged.
+
+    Args:
+        benchmark: Benchmark that produced the results (picklable; its
+            evaluate() must not make judge calls)
+        results_path: Results JSONL to rescore
+        output_path: Where to write the rescored rows
+        workers: Worker processes (default: one per CPU; 1 rescores in this process)
+        chunk_bytes: Approximate size of the byte ranges handed to workers
+
+    Returns:
+        Tuple of (RunStats over the new evaluations, number of rows whose evaluation changed)
+    """
+    if benchmark.uses_judge:
+        raise ValueError(f"{benchmark.name} makes judge calls; use judge.evaluate_stored()")
+    workers = workers or os.cpu_count() or 1
+    ranges = chunk_ranges(results_path, chunk_bytes)
+    aggregate, n_changed = RunAggregate(), 0
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+
+    with open(tmp_path, 'w', encoding='utf-8') as out:
+        def write(result: Tuple[str, RunAggregate, int]):
+            nonlocal n_changed
+            text, part, changed = result
+            out.write(text)
+            aggregate.merge(part)
+            n_changed += changed
+
+        if workers == 1:
+            _init_worker(benchmark)
+            try:
+                for start, end in ranges:
+                    write(_rescore_range(results_path, start, end))
+            finally:
+                _loop.close()
+        else:
+            with ProcessPoolExecutor(workers, initializer=_init_worker,
+                                     initargs=(benchmark,)) as pool:
+                # A bounded window of chunks in flight, written back in file order
+                window: Deque[Any] = deque()
+                for start, end in ranges:
+                    window.append(pool.submit(_rescore_range, results_path, start, end))
+                    if len(window) >= 2 * workers:
+                        write(window.popleft().result())
+                while window:
+                    write(window.popleft().result())
+    os.replace(tmp_path, output_path)
+
+    metrics_path = results_path + '.metrics.json'
+    if os.path.abspath(output_path) != os.path.abspath(results_path) and os.path.exists(metrics_path):
+        shutil.copyfile(metrics_path, output_path + '.metrics.json')
+    save_complete_aggregate(output_path, aggregate)
+    stats = RunStats(n_items=aggregate.n_rows, n_errors=aggregate.n_errors,
+                     n_evaluated=aggregate.n_evaluated, n_true=aggregate.n_correct,
+                     n_samples=aggregate.n_samples)
+    return stats, n_changed
@@ -7,12 +7,33 @@ interface that works with any Benchmark implementation.
 
 import argparse
 import asyncio
-from typing import Any
+import dataclasses
+import sys
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Optional, Tuple
 
-from .api import GrokClient
-from .runner import EvaluationRunner
+import numpy as np
+
+from .api import GrokClient, LLMClient
+from .cache import ResponseCache
+from .columnar import jsonl_to_columnar
+from .config import RunConfig
+from .judge import EvaluationStage, evaluate_stored
+from .runner import EarlyStopConfig, EvaluationRunner, SelfConsistencyConfig, PermutationConfig
+from .augment import PERMUTATION_STRATEGIES
+from .aggregates import update_aggregate
+from .analyze import summarize_robust
+from .batch import BatchRunner, FileBatchBackend, LocalBatchServer
+from .sharding import clear_shard_done, launch_shards, mark_shard_done, merge_shards, shard_path
+from .status import StatusServer
+from .subset import SubsetIndex
+from .rescore import rescore
+from .ratelimit import AdaptiveConcurrencyLimiter, RateBudget, RetryPolicy, RATE_LIMIT, TRANSIENT
 from .benchmarks import MCQBenchmark, GSM8KBenchmark
-from .metrics import accuracy, wilson_ci
+from .offline import LATENCY_DISTRIBUTIONS, LatencyModel, MockClient, ReplayClient
+from .pool import ClientPool
+from .metrics import wilson_ci
+from .stats import accuracy, load_outcomes
 
 
 def compute_binary_accuracy(results: Any) -> tuple[float, float, float, int]:
@@ -26,72 +47,695 @@ def compute_binary_accuracy(results: Any) -> tuple[float, float, float, int]:
         Tuple of (accuracy, ci_low, ci_high, n)
     """
     # Extract evaluation results
-    evaluations = [item.evaluation for item in results.items if item.evaluation is not None]
+    correct = np.fromiter((bool(item.evaluation) for item in results.items
+                           if item.evaluation is not None), dtype=bool)
 
-    if not evaluations:
+    if not len(correct):
         return 0.0, 0.0, 0.0, 0
 
-    # Compute accuracy
-    correct = sum(1 for e in evaluations if e)
-    n = len(evaluations)
-    acc = correct / n if n > 0 else 0.0
-
-    # Compute confidence interval
+    # Compute accuracy and confidence interval
+    n = len(correct)
+    acc = accuracy(correct)
     lo, hi = wilson_ci(acc, n)
 
     return acc, lo, hi, n
 
 
-async def run_mcq_baseline(input_path: str, output_path: str):
-    """Run MCQ baseline evaluation."""
-    client = GrokClient()
-    benchmark = MCQBenchmark()
-    runner = EvaluationRunner(client, max_parallel=10)
+def positive_int(value: str) -> int:
+    """argparse type for counts that must be at least 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
+def make_pool(args: argparse.Namespace) -> Optional[ClientPool]:
+    """Connection pool for xAI clients (None for offline backends and cache replay)."""
+    if args.backend != "xai" or args.replay:
+        return None
+    return ClientPool(connections=args.connections,
+                      max_streams=args.streams_per_connection,
+                      keepalive_s=args.keepalive,
+                      warmup=not args.no_warmup)
+
+
+def make_client(args: argparse.Namespace, config: Optional[RunConfig] = None,
+                pool: Optional[ClientPool] = None) -> LLMClient:
+    """
+    Build the inference client from CLI arguments.
+
+    `--backend xai` (default) builds a GrokClient, attaching a response cache
+    if requested; `mock` and `replay` build offline clients that need no API key.
+
+    Args:
+        args: Parsed command-line arguments
+        config: Run config (--config) setting the model and sampling parameters
+        pool: Connection pool for the GrokClient (see make_pool())
+
+    Returns:
+        Configured client
+    """
+    if args.backend == "mock":
+        return MockClient(model=config.model if config else "mock",
+                          latency=LatencyModel(args.mock_latency, args.mock_latency_mean),
+                          error_rate=args.mock_error_rate,
+                          rpm=args.mock_rpm,
+                          capacity=args.mock_capacity,
+                          seed=args.seed,
+                          truncation_rate=args.mock_truncation_rate,
+                          stream=args.stream_tokens,
+                          token_budget=args.token_budget,
+                          stall_timeout=args.stall_timeout)
+    if args.backend == "replay":
+        if not args.replay_from:
+            raise ValueError("--backend replay requires --replay-from PATH")
+        if args.token_budget is not None or args.stall_timeout is not None:
+            raise ValueError("--token-budget and --stall-timeout do not apply to --backend replay, "
+                             "which serves recorded responses")
+        return ReplayClient(args.replay_from)
+
+    cache = None
+    if args.cache:
+        max_bytes = int(args.cache_max_mb * 1024 * 1024) if args.cache_max_mb else None
+        cache = ResponseCache(args.cache,
+                              max_entries=args.cache_max_entries,
+                              max_bytes=max_bytes,
+                              read_only=args.replay)
+    elif args.replay:
+        raise ValueError("--replay requires --cache PATH")
+    if config is not None:
+        return config.make_client(cache, pool)
+    kwargs = dict(cache=cache, stream=args.stream_tokens, token_budget=args.token_budget,
+                  stall_timeout=args.stall_timeout)
+    return pool.client(**kwargs) if pool is not None else GrokClient(**kwargs)
+
+
+def baseline_accuracy(value: str) -> float:
+    """Reference accuracy given as a number or as the results of a previous run."""
+    try:
+        return float(value)
+    except ValueError:
+        return update_aggregate(value).summary()["mean_acc"]
+
+
+def make_early_stop(args: argparse.Namespace) -> Optional[EarlyStopConfig]:
+    """Early-stop settings from CLI arguments (None unless a stopping rule is given)."""
+    if args.stop_margin is None and args.stop_baseline is None:
+        return None
+    return EarlyStopConfig(margin=args.stop_margin,
+                           baseline=(baseline_accuracy(args.stop_baseline)
+                                     if args.stop_baseline is not None else None),
+                           min_items=args.stop_min_items,
+                           seed=args.seed)
+
+
+def make_evaluator(args: argparse.Namespace,
+                   pool: Optional[ClientPool] = None) -> Optional[EvaluationStage]:
+    """
+    Evaluation stage from CLI arguments (None: the runner's default stage).
+
+    --judge-model gives LLM-judge calls their own client (with its own
+    --judge-cache) on a pool of --judge-parallel workers. The judge client
+    shares the connections of `pool` when given.
+    """
+    if args.judge_model is None and args.judge_parallel is None:
+        return None
+    judge_client = None
+    if args.judge_model is not None:
+        cache = ResponseCache(args.judge_cache) if args.judge_cache else None
+        judge_client = (pool.client(model=args.judge_model, cache=cache) if pool is not None
+                        else GrokClient(model=args.judge_model, cache=cache))
+    return EvaluationStage(judge_client, max_parallel=args.judge_parallel or args.max_parallel)
+
+
+def make_runner(args: argparse.Namespace, client: LLMClient) -> EvaluationRunner:
+    """
+    Build the evaluation runner from CLI arguments.
+
+    With --adaptive, --max-parallel is the starting concurrency and the AIMD
+    controller searches for the provider limit up to --max-concurrency.
+    All limits apply per process; with --shards, --max-rpm and --max-tpm are
+    divided evenly between shards.
+
+    Args:
+        args: Parsed command-line arguments
+        client: Client used for inference
+
+    Returns:
+        Configured EvaluationRunner (a BatchRunner when --batch-dir is given)
+    """
+    # Options shared by live and batch runs
+    runner_kwargs = dict(dedupe_prompts=args.dedupe, early_stop=make_early_stop(args),
+                         prefix_window=args.prefix_window,
+                         num_shards=args.shards, shard_index=args.shard_index or 0,
+                         example_ids=SubsetIndex.load(args.subset).ids if args.subset else None,
+                         evaluator=make_evaluator(args, getattr(client, 'pool', None)))
+    if args.batch_dir:
+        return BatchRunner(FileBatchBackend(args.batch_dir),
+                           batch_size=args.batch_size,
+                           poll_interval=args.batch_poll_interval,
+                           **runner_kwargs)
+
+    limiter = None
+    if args.adaptive:
+        limiter = AdaptiveConcurrencyLimiter(initial=args.max_parallel,
+                                             max_limit=args.max_concurrency,
+                                             latency_target=args.latency_target)
+    rate_budget = None
+    if args.max_rpm or args.max_tpm:
+        # Limits are account-wide, so each shard gets an equal share
+        rate_budget = RateBudget(rpm=args.max_rpm / args.shards if args.max_rpm else None,
+                                 tpm=args.max_tpm / args.shards if args.max_tpm else None)
+    retry_policy = RetryPolicy()
+    if args.max_retries is not None:
+        retry_policy.max_retries.update({RATE_LIMIT: args.max_retries, TRANSIENT: args.max_retries})
+    return EvaluationRunner(client, max_parallel=args.max_parallel, limiter=limiter,
+                            rate_budget=rate_budget, retry_policy=retry_policy,
+                            warm_prefixes=args.prefix_warmup,
+                            **runner_kwargs)
+
+
+def report_dedupe_stats(client: LLMClient, runner: EvaluationRunner):
+    """Print how many API calls request deduplication saved."""
+    coalesced = getattr(client, 'coalesced_calls', 0)
+    if runner.calls_saved or coalesced:
+        print(f"Deduplication saved {runner.calls_saved + coalesced} calls "
+              f"({runner.calls_saved} duplicate prompts collapsed, "
+              f"{coalesced} concurrent requests coalesced)")
+
+
+async def serve_batches_during(coro, server: LocalBatchServer, poll_interval: float = 1.0):
+    """Run `coro` while an in-process batch server fulfils the jobs it submits."""
+    serve_task = asyncio.create_task(server.serve_forever(poll_interval))
+    try:
+        return await coro
+    finally:
+        serve_task.cancel()
+
+
+async def serve_status_during(coro, server: StatusServer):
+    """Run `coro` while `server` exposes the runner's live status."""
+    async with server:
+        print(f"Status endpoint: {server.address}")
+        return await coro
+
+
+def shard_status_address(args: argparse.Namespace, index: int) -> Tuple[Optional[int], Optional[str]]:
+    """Status port and socket of shard `index`: --status-port + index, or --status-socket.shard<index>."""
+    port = args.status_port + index if args.status_port else args.status_port  # 0 stays 0 (any free port)
+    socket_path = f"{args.status_socket}.shard{index}" if args.status_socket else None
+    return port, socket_path
+
+
+def report_pool_stats(pool: Optional[ClientPool]):
+    """Print how busy the pooled connections were."""
+    if pool is None or not pool.leases:
+        return
+    stats = pool.stats()
+    print(f"Connections: {stats['connections']} x {stats['max_streams']} streams, peak "
+          f"{stats['peak_in_flight']} calls in flight, mean utilization {stats['mean_utilization']:.1%}, "
+          f"{stats['waited_leases']} calls waited {stats['wait_s']:.1f}s for a stream")
+
+
+@asynccontextmanager
+async def default_client(client: Optional[LLMClient]) -> AsyncIterator[LLMClient]:
+    """`client`, or a GrokClient on a ClientPool of its own that is closed afterwards."""
+    if client is not None:
+        yield client
+        return
+    async with ClientPool() as pool:
+        yield pool.client()
 
-    print(f"Running MCQ baseline evaluation on {input_path}...")
-    results = await runner.run_benchmark(benchmark, input_path, output_path)
 
-    # Compute and print accuracy
-    acc, lo, hi, n = compute_binary_accuracy(results)
-    print(f"MCQ Baseline Accuracy: {acc:.4f} (95% CI {lo:.4f}-{hi:.4f}, n={n})")
+def report_cache_stats(client: LLMClient):
+    """Print response cache hit/miss counters if the client has a cache."""
+    if getattr(client, 'cache', None) is None:
+        return
+    stats = client.cache.stats()
+    print(f"Response cache: {stats['hits']} hits, {stats['misses']} misses "
+          f"(hit rate {stats['hit_rate']:.2%}), {stats['entries']} entries, "
+          f"{stats['evictions']} evicted")
 
 
-async def run_gsm8k_baseline(input_path: str, output_path: str):
+def report_telemetry(runner: EvaluationRunner, output_path: str,
+                     prometheus_path: Optional[str] = None):
+    """
+    Print a one-line usage summary and export run metrics.
+
+    The JSON summary is always written next to the results as
+    `<output_path>.metrics.json`; Prometheus text metrics are written
+    only when a path is given.
+    """
+    telemetry = runner.telemetry
+    summary = telemetry.summary()
+    cost = summary['cost_usd']
+    print(f"Usage: {summary['billed_calls']} API calls, "
+          f"{summary['prompt_tokens']} prompt / {summary['completion_tokens']} completion tokens "
+          f"({summary['tokens_per_s']:.0f} tok/s), latency p50/p95/p99 "
+          f"{summary['latency_s']['p50']:.2f}/{summary['latency_s']['p95']:.2f}/"
+          f"{summary['latency_s']['p99']:.2f}s, "
+          f"{summary['prompt_cache_ratio']:.1%} of prompt tokens cached, cost "
+          + (f"${cost:.4f}" if cost is not None else "unknown"))
+    if telemetry.ttft.count or telemetry.truncated:
+        print(f"Streaming: time to first token p50/p95 {summary['ttft_s']['p50']:.2f}/"
+              f"{summary['ttft_s']['p95']:.2f}s, inter-token latency p50 "
+              f"{summary['inter_token_s']['p50'] * 1000:.1f}ms, "
+              f"{summary['truncated_calls']} generations truncated")
+    telemetry.write_json(output_path + '.metrics.json')
+    if prometheus_path:
+        telemetry.write_prometheus(prometheus_path)
+    judge = runner.evaluator.telemetry
+    if judge.calls:
+        judge_summary = judge.summary()
+        judge_cost = judge_summary['cost_usd']
+        print(f"Judge usage: {judge_summary['billed_calls']} API calls, "
+              f"{judge_summary['prompt_tokens']} prompt / {judge_summary['completion_tokens']} "
+              f"completion tokens, cost " + (f"${judge_cost:.4f}" if judge_cost is not None else "unknown"))
+        judge.write_json(output_path + '.judge.metrics.json')
+
+
+def report_subset_estimate(subset_path: str, output_path: str):
+    """Print the full-dataset accuracy estimated from a run over a subset."""
+    index = SubsetIndex.load(subset_path)
+    est = index.estimate(load_outcomes(output_path, by="group"))
+    print(f"Full-set estimate from subset ({est['n_examples']} of {index.n_examples} examples): "
+          f"{est['accuracy']:.4f} (95% CI {est['ci_low']:.4f}-{est['ci_high']:.4f}, "
+          f"unweighted {est['unweighted_accuracy']:.4f})")
+    if est["missing_examples"]:
+        print(f"Warning: {est['missing_examples']} subset examples have no evaluated results")
+
+
+def export_columnar(output_path: str, columnar: str):
+    """Convert the results JSONL to a columnar directory ('auto' = <output>.parquet)."""
+    path = jsonl_to_columnar(output_path, None if columnar == "auto" else columnar)
+    print(f"Columnar results written to {path}")
+
+
+async def run_baseline(benchmark: Any,
+                       label: str,
+                       input_path: str,
+                       output_path: str,
+                       client: LLMClient,
+                       max_parallel: int = 10,
+                       stream: bool = False,
+                       resume: bool = False,
+                       runner: Optional[EvaluationRunner] = None,
+                       mode: str = "Baseline"):
+    """
+    Run an evaluation for any binary benchmark and print its accuracy.
+
+    Args:
+        benchmark: Benchmark instance to evaluate
+        label: Human-readable benchmark name for log output
+        input_path: Path to input JSONL dataset
+        output_path: Path to output JSONL results
+        client: Client used for inference
+        max_parallel: Maximum concurrent API calls
+        stream: Use bounded-memory streaming (results appended as they complete)
+        resume: Skip items already completed in output_path; rerun failed ones
+        runner: Preconfigured runner (default: fixed-concurrency runner over client)
+        mode: Evaluation mode name for log output
+    """
+    runner = runner or EvaluationRunner(client, max_parallel=max_parallel)
+
+    print(f"Running {label} {mode.lower()} evaluation on {input_path}...")
+    if stream:
+        stats = await runner.stream_benchmark(benchmark, input_path, output_path,
+                                              resume=resume)
+        acc, lo, hi, n = stats.binary_accuracy()
+        n_items, n_samples = stats.n_items, stats.n_samples
+    else:
+        results = await runner.run_benchmark(benchmark, input_path, output_path,
+                                           resume=resume)
+        acc, lo, hi, n = compute_binary_accuracy(results)
+        n_items = len(results)
+        n_samples = sum(item.metadata.get('samples_used', 0) for item in results.items)
+
+    # Print accuracy
+    print(f"{label} {mode} Accuracy: {acc:.4f} (95% CI {lo:.4f}-{hi:.4f}, n={n})")
+
+    if runner.progress.stop_reason is not None:
+        total = runner.progress.total
+        print(f"Stopped early after {runner.progress.completed}"
+              + (f" of {total}" if total is not None else "")
+              + f" items: {runner.progress.stop_reason}")
+
+    # Report how many samples early stopping saved relative to the full budget
+    if runner.self_consistency is not None and n_items:
+        budget = n_items * runner.self_consistency.max_samples
+        print(f"Samples drawn: {n_samples} of {budget} "
+              f"({n_samples / n_items:.2f}/item, {1 - n_samples / budget:.1%} saved by early stopping)")
+
+
+async def run_mcq_baseline(input_path: str, output_path: str,
+                           client: Optional[LLMClient] = None,
+                           benchmark: Optional[MCQBenchmark] = None, **kwargs):
+    """Run MCQ baseline evaluation."""
+    async with default_client(client) as client:
+        await run_baseline(benchmark or MCQBenchmark(), "MCQ", input_path, output_path,
+                           client, **kwargs)
+
+
+async def run_gsm8k_baseline(input_path: str, output_path: str,
+                             client: Optional[LLMClient] = None,
+                             benchmark: Optional[GSM8KBenchmark] = None, **kwargs):
     """Run GSM8K baseline evaluation."""
-    client = GrokClient()
-    benchmark = GSM8KBenchmark()
-    runner = EvaluationRunner(client, max_parallel=10)
+    async with default_client(client) as client:
+        await run_baseline(benchmark or GSM8KBenchmark(), "GSM8K", input_path, output_path,
+                           client, **kwargs)
 
-    print(f"Running GSM8K baseline evaluation on {input_path}...")
-    results = await runner.run_benchmark(benchmark, input_path, output_path)
 
-    # Compute and print accuracy
-    acc, lo, hi, n = compute_binary_accuracy(results)
-    print(f"GSM8K Baseline Accuracy: {acc:.4f} (95% CI {lo:.4f}-{hi:.4f}, n={n})")
+async def run_gsm8k_self_consistency(input_path: str, output_path: str,
+                                     client: Optional[LLMClient] = None,
+                                     samples: int = 5,
+                                     min_samples: int = 3,
+                                     confidence: Optional[float] = None,
+                                     runner: Optional[EvaluationRunner] = None,
+                                     benchmark: Optional[GSM8KBenchmark] = None,
+                                     **kwargs):
+    """
+    Run GSM8K self-consistency: majority vote over up to `samples` concurrent samples.
+
+    Args:
+        input_path: Path to input JSONL dataset
+        output_path: Path to output JSONL results
+        client: Client used for inference
+        samples: Maximum samples per question
+        min_samples: Samples drawn before the confidence threshold may stop voting
+        confidence: Optional vote share at which to stop early
+        runner: Preconfigured runner to enable self-consistency on
+        benchmark: Preconfigured benchmark (default: GSM8KBenchmark())
+        **kwargs: Forwarded to run_baseline()
+    """
+    async with default_client(client) as client:
+        runner = runner or EvaluationRunner(client, max_parallel=kwargs.pop('max_parallel', 10))
+        runner.self_consistency = SelfConsistencyConfig(max_samples=samples,
+                                                        min_samples=min_samples,
+                                                        confidence=confidence)
+        await run_baseline(benchmark or GSM8KBenchmark(), "GSM8K", input_path, output_path, client,
+                           runner=runner, mode=f"Self-Consistency (n={samples})", **kwargs)
+
+
+async def run_mcq_robust(input_path: str, output_path: str,
+                         client: Optional[LLMClient] = None,
+                         num_shuffles: Optional[int] = None,
+                         strategy: str = "cyclic",
+                         seed: int = 7,
+                         runner: Optional[EvaluationRunner] = None,
+                         benchmark: Optional[MCQBenchmark] = None,
+                         **kwargs):
+    """
+    Run RobustMC: every question is evaluated under K option permutations.
+
+    All variants of all questions run concurrently; the printed summary
+    covers mean accuracy, per-position accuracy and worst-case group accuracy.
+
+    Args:
+        input_path: Path to input JSONL dataset
+        output_path: Path to output JSONL results
+        client: Client used for inference
+        num_shuffles: Permutations per question (default: one per option)
+        strategy: Permutation strategy ('cyclic', 'latin' or 'random')
+        seed: Seed for the 'random' strategy
+        runner: Preconfigured runner to enable permutations on
+        benchmark: Preconfigured benchmark (default: MCQBenchmark())
+        **kwargs: Forwarded to run_baseline()
+    """
+    async with default_client(client) as client:
+        runner = runner or EvaluationRunner(client, max_parallel=kwargs.pop('max_parallel', 10))
+        runner.permutations = PermutationConfig(num_permutations=num_shuffles,
+                                                strategy=strategy, seed=seed)
+        await run_baseline(benchmark or MCQBenchmark(), "MCQ", input_path, output_path, client,
+                           runner=runner, mode=f"RobustMC ({strategy})", **kwargs)
+
+    summary = summarize_robust(output_path)
+    per_pos = ", ".join(f"{'ABCDEFGH'[p]}={acc:.3f}" for p, acc in summary["per_position_acc"].items())
+    print(f"RobustMC over {summary['n_groups']} questions: mean {summary['mean_acc']:.4f}, "
+          f"worst-case {summary['worst_case_acc']:.4f}, majority {summary['majority_acc']:.4f}, "
+          f"shuffle std {summary['shuffle_acc_std']:.4f}")
+    print(f"Accuracy by gold position: {per_pos}")
+
+
+def run_rescore(benchmark: Any, label: str, args: argparse.Namespace):
+    """
+    Re-evaluate the stored responses in args.input_path into args.output_path.
+
+    Makes no inference calls: pure evaluate() runs in a process pool (see
+    src/rescore.py); benchmarks with LLM judges go through the evaluation stage.
+    """
+    print(f"Rescoring {label} results in {args.input_path}...")
+    if benchmark.uses_judge:
+        pool = make_pool(args) if args.judge_model else None
+        stage = make_evaluator(args, pool) or EvaluationStage(max_parallel=args.max_parallel)
+        coro = evaluate_stored(benchmark, args.input_path, args.output_path, stage)
+        stats, n_changed = asyncio.run(pool.run(coro) if pool is not None else coro)
+        update_aggregate(args.output_path)
+    else:
+        stats, n_changed = rescore(benchmark, args.input_path, args.output_path,
+                                   workers=args.rescore_workers)
+    acc, lo, hi, n = stats.binary_accuracy()
+    print(f"Rescored {stats.n_items} rows into {args.output_path}: "
+          f"{n_changed} evaluations changed, {stats.n_errors} errors")
+    print(f"{label} Accuracy: {acc:.4f} (95% CI {lo:.4f}-{hi:.4f}, n={n})")
 
 
 def main():
     parser = argparse.ArgumentParser(description="Run benchmark evaluations")
     parser.add_argument("benchmark", choices=["mcq", "gsm8k"],
                         help="Benchmark to run")
-    parser.add_argument("mode", choices=["baseline"],
-                        help="Evaluation mode (more modes coming)")
-    parser.add_argument("input_path", help="Path to input JSONL dataset")
+    parser.add_argument("mode", choices=["baseline", "self_consistency", "robust", "rescore"],
+                        help="Evaluation mode; rescore re-evaluates the stored responses of a "
+                             "results file (input_path) without inference")
+    parser.add_argument("input_path", help="Path to input JSONL dataset (results JSONL for rescore)")
     parser.add_argument("output_path", help="Path to output JSONL results")
+    parser.add_argument("--config", metavar="PATH",
+                        help="Run config JSON (see configs/config.example.json): model, sampling "
+                             "parameters, seed and prompt files")
     parser.add_argument("--max-parallel", type=int, default=10,
                         help="Maximum parallel API calls")
+    parser.add_argument("--num-shuffles", type=positive_int, default=None,
+                        help="RobustMC: option permutations per question (default: one per option)")
+    parser.add_argument("--permutation-strategy", choices=PERMUTATION_STRATEGIES, default="cyclic",
+                        help="RobustMC: how permutations are chosen")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="Seed for random permutations, the early-stop order and the mock backend; "
+                             "not sent to the API (default: the --config seed, else 7)")
+    parser.add_argument("--samples", type=int, default=5,
+                        help="Self-consistency: maximum samples per question")
+    parser.add_argument("--sc-min-samples", type=int, default=3,
+                        help="Self-consistency: samples drawn before --sc-confidence can stop voting")
+    parser.add_argument("--sc-confidence", type=float, default=None,
+                        help="Self-consistency: stop once the leading answer holds this vote share")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="Adapt concurrency with AIMD on rate limits/latency, starting at --max-parallel")
+    parser.add_argument("--max-concurrency", type=int, default=256,
+                        help="Upper bound for adaptive concurrency")
+    parser.add_argument("--latency-target", type=float, default=None,
+                        help="Adaptive mode: treat calls slower than this many seconds as congestion")
+    parser.add_argument("--max-rpm", type=float, default=None,
+                        help="Requests-per-minute budget")
+    parser.add_argument("--max-tpm", type=float, default=None,
+                        help="Tokens-per-minute budget (input estimated from prompt length)")
+    parser.add_argument("--max-retries", type=int, default=None,
+                        help="Retries for rate-limit/transient errors (default: 8 and 4)")
+    parser.add_argument("--batch-dir", metavar="DIR",
+                        help="Submit items as file-based bulk jobs in DIR (see `python -m src.batch serve`)")
+    parser.add_argument("--batch-size", type=int, default=1000,
+                        help="Requests per bulk job")
+    parser.add_argument("--batch-poll-interval", type=float, default=5.0,
+                        help="Seconds between bulk job status checks")
+    parser.add_argument("--batch-local", action="store_true",
+                        help="Fulfil --batch-dir jobs with an in-process worker")
+    parser.add_argument("--dedupe", action="store_true",
+                        help="Collapse items with identical prompts and fan results back out")
+    parser.add_argument("--prefix-window", type=int, default=0,
+                        help="Group requests sharing a prompt prefix within windows of N items "
+                             "(default 0: dataset order)")
+    parser.add_argument("--prefix-warmup", action="store_true",
+                        help="Send the first request of each new prompt prefix alone and hold the rest "
+                             "until it completes, so they hit the provider's prompt cache (default: off)")
+    parser.add_argument("--stop-margin", type=float, default=None,
+                        help="Process items in random order and stop once the 95%% CI half-width "
+                             "of accuracy is at most this (e.g. 0.01)")
+    parser.add_argument("--stop-baseline", metavar="ACC_OR_PATH", default=None,
+                        help="Process items in random order and stop once accuracy is clearly above "
+                             "or below this accuracy, or that of a previous run's results")
+    parser.add_argument("--stop-min-items", type=int, default=200,
+                        help="Evaluated items before early stopping is considered")
+    parser.add_argument("--subset", metavar="INDEX",
+                        help="Only run the examples of a subset index (see `python -m src.subset build`) "
+                             "and report the reweighted full-set accuracy estimate")
+    parser.add_argument("--judge-model", default=None,
+                        help="Model for LLM-judge calls made during evaluation (own client and pool)")
+    parser.add_argument("--judge-parallel", type=int, default=None,
+                        help="Items evaluated / judge calls in flight at once (default: --max-parallel)")
+    parser.add_argument("--judge-cache", metavar="PATH",
+                        help="SQLite response cache for judge calls")
+    parser.add_argument("--rescore-workers", type=int, default=None,
+                        help="Rescore: worker processes (default: one per CPU)")
+    parser.add_argument("--stream", action="store_true",
+                        help="Bounded-memory mode: load lazily and append results as they complete")
+    parser.add_argument("--stream-tokens", action="store_true",
+                        help="Stream model responses, recording time to first token and inter-token latency")
+    parser.add_argument("--token-budget", type=int, default=None,
+                        help="With --stream-tokens: abort generations beyond this many output tokens")
+    parser.add_argument("--stall-timeout", type=float, default=None,
+                        help="With --stream-tokens: abort streams with no new tokens for this many seconds")
+    parser.add_argument("--resume", action="store_true",
+                        help="Resume from output_path: skip completed items, rerun errored ones")
+    parser.add_argument("--connections", type=int, default=2,
+                        help="API connections shared by the model and judge clients")
+    parser.add_argument("--streams-per-connection", type=int, default=100,
+                        help="Concurrent calls per API connection")
+    parser.add_argument("--keepalive", type=float, default=30.0,
+                        help="Seconds between keepalive pings on idle API connections")
+    parser.add_argument("--no-warmup", action="store_true",
+                        help="Do not open and check the API connections before the run")
+    parser.add_argument("--cache", metavar="PATH",
+                        help="SQLite response cache; identical requests are served from disk")
+    parser.add_argument("--cache-max-entries", type=int, default=None,
+                        help="Evict least recently used cache entries beyond this count")
+    parser.add_argument("--cache-max-mb", type=float, default=None,
+                        help="Evict least recently used cache entries beyond this size (MB)")
+    parser.add_argument("--replay", action="store_true",
+                        help="Read-only cache replay: never call the API, fail on cache misses")
+    parser.add_argument("--backend", choices=["xai", "mock", "replay"], default="xai",
+                        help="Inference backend: live xAI API, simulated mock, or replay of recorded results")
+    parser.add_argument("--mock-latency", choices=LATENCY_DISTRIBUTIONS, default="lognormal",
+                        help="Mock backend latency distribution")
+    parser.add_argument("--mock-latency-mean", type=float, default=0.5,
+                        help="Mock backend mean latency in seconds")
+    parser.add_argument("--mock-error-rate", type=float, default=0.0,
+                        help="Mock backend probability of a transient (503) error per call")
+    parser.add_argument("--mock-rpm", type=float, default=None,
+                        help="Mock backend requests-per-minute limit (excess calls get 429)")
+    parser.add_argument("--mock-capacity", type=int, default=None,
+                        help="Mock backend concurrency limit (excess calls get 429)")
+    parser.add_argument("--mock-truncation-rate", type=float, default=0.0,
+                        help="Fraction of mock calls truncated at max_tokens")
+    parser.add_argument("--replay-from", metavar="PATH", nargs="+",
+                        help="Results JSONL files or directories served by --backend replay")
+    parser.add_argument("--shards", type=int, default=1,
+                        help="Split the dataset into N shards by example id; without --shard-index, "
+                             "run all shards as local processes and merge the results")
+    parser.add_argument("--shard-index", type=int, default=None,
+                        help="Run only shard I of --shards (e.g. one shard per host)")
+    parser.add_argument("--shard-workers", type=int, default=None,
+                        help="Maximum shard processes running at once (default: all shards)")
+    parser.add_argument("--columnar", metavar="DIR", nargs="?", const="auto",
+                        help="Also write results as Parquet (prompts/examples deduplicated) to DIR "
+                             "(default: <output>.parquet); requires pyarrow")
+    parser.add_argument("--prometheus", metavar="PATH",
+                        help="Also write run metrics in Prometheus text format to PATH")
+    parser.add_argument("--status-port", type=int, default=None,
+                        help="Serve live progress as JSON on http://127.0.0.1:PORT/status "
+                             "(Prometheus text on /metrics); shard i of --shards serves on PORT+i")
+    parser.add_argument("--status-socket", metavar="PATH",
+                        help="Serve live progress on a Unix socket instead of a TCP port; "
+                             "shard i of --shards serves on PATH.shard<i>")
 
     args = parser.parse_args()
+    config = RunConfig.load(args.config) if args.config else None
+    if args.seed is None:
+        args.seed = config.seed if config is not None else 7
+    if config is not None:
+        # Streaming flags given on the command line take precedence over the config's
+        config = dataclasses.replace(
+            config,
+            stream=config.stream or args.stream_tokens,
+            token_budget=args.token_budget if args.token_budget is not None else config.token_budget,
+            stall_timeout_s=args.stall_timeout if args.stall_timeout is not None else config.stall_timeout_s)
+        args.stream_tokens = config.stream
+        args.token_budget, args.stall_timeout = config.token_budget, config.stall_timeout_s
+    benchmark = config.make_benchmark(args.benchmark) if config is not None else None
+
+    if args.mode == "rescore":
+        if args.benchmark == "mcq":
+            run_rescore(benchmark or MCQBenchmark(), "MCQ", args)
+        else:
+            run_rescore(benchmark or GSM8KBenchmark(), "GSM8K", args)
+        return 0
+
+    if args.shards > 1 and args.shard_index is None:
+        # Launcher: run every shard in its own process, then merge
+        if args.status_port or args.status_socket:
+            addresses = [shard_status_address(args, i) for i in range(args.shards)]
+            print("Shard status endpoints: " + ", ".join(
+                socket_path or f"port {port}" for port, socket_path in addresses))
+        codes = launch_shards(sys.argv[1:], args.output_path, args.shards, args.shard_workers)
+        if any(codes):
+            print(f"{sum(1 for c in codes if c)} of {args.shards} shards failed; "
+                  f"rerun with --resume, then `python -m src.sharding merge`")
+            return 1
+        stats = merge_shards(args.output_path, args.shards)
+        acc, lo, hi, n = stats.binary_accuracy()
+        print(f"Merged {args.shards} shards into {args.output_path}")
+        print(f"Accuracy: {acc:.4f} (95% CI {lo:.4f}-{hi:.4f}, n={n})")
+        if args.subset:
+            report_subset_estimate(args.subset, args.output_path)
+        if args.columnar:
+            export_columnar(args.output_path, args.columnar)
+        return 0
+    if args.shard_index is not None:
+        # Each shard writes its own results file next to the final output
+        args.output_path = shard_path(args.output_path, args.shard_index, args.shards)
+        # Not finished until this run says so, even if an earlier run had finished
+        clear_shard_done(args.output_path)
+        # ...and serves its status on its own port or socket
+        args.status_port, args.status_socket = shard_status_address(args, args.shard_index)
+
+    pool = make_pool(args)
+    client = make_client(args, config, pool)
+    runner = make_runner(args, client)
+    run_kwargs = dict(stream=args.stream, resume=args.resume, runner=runner)
+    if benchmark is not None:
+        run_kwargs['benchmark'] = benchmark
 
     # Route to appropriate evaluation function
     if args.benchmark == "mcq" and args.mode == "baseline":
-        asyncio.run(run_mcq_baseline(args.input_path, args.output_path))
+        coro = run_mcq_baseline(args.input_path, args.output_path, client, **run_kwargs)
     elif args.benchmark == "gsm8k" and args.mode == "baseline":
-        asyncio.run(run_gsm8k_baseline(args.input_path, args.output_path))
+        coro = run_gsm8k_baseline(args.input_path, args.output_path, client, **run_kwargs)
+    elif args.benchmark == "mcq" and args.mode == "robust":
+        coro = run_mcq_robust(args.input_path, args.output_path, client,
+                              num_shuffles=args.num_shuffles,
+                              strategy=args.permutation_strategy,
+                              seed=args.seed, **run_kwargs)
+    elif args.benchmark == "gsm8k" and args.mode == "self_consistency" and not args.batch_dir:
+        coro = run_gsm8k_self_consistency(args.input_path, args.output_path, client,
+                                          samples=args.samples,
+                                          min_samples=args.sc_min_samples,
+                                          confidence=args.sc_confidence,
+                                          **run_kwargs)
     else:
         print(f"Unsupported combination: {args.benchmark} + {args.mode}")
         return 1
 
+    if args.batch_dir and args.batch_local:
+        server = LocalBatchServer(FileBatchBackend(args.batch_dir), client,
+                                  max_parallel=args.max_parallel)
+        coro = serve_batches_during(coro, server)
+    if args.status_port is not None or args.status_socket:
+        coro = serve_status_during(coro, StatusServer(runner, port=args.status_port,
+                                                      socket_path=args.status_socket))
+    if pool is not None:
+        # Outermost: connections open before the run and drain after everything else
+        coro = pool.run(coro)
+    asyncio.run(coro)
+
+    report_cache_stats(client)
+    report_pool_stats(pool)
+    report_dedupe_stats(client, runner)
+    report_telemetry(runner, args.output_path, args.prometheus)
+    # Precompute the aggregate sidecar so later summaries need not reparse the rows
+    update_aggregate(args.output_path)
+    if args.subset and args.shard_index is None:
+        report_subset_estimate(args.subset, args.output_path)
+    if args.columnar and args.shard_index is None:
+        export_columnar(args.output_path, args.columnar)
+    if args.shard_index is not None:
+        # Last write of a shard: merge_shards() only merges shards with this marker
+        mark_shard_done(args.output_path)
     return 0
 
 
@@ -3,25 +3,58 @@ Async evaluation runner for executing benchmarks with parallel inference.
 
 This module provides the EvaluationRunner class that handles:
 - Parallel async LLM API calls
-- Result collection and persistence
+- Bounded-memory streaming over lazily loaded datasets
+- Result collection and persistence, with crash-safe checkpointing and resume
 - Progress tracking
-- Rate limiting and error handling
+- Rate limiting (fixed or adaptive AIMD concurrency, RPM/TPM budgets)
+- Error handling with jittered exponential retries
 """
 
 import asyncio
+import itertools
 import json
+import math
+import random
+import time
+import zlib
+from collections import Counter
 from dataclasses import dataclass, asdict
-from typing import List, Dict, Any, Optional, TypeVar, Generic
+from statistics import NormalDist
+from typing import (List, Dict, Any, Optional, TypeVar, Generic, Iterable, Iterator,
+                    AsyncIterator, Tuple, Set)
 from tqdm.asyncio import tqdm
 from pydantic import BaseModel
 
+from .augment import apply_permutation, permutation_set
 from .benchmark import Benchmark
+from .checkpoint import CheckpointLog, prepare_resume
+from .datasets.indexed import IndexedJsonl
+from .columnar import write_columnar
+from .judge import EvaluationStage
+from .metrics import wilson_ci
+from .sharding import shard_of
+from .ratelimit import (AdaptiveConcurrencyLimiter, ConcurrencyLimiter, RateBudget,
+                        RetryPolicy, classify_error, estimate_tokens)
+from .status import RunProgress
+from .telemetry import CallUsage, RunTelemetry
 
 # Type variables matching the Benchmark generics
 TResponse = TypeVar('TResponse', bound=BaseModel)
 TEvaluation = TypeVar('TEvaluation')
 
 
+def serialize_evaluation(evaluation: Any) -> Any:
+    """JSON form of an evaluation result, as stored in the results' 'evaluation' field."""
+    # Handle various evaluation types
+    if evaluation is None:
+        return None
+    if hasattr(evaluation, '__dict__'):
+        # Dataclass or object
+        return asdict(evaluation) if hasattr(evaluation, '__dataclass_fields__') else str(evaluation)
+    # Primitive or Enum
+    return evaluation.value if hasattr(evaluation, 'value') else evaluation
+
+
 @dataclass
 class EvaluationItem(Generic[TResponse, TEvaluation]):
     """
@@ -57,19 +90,41 @@ class EvaluationItem(Generic[TResponse, TEvaluation]):
         else:
             result["parsed_response"] = None
 
-        # Handle various evaluation types
-        if self.evaluation is not None:
-            if hasattr(self.evaluation, '__dict__'):
-                # Dataclass or object
-                result["evaluation"] = asdict(self.evaluation) if hasattr(self.evaluation, '__dataclass_fields__') else str(self.evaluation)
-            else:
-                # Primitive or Enum
-                result["evaluation"] = self.evaluation.value if hasattr(self.evaluation, 'value') else self.evaluation
-        else:
-            result["evaluation"] = None
+        result["evaluation"] = serialize_evaluation(self.evaluation)
 
         return result
 
+    @classmethod
+    def from_dict(cls,
+                  data: Dict[str, Any],
+                  response_model: Optional[type] = None) -> 'EvaluationItem':
+        """
+        Rebuild an item from its JSONL dictionary form (inverse of to_dict()).
+
+        The parsed response is re-validated into `response_model` when given.
+        Evaluations are restored as their serialized JSON value (bool/int/str/dict),
+        since richer evaluation types cannot be reconstructed generically.
+
+        Args:
+            data: Dictionary produced by to_dict()
+            response_model: Optional Pydantic model class for parsed_response
+
+        Returns:
+            Reconstructed EvaluationItem
+        """
+        parsed = data.get("parsed_response")
+        if parsed is not None and response_model is not None:
+            parsed = response_model.model_validate(parsed)
+        return cls(
+            item_id=data["item_id"],
+            group_id=data.get("group_id"),
+            example=data.get("example", {}),
+            prompt=data.get("prompt", ""),
+            parsed_response=parsed,
+            evaluation=data.get("evaluation"),
+            metadata=data.get("metadata") or {},
+        )
+
 
 class EvaluationResults(Generic[TResponse, TEvaluation]):
     """
@@ -93,10 +148,177 @@ class EvaluationResults(Generic[TResponse, TEvaluation]):
             for item in self.items:
                 f.write(json.dumps(item.to_dict()) + '\n')
 
+    def to_columnar(self, path: str):
+        """Save results as a columnar (Parquet) directory; requires pyarrow."""
+        write_columnar((item.to_dict() for item in self.items), path)
+
     def __len__(self) -> int:
         return len(self.items)
 
 
+@dataclass
+class RunStats:
+    """
+    Running counters for a streamed evaluation.
+
+    Streaming runs never hold all items in memory, so these counters replace
+    EvaluationResults as the summary of what was processed.
+    """
+    n_items: int = 0        # Items completed (including errors)
+    n_errors: int = 0       # Items whose inference or evaluation raised
+    n_evaluated: int = 0    # Items with a non-None evaluation
+    n_true: int = 0         # Evaluated items whose evaluation is truthy (binary benchmarks)
+    n_samples: int = 0      # Model samples drawn (self-consistency mode)
+
+    def record(self, item: EvaluationItem):
+        """Update counters with one completed item."""
+        self.n_items += 1
+        self.n_samples += item.metadata.get('samples_used', 0)
+        if 'error' in item.metadata:
+            self.n_errors += 1
+        if item.evaluation is not None:
+            self.n_evaluated += 1
+            if item.evaluation:
+                self.n_true += 1
+
+    def record_row(self, row: Dict[str, Any]):
+        """Update counters with one already-serialized result row (e.g. from a checkpoint)."""
+        self.n_items += 1
+        self.n_samples += (row.get('metadata') or {}).get('samples_used', 0)
+        if (row.get('metadata') or {}).get('error') is not None:
+            self.n_errors += 1
+        if row.get('evaluation') is not None:
+            self.n_evaluated += 1
+            if row['evaluation']:
+                self.n_true += 1
+
+    def binary_accuracy(self) -> Tuple[float, float, float, int]:
+        """
+        Accuracy over evaluated items, treating evaluations as booleans.
+
+        Returns:
+            Tuple of (accuracy, ci_low, ci_high, n)
+        """
+        n = self.n_evaluated
+        if n == 0:
+            return 0.0, 0.0, 0.0, 0
+        acc = self.n_true / n
+        lo, hi = wilson_ci(acc, n)
+        return acc, lo, hi, n
+
+
+@dataclass
+class SelfConsistencyConfig:
+    """
+    Settings for self-consistency (multi-sample majority vote) evaluation.
+
+    max_samples bounds the samples per item. Without a confidence threshold
+    the first wave is a bare majority of max_samples (the fewest samples that
+    can decide the vote); with one, the first wave is min_samples.
+    """
+    max_samples: int = 5
+    min_samples: int = 3
+    confidence: Optional[float] = None  # Stop once the leader holds this share of valid votes
+
+    def first_wave(self) -> int:
+        """Number of samples to draw concurrently before the first vote check."""
+        if self.confidence is not None:
+            return max(1, min(self.min_samples, self.max_samples))
+        return self.max_samples // 2 + 1
+
+    def next_wave(self, leader: int, runner_up: int, valid: int, remaining: int) -> int:
+        """
+        Smallest follow-up wave that could end the vote.
+
+        If all x new samples went to the leader, it becomes unbeatable once
+        leader + x > runner_up + (remaining - x), i.e. x > (runner_up + remaining - leader) / 2.
+        With a confidence threshold c, the leader's share reaches c once
+        (leader + x) / (valid + x) >= c, i.e. x >= (c * valid - leader) / (1 - c).
+        """
+        wave = (runner_up + remaining - leader) // 2 + 1
+        if self.confidence is not None and self.confidence < 1:
+            needed = math.ceil((self.confidence * valid - leader) / (1 - self.confidence))
+            wave = min(wave, needed)
+        return max(1, min(wave, remaining))
+
+
+@dataclass
+class PermutationConfig:
+    """
+    Settings for expanding each MCQ example into option-permuted variants.
+
+    Every variant becomes its own item sharing the example's group_id, so all
+    permutations of all questions run concurrently through the pipeline.
+    """
+    num_permutations: Optional[int] = None  # Variants per question (default: one per option)
+    strategy: str = "cyclic"                # 'cyclic', 'latin' or 'random' (see augment.permutation_set)
+    seed: int = 7                           # Seed for the 'random' strategy
+
+    def __post_init__(self):
+        if self.num_permutations is not None and self.num_permutations < 1:
+            raise ValueError(f"num_permutations must be at least 1, got {self.num_permutations}")
+
+
+@dataclass
+class EarlyStopConfig:
+    """
+    Settings for stopping a run once its accuracy is known well enough.
+
+    Examples are processed in a seeded random order, so the items completed
+    at any point are a uniform sample of the dataset, and the run stops as
+    soon as the Wilson interval of the running accuracy is either narrow
+    enough (margin) or clearly on one side of a reference accuracy
+    (baseline). Checks happen every `check_every` evaluated items; since
+    every check is another chance to stop on noise, the baseline test uses a
+    stricter confidence than the margin test. With permutations, variants of
+    a question stay together and are counted as separate items.
+    """
+    margin: Optional[float] = None          # Stop once the CI half-width is at most this
+    baseline: Optional[float] = None        # Stop once the CI excludes this accuracy
+    confidence: float = 0.95                # Confidence of the margin interval
+    baseline_confidence: float = 0.99       # Confidence of the baseline separation test
+    min_items: int = 200                    # Evaluated items before the first check
+    check_every: int = 50                   # Evaluated items between checks
+    seed: int = 0                           # Seed of the processing order
+
+    def should_stop(self, n_true: int, n: int) -> Optional[str]:
+        """
+        Check the running accuracy of n evaluated items.
+
+        Returns:
+            Reason for stopping, or None to keep going
+        """
+        if n < self.min_items or (n - self.min_items) % self.check_every:
+            return None
+        acc = n_true / n
+        if self.margin is not None:
+            lo, hi = wilson_ci(acc, n, z=NormalDist().inv_cdf((1 + self.confidence) / 2))
+            if (hi - lo) / 2 <= self.margin:
+                return (f"accuracy {acc:.4f} within +/-{self.margin:g} "
+                        f"({self.confidence:.0%} CI {lo:.4f}-{hi:.4f}, n={n})")
+        if self.baseline is not None:
+            lo, hi = wilson_ci(acc, n, z=NormalDist().inv_cdf((1 + self.baseline_confidence) / 2))
+            if lo > self.baseline or hi < self.baseline:
+                side = "above" if lo > self.baseline else "below"
+                return (f"accuracy {acc:.4f} is {side} baseline {self.baseline:.4f} "
+                        f"({self.baseline_confidence:.0%} CI {lo:.4f}-{hi:.4f}, n={n})")
+        return None
+
+    def order(self, examples: Iterable[Dict[str, Any]]) -> Iterable[Dict[str, Any]]:
+        """Examples in the seeded random processing order (an indexed dataset stays unparsed)."""
+        if isinstance(examples, IndexedJsonl):
+            positions = list(range(len(examples)))
+            random.Random(self.seed).shuffle(positions)
+            return examples.take(positions)
+        examples = list(examples)
+        random.Random(self.seed).shuffle(examples)
+        return examples
+
+
+# Sentinel passed through the pipeline queues to signal end of input
+_DONE = object()
+
+
 class EvaluationRunner:
     """
     Handles async parallel evaluation execution.
@@ -106,115 +328,759 @@ class EvaluationRunner:
     2. Format prompts for each example
     3. Make parallel async API calls to get model responses
     4. Parse responses using benchmark's schema
-    5. Evaluate responses (potentially with async LLM judge)
+    5. Evaluate responses (potentially with async LLM judge) in a separate
+       evaluation stage with its own worker pool (see src/judge.py)
     6. Collect and persist results
     """
 
-    def __init__(self, client, max_parallel: int = 10):
+    def __init__(self,
+                 client,
+                 max_parallel: int = 10,
+                 limiter: Optional[ConcurrencyLimiter] = None,
+                 rate_budget: Optional[RateBudget] = None,
+                 retry_policy: Optional[RetryPolicy] = None,
+                 dedupe_prompts: bool = False,
+                 self_consistency: Optional[SelfConsistencyConfig] = None,
+                 permutations: Optional[PermutationConfig] = None,
+                 early_stop: Optional[EarlyStopConfig] = None,
+                 prefix_window: int = 0,
+                 warm_prefixes: bool = False,
+                 num_shards: int = 1,
+                 shard_index: int = 0,
+                 example_ids: Optional[Iterable[str]] = None,
+                 evaluator: Optional[EvaluationStage] = None):
         """
         Initialize the evaluation runner.
 
         Args:
             client: Async LLM client (must have complete_structured method)
-            max_parallel: Maximum number of concurrent API calls
+            max_parallel: Maximum number of concurrent API calls (used when no limiter is given)
+            limiter: Optional concurrency limiter, e.g. AdaptiveConcurrencyLimiter
+                to tune concurrency from rate-limit and latency feedback
+            rate_budget: Optional requests/tokens-per-minute budget
+            retry_policy: Retry policy for failed calls (default: RetryPolicy())
+            dedupe_prompts: Send each distinct prompt once and fan the response
+                out to all items sharing it
+            self_consistency: Draw multiple samples per item and majority-vote
+            permutations: Expand MCQ examples into option-permuted variants
+            early_stop: Process examples in random order and stop once the
+                accuracy estimate is precise enough (see EarlyStopConfig)
+            prefix_window: Reorder items in windows of this many so that items
+                sharing a prompt prefix are sent back to back (0 keeps dataset order)
+            warm_prefixes: Hold back other requests with a new prompt prefix
+                until the first one completes, so they hit the provider's
+                prompt cache instead of all missing it concurrently
+            num_shards: Split the dataset into this many shards (see src/sharding.py)
+            shard_index: Shard processed by this runner (0-based)
+            example_ids: Only evaluate examples with these ids (e.g. a subset
+                index, see src/subset.py)
+            evaluator: Evaluation stage running Benchmark.evaluate() and its
+                judge calls (default: a pool as large as the inference pool,
+                without a judge client)
         """
         self.client = client
         self.max_parallel = max_parallel
-        self.semaphore = asyncio.Semaphore(max_parallel)
+        self.limiter = limiter or ConcurrencyLimiter(max_parallel)
+        self.semaphore = self.limiter  # Backward-compatible name
+        self.rate_budget = rate_budget
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.dedupe_prompts = dedupe_prompts
+        self.self_consistency = self_consistency
+        self.permutations = permutations
+        self.early_stop = early_stop
+        self.prefix_window = prefix_window
+        self.warm_prefixes = warm_prefixes
+        if not 0 <= shard_index < num_shards:
+            raise ValueError(f"shard_index must be in [0, {num_shards}), got {shard_index}")
+        self.num_shards = num_shards
+        self.shard_index = shard_index
+        self.example_ids = set(example_ids) if example_ids is not None else None
+        self.evaluator = evaluator or EvaluationStage(max_parallel=self._default_in_flight())
+
+        # Duplicate items parked behind their primary (keyed by id() of the primary)
+        self._duplicates: Dict[int, List[EvaluationItem]] = {}
+        self.calls_saved = 0  # Items answered by another item's call (dedupe pre-pass)
+
+        # Set once the first request with a given prompt prefix has completed
+        self._prefix_warm: Dict[str, asyncio.Event] = {}
+
+        # Token, latency and cost accounting across all runs of this runner
+        self.telemetry = RunTelemetry(model=getattr(client, 'model', None))
+        # Live progress of the current run (served by status.StatusServer)
+        self.progress = RunProgress()
+
+    def _default_in_flight(self) -> int:
+        """Worker pool size: enough workers to saturate the largest allowed concurrency."""
+        if isinstance(self.limiter, AdaptiveConcurrencyLimiter):
+            return max(self.max_parallel, self.limiter.max_limit)
+        return self.max_parallel
 
     async def run_benchmark(
         self,
         benchmark: Benchmark[TResponse, TEvaluation],
         dataset_path: str,
         output_path: Optional[str] = None,
+        resume: bool = False,
         **kwargs
     ) -> EvaluationResults[TResponse, TEvaluation]:
         """
         Run evaluation on a benchmark with async parallel execution.
 
+        All results are kept in memory and returned. For datasets too large to
+        hold in memory, use stream_benchmark() instead.
+
+        When output_path is given, every finished item is also appended to it
+        as a crash-safe checkpoint while the run progresses. The checkpoint is
+        the results file: it is never rewritten in place, so a crash at any
+        point leaves a file that --resume can continue from.
+
         Args:
             benchmark: The benchmark to evaluate
             dataset_path: Path to dataset file
             output_path: Optional path to save results JSONL
+            resume: Reuse successful items already in output_path and only run
+                missing or previously failed items
             **kwargs: Additional options (for future expansion)
 
         Returns:
             EvaluationResults containing all evaluation items
         """
-        # Load dataset
-        examples = list(benchmark.load_dataset(dataset_path))
-
-        # Prepare evaluation items
-        eval_items = self._prepare_eval_items(benchmark, examples)
+        # Load dataset (materialized so the progress bar knows the total,
+        # unless it is indexed and can be counted without parsing)
+        examples = benchmark.load_dataset(dataset_path)
+        if not isinstance(examples, IndexedJsonl):
+            examples = list(examples)
+        n_total = self._count_items(examples)
+        if self.early_stop is not None:
+            examples = self.early_stop.order(examples)
 
         # Run parallel inference and evaluation
         results = EvaluationResults[TResponse, TEvaluation]()
 
-        # Process with progress bar
-        tasks = [self._process_item(benchmark, item) for item in eval_items]
-
-        for coro in tqdm.as_completed(tasks, total=len(tasks), desc=f"Evaluating {benchmark.name}"):
-            completed_item = await coro
-            results.add_item(completed_item)
+        # Restore completed items from a previous run
+        skip_ids = set()
+        self.progress.start(benchmark.name, total=n_total)
+        if resume and output_path:
+            for row in prepare_resume(output_path):
+                results.add_item(EvaluationItem.from_dict(row, benchmark.response_schema()))
+                skip_ids.add(row['item_id'])
+                self.progress.record(row.get('evaluation'), row.get('metadata') or {}, restored=True)
+        stop = asyncio.Event()
+        self._check_early_stop(stop)
 
-        # Save results if output path provided
-        if output_path:
-            results.to_jsonl(output_path)
+        checkpoint = CheckpointLog(output_path, append=resume) if output_path else None
+        self.telemetry.start()
+        try:
+            with tqdm(total=n_total, initial=len(skip_ids),
+                      desc=f"Evaluating {benchmark.name}") as progress:
+                async for completed_item in self.iter_results(benchmark, examples,
+                                                              skip_ids=skip_ids, stop=stop):
+                    results.add_item(completed_item)
+                    self.telemetry.record_item(completed_item.metadata)
+                    self.progress.record(completed_item.evaluation, completed_item.metadata)
+                    self._check_early_stop(stop)
+                    if checkpoint is not None:
+                        checkpoint.write(completed_item.to_dict())
+                    progress.update(1)
+        finally:
+            self.telemetry.stop()
+            self.progress.finish()
+            if checkpoint is not None:
+                checkpoint.close()
 
         return results
 
+    async def stream_benchmark(
+        self,
+        benchmark: Benchmark[TResponse, TEvaluation],
+        dataset_path: str,
+        output_path: str,
+        max_in_flight: Optional[int] = None,
+        resume: bool = False,
+        **kwargs
+    ) -> RunStats:
+        """
+        Run evaluation in bounded-memory streaming mode.
+
+        Examples are pulled lazily from the dataset iterator, at most
+        `max_in_flight` items are being processed at any time, and each
+        finished item is appended to the output JSONL as soon as it completes.
+        Memory use is independent of dataset size; only running counters are kept.
+        The total (for progress and ETA) is known only for indexed datasets
+        without permutations, which can be counted without parsing.
+
+        Args:
+            benchmark: The benchmark to evaluate
+            dataset_path: Path to dataset file
+            output_path: Path of the results JSONL (written incrementally)
+            max_in_flight: Maximum items buffered or in progress (default: max_parallel)
+            resume: Keep successful items already in output_path and only run
+                missing or previously failed items
+            **kwargs: Additional options (for future expansion)
+
+        Returns:
+            RunStats with counts of processed, failed and correct items
+        """
+        stats = RunStats()
+        skip_ids = set()
+        examples = benchmark.load_dataset(dataset_path)
+        n_total = None
+        if isinstance(examples, IndexedJsonl) and self.permutations is None:
+            n_total = self._count_items(examples)
+        self.progress.start(benchmark.name, total=n_total)
+        if resume:
+            for row in prepare_resume(output_path):
+                stats.record_row(row)
+                skip_ids.add(row['item_id'])
+                self.progress.record(row.get('evaluation'), row.get('metadata') or {}, restored=True)
+        stop = asyncio.Event()
+        self._check_early_stop(stop)
+
+        if self.early_stop is not None:
+            examples = self.early_stop.order(examples)
+
+        self.telemetry.start()
+        try:
+            with CheckpointLog(output_path, append=resume) as checkpoint, \
+                    tqdm(desc=f"Streaming {benchmark.name}", unit="item", total=n_total,
+                         initial=len(skip_ids)) as progress:
+                async for completed_item in self.iter_results(benchmark, examples, max_in_flight,
+                                                              skip_ids=skip_ids, stop=stop):
+                    checkpoint.write(completed_item.to_dict())
+                    stats.record(completed_item)
+                    self.telemetry.record_item(completed_item.metadata)
+                    self.progress.record(completed_item.evaluation, completed_item.metadata)
+                    self._check_early_stop(stop)
+                    progress.update(1)
+        finally:
+            self.telemetry.stop()
+            self.progress.finish()
+
+        return stats
+
+    async def iter_results(
+        self,
+        benchmark: Benchmark[TResponse, TEvaluation],
+        examples: Iterable[Dict[str, Any]],
+        max_in_flight: Optional[int] = None,
+        skip_ids: Optional[Set[str]] = None,
+        stop: Optional[asyncio.Event] = None
+    ) -> AsyncIterator[EvaluationItem[TResponse, TEvaluation]]:
+        """
+        Process examples through a bounded producer/consumer pipeline.
+
+        A producer task pulls examples lazily and feeds a bounded queue; a fixed
+        pool of workers takes items off the queue and runs inference; items
+        with a response are then evaluated by the evaluation stage's own
+        worker pool (self.evaluator) and handed to the caller in completion
+        order. Because all queues are bounded and the worker pools are fixed,
+        the number of items in memory is bounded regardless of dataset size.
+
+        Args:
+            benchmark: The benchmark to evaluate
+            examples: Iterable of dataset examples (consumed lazily)
+            max_in_flight: Number of workers / queue capacity (default: max_parallel)
+            skip_ids: item_ids to leave out (already completed in a resumed run)
+            stop: When set, no new items are started; items already in
+                progress still finish and are yielded
+
+        Yields:
+            Completed evaluation items, in completion order
+        """
+        inferred = self._iter_inferred(benchmark, examples, max_in_flight, skip_ids, stop)
+        async for item in self.evaluator.run(benchmark, inferred):
+            yield item
+
+    async def _iter_inferred(
+        self,
+        benchmark: Benchmark[TResponse, TEvaluation],
+        examples: Iterable[Dict[str, Any]],
+        max_in_flight: Optional[int] = None,
+        skip_ids: Optional[Set[str]] = None,
+        stop: Optional[asyncio.Event] = None
+    ) -> AsyncIterator[EvaluationItem[TResponse, TEvaluation]]:
+        """Inference half of iter_results(): yields items with their responses, not yet evaluated."""
+        n_workers = max_in_flight or self._default_in_flight()
+        pending: asyncio.Queue = asyncio.Queue(maxsize=n_workers)
+        finished: asyncio.Queue = asyncio.Queue(maxsize=n_workers)
+
+        async def produce():
+            error = None
+            try:
+                items = self._prepare_eval_items(benchmark, examples, skip_ids)
+                for item in items:
+                    if stop is not None and stop.is_set():
+                        # Unstarted items are left out, and with them the
+                        # duplicates parked behind them (only ever non-empty
+                        # after the dedupe pre-pass, which materialized the items)
+                        if self._duplicates:
+                            for unstarted in itertools.chain([item], items):
+                                self._drop_duplicates(unstarted)
+                        break
+                    await pending.put(item)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                error = e
+            # Release the workers, even if the dataset iterator raised
+            for _ in range(n_workers):
+                await pending.put(_DONE)
+            if error is not None:
+                raise error
+
+        async def work():
+            while True:
+                item = await pending.get()
+                if item is _DONE:
+                    await finished.put(_DONE)
+                    return
+                if stop is not None and stop.is_set():
+                    # Drain queued items (and their duplicates) without starting them
+                    self._drop_duplicates(item)
+                    continue
+                self.progress.item_started()
+                try:
+                    done_item = await self._process_item(benchmark, item)
+                finally:
+                    self.progress.item_finished()
+                for out in self._fan_out(done_item):
+                    await finished.put(out)
+
+        producer = asyncio.create_task(produce())
+        workers = [asyncio.create_task(work()) for _ in range(n_workers)]
+
+        try:
+            n_done = 0
+            while n_done < n_workers:
+                item = await finished.get()
+                if item is _DONE:
+                    n_done += 1
+                    continue
+                yield item
+            # Surface dataset loading errors raised inside the producer
+            await producer
+        finally:
+            # Cancel outstanding work if the consumer stopped early or raised
+            for task in [producer, *workers]:
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(producer, *workers, return_exceptions=True)
+
+    def _check_early_stop(self, stop: asyncio.Event):
+        """Set `stop` once the early-stop criteria are met by the progress so far."""
+        if self.early_stop is None or stop.is_set():
+            return
+        reason = self.early_stop.should_stop(self.progress.n_true, self.progress.n_evaluated)
+        if reason is not None:
+            self.progress.stop_reason = reason
+            stop.set()
+
     def _prepare_eval_items(
         self,
         benchmark: Benchmark[TResponse, TEvaluation],
-        examples: List[Dict[str, Any]]
-    ) -> List[EvaluationItem[TResponse, TEvaluation]]:
+        examples: Iterable[Dict[str, Any]],
+        skip_ids: Optional[Set[str]] = None
+    ) -> Iterator[EvaluationItem[TResponse, TEvaluation]]:
         """
-        Create evaluation items from dataset examples.
+        Lazily create evaluation items from dataset examples.
 
-        Currently creates one item per example. In the future, this could
-        handle augmentation strategies (shuffling, etc.).
+        Creates one item per example (or per option permutation, see
+        _make_items), leaving out items in `skip_ids`. With a prefix_window,
+        items are regrouped by prompt prefix (see _group_by_prefix). With
+        dedupe_prompts enabled, a pre-pass collapses items with identical
+        prompts so each distinct prompt is sent once (see _collapse_duplicates).
         """
-        items = []
-        for i, example in enumerate(examples):
-            item = EvaluationItem(
-                item_id=example.get('id', f'item_{i}'),
-                group_id=example.get('id', f'item_{i}'),  # Same as item_id for now
-                example=example,
-                prompt=benchmark.format_prompt(example),
-                parsed_response=None,
-                evaluation=None,
-                metadata={}
-            )
-            items.append(item)
+        items = self._make_items(benchmark, examples)
+        if skip_ids:
+            items = (item for item in items if item.item_id not in skip_ids)
+        if self.prefix_window > 1:
+            items = self._group_by_prefix(benchmark, items)
+        if self.dedupe_prompts:
+            items = self._collapse_duplicates(items)
         return items
 
+    def _make_items(
+        self,
+        benchmark: Benchmark[TResponse, TEvaluation],
+        examples: Iterable[Dict[str, Any]]
+    ) -> Iterator[EvaluationItem[TResponse, TEvaluation]]:
+        """
+        Build evaluation items from dataset examples.
+
+        Creates one item per example, or with a PermutationConfig one item per
+        option permutation: item_id is '<id>#p<k>', group_id links the variants
+        of a question, and metadata records shuffle_id and the permutation
+        (new position i shows original option permutation[i]). When sharded,
+        examples outside this runner's shard are skipped; shards are assigned
+        by example id, so all variants of a question land in the same shard.
+        Likewise, only examples in example_ids are used when it is set.
+        """
+        for base_id, example in self._identify(examples):
+            if self.permutations is None:
+                yield EvaluationItem(
+                    item_id=base_id,
+                    group_id=base_id,  # Same as item_id without augmentation
+                    example=example,
+                    prompt=benchmark.format_prompt(example),
+                    parsed_response=None,
+                    evaluation=None,
+                    metadata={}
+                )
+                continue
+
+            if not isinstance(example.get('options'), list) or 'answer_idx' not in example:
+                raise ValueError(f"Option permutation needs 'options' and 'answer_idx' (example {base_id})")
+            # Per-question seed keeps 'random' permutations reproducible and order-independent
+            seed = zlib.crc32(f"{self.permutations.seed}:{base_id}".encode('utf-8'))
+            perms = permutation_set(len(example['options']), self.permutations.num_permutations,
+                                    self.permutations.strategy, seed)
+            for k, perm in enumerate(perms):
+                variant = apply_permutation(example, perm)
+                yield EvaluationItem(
+                    item_id=f"{base_id}#p{k}",
+                    group_id=base_id,
+                    example=variant,
+                    prompt=benchmark.format_prompt(variant),
+                    parsed_response=None,
+                    evaluation=None,
+                    metadata={'shuffle_id': k, 'permutation': perm}
+                )
+
+    def _identify(self, examples: Iterable[Dict[str, Any]]) -> Iterator[Tuple[Any, Dict[str, Any]]]:
+        """
+        (example id, example) pairs of the selected examples (see _selected).
+
+        Examples without an 'id' get 'item_<i>' by position. Indexed datasets
+        supply their file ids and parse only the selected examples.
+        """
+        if isinstance(examples, IndexedJsonl):
+            yield from examples.identified(self._selected)
+            return
+        for i, example in enumerate(examples):
+            base_id = example.get('id', f'item_{i}')
+            if self._selected(base_id):
+                yield base_id, example
+
+    def _count_items(self, examples: Iterable[Dict[str, Any]]) -> int:
+        """Number of items _make_items() yields for `examples`, without formatting prompts."""
+        if self.permutations is None:
+            if isinstance(examples, IndexedJsonl):
+                return sum(1 for base_id in examples.ids if self._selected(base_id))
+            return sum(1 for _ in self._identify(examples))
+        return sum(len(permutation_set(len(example.get('options') or []),
+                                       self.permutations.num_permutations,
+                                       self.permutations.strategy))
+                   for _, example in self._identify(examples))
+
+    def _selected(self, base_id: str) -> bool:
+        """Whether an example is in this runner's shard and subset."""
+        if self.example_ids is not None and base_id not in self.example_ids:
+            return False
+        return self.num_shards == 1 or shard_of(base_id, self.num_shards) == self.shard_index
+
+    @staticmethod
+    def _prefix_key(benchmark: Benchmark, example: Dict[str, Any]) -> str:
+        """Key identifying the cacheable prefix (system prompt + prompt prefix) of a request."""
+        return f"{benchmark.system_prompt() or ''}\x00{benchmark.prompt_prefix(example)}"
+
+    def _group_by_prefix(
+        self,
+        benchmark: Benchmark[TResponse, TEvaluation],
+        items: Iterable[EvaluationItem[TResponse, TEvaluation]]
+    ) -> Iterator[EvaluationItem[TResponse, TEvaluation]]:
+        """
+        Reorder items so that requests sharing a prompt prefix are sent back to back.
+
+        Items are buffered `prefix_window` at a time and each window is emitted
+        group by group, groups in order of first appearance and items in
+        dataset order within a group. Provider prompt caches are short-lived,
+        so keeping a prefix's requests together maximizes cached-token reuse,
+        while the bounded window preserves streaming memory limits.
+        """
+        window: List[EvaluationItem[TResponse, TEvaluation]] = []
+
+        def flush() -> Iterator[EvaluationItem[TResponse, TEvaluation]]:
+            groups: Dict[str, List[EvaluationItem[TResponse, TEvaluation]]] = {}
+            for item in window:
+                groups.setdefault(self._prefix_key(benchmark, item.example), []).append(item)
+            window.clear()
+            for group in groups.values():
+                yield from group
+
+        for item in items:
+            window.append(item)
+            if len(window) >= self.prefix_window:
+                yield from flush()
+        yield from flush()
+
+    def _collapse_duplicates(
+        self,
+        items: Iterable[EvaluationItem[TResponse, TEvaluation]]
+    ) -> Iterator[EvaluationItem[TResponse, TEvaluation]]:
+        """
+        Dataset-level pre-pass that keeps one item per distinct prompt.
+
+        The first item with a given prompt becomes the primary; later items
+        with the same prompt are parked until the primary finishes, then
+        _fan_out() copies its response onto them, and each is evaluated against
+        its own example. This pass materializes the item list, trading the
+        streaming memory bound for fewer calls.
+        """
+        primaries: Dict[str, EvaluationItem[TResponse, TEvaluation]] = {}
+        order: List[EvaluationItem[TResponse, TEvaluation]] = []
+        for item in items:
+            primary = primaries.get(item.prompt)
+            if primary is None:
+                primaries[item.prompt] = item
+                order.append(item)
+            else:
+                self._duplicates.setdefault(id(primary), []).append(item)
+                self.calls_saved += 1
+        return iter(order)
+
+    def _fan_out(
+        self,
+        item: EvaluationItem[TResponse, TEvaluation]
+    ) -> List[EvaluationItem[TResponse, TEvaluation]]:
+        """
+        Expand a primary item with a response into itself plus its collapsed duplicates.
+
+        Duplicates share the primary's response (or error) and record
+        `duplicate_of` in their metadata; each is then evaluated against its
+        own example by the evaluation stage.
+        """
+        duplicates = self._duplicates.pop(id(item), [])
+        for dup in duplicates:
+            dup.metadata['duplicate_of'] = item.item_id
+            dup.parsed_response = item.parsed_response
+            if item.parsed_response is None:
+                dup.metadata['error'] = item.metadata.get('error', 'no response')
+        return [item, *duplicates]
+
+    def _drop_duplicates(self, item: EvaluationItem[TResponse, TEvaluation]):
+        """Forget the duplicates parked behind a primary that will not run (early stop)."""
+        dropped = self._duplicates.pop(id(item), [])
+        self.calls_saved -= len(dropped)
+
     async def _process_item(
         self,
         benchmark: Benchmark[TResponse, TEvaluation],
         item: EvaluationItem[TResponse, TEvaluation]
     ) -> EvaluationItem[TResponse, TEvaluation]:
         """
-        Process a single evaluation item: inference + evaluation.
+        Run inference for a single evaluation item.
 
-        Uses semaphore for rate limiting concurrent API calls.
+        Inference goes through _infer() (concurrency limiter, rate budget and
+        retries); errors that survive retries are recorded in the metadata.
+        Evaluation happens afterwards in the evaluation stage.
         """
-        async with self.semaphore:
-            try:
-                # Get model response with structured output
-                parsed_response = await self.client.complete_structured(
-                    prompt=item.prompt,
-                    response_model=benchmark.response_schema()
-                )
+        try:
+            # Get model response with structured output (majority vote in
+            # self-consistency mode)
+            if self.self_consistency is not None:
+                parsed_response = await self._infer_self_consistent(benchmark, item)
+            else:
+                parsed_response = await self._infer(benchmark, item)
 
-                item.parsed_response = parsed_response
+            item.parsed_response = parsed_response
 
-                # Evaluate (may involve async LLM judge call)
-                evaluation = await benchmark.evaluate(parsed_response, item.example)
-                item.evaluation = evaluation
+        except Exception as e:
+            # Handle errors gracefully
+            item.metadata['error'] = str(e)
+            item.metadata.setdefault('error_class', classify_error(e))
+            item.evaluation = None
 
-            except Exception as e:
-                # Handle errors gracefully
-                item.metadata['error'] = str(e)
-                item.evaluation = None
+        return item
+
+    async def _infer(
+        self,
+        benchmark: Benchmark[TResponse, TEvaluation],
+        item: EvaluationItem[TResponse, TEvaluation],
+        sample_index: int = 0
+    ) -> TResponse:
+        """
+        Get a structured response for one item, retrying recoverable errors.
+
+        Each attempt first waits for the rate budget, then holds a limiter slot
+        only for the duration of the API call. Failures are classified; the
+        limiter is told about them (so AIMD can back off on 429s) and the
+        retry policy decides whether and how long to wait before trying again.
+        Retries are counted in item.metadata['retries'] (summed over samples).
+        With warm_prefixes, the first request for each prompt prefix is sent
+        on its own and later requests with that prefix wait for it.
+
+        Args:
+            benchmark: The benchmark being evaluated
+            item: Item to get a response for
+            sample_index: Index of the sample for multi-sample modes; non-zero
+                indices are passed to the client so repeated samples are
+                neither cached nor coalesced into one call
+        """
+        if not self.warm_prefixes:
+            return await self._infer_with_retries(benchmark, item, sample_index)
+
+        # The first request with a new prefix goes alone; the rest wait for it
+        # so the provider has the prefix cached by the time they are sent
+        key = self._prefix_key(benchmark, item.example)
+        warm = self._prefix_warm.get(key)
+        if warm is not None:
+            await warm.wait()
+            return await self._infer_with_retries(benchmark, item, sample_index)
+        warm = self._prefix_warm[key] = asyncio.Event()
+        try:
+            return await self._infer_with_retries(benchmark, item, sample_index)
+        finally:
+            warm.set()
+
+    async def _infer_with_retries(
+        self,
+        benchmark: Benchmark[TResponse, TEvaluation],
+        item: EvaluationItem[TResponse, TEvaluation],
+        sample_index: int = 0
+    ) -> TResponse:
+        """Make the API call for one sample of an item, retrying recoverable errors."""
+        attempt = 0
+        item.metadata.setdefault('retries', 0)
+        system_prompt = benchmark.system_prompt()
+        call_kwargs: Dict[str, Any] = {}
+        if system_prompt is not None:
+            call_kwargs['system_prompt'] = system_prompt
+        if sample_index:
+            call_kwargs['sample_index'] = sample_index
+        estimated = 0
+        if self.rate_budget is not None:
+            estimated = estimate_tokens(item.prompt,
+                                        getattr(self.client, 'max_tokens', 0) or 0,
+                                        system_prompt)
+
+        while True:
+            if self.rate_budget is not None:
+                await self.rate_budget.acquire(estimated)
+
+            async with self.limiter:
+                start = time.monotonic()
+                try:
+                    if hasattr(self.client, 'complete_structured_with_usage'):
+                        response, usage = await self.client.complete_structured_with_usage(
+                            prompt=item.prompt,
+                            response_model=benchmark.response_schema(),
+                            **call_kwargs
+                        )
+                    else:
+                        response = await self.client.complete_structured(
+                            prompt=item.prompt,
+                            response_model=benchmark.response_schema(),
+                            **call_kwargs
+                        )
+                        usage = CallUsage(latency_s=time.monotonic() - start)
+                except Exception as e:
+                    if isinstance(getattr(e, 'usage', None), CallUsage):
+                        # Aborted streams (api.GenerationAborted) were still paid for
+                        self._record_usage(item, e.usage, estimated)
+                    error_class = classify_error(e)
+                    self.limiter.on_error(error_class)
+                    delay = self.retry_policy.next_delay(error_class, attempt)
+                    if delay is None:
+                        item.metadata['error_class'] = error_class
+                        raise
+                else:
+                    self.limiter.on_success(time.monotonic() - start)
+                    self._record_usage(item, usage, estimated)
+                    return response
+
+            # Back off outside the limiter slot so other items can use it
+            attempt += 1
+            item.metadata['retries'] += 1
+            await asyncio.sleep(delay)
+
+    def _record_usage(self, item: EvaluationItem, usage: CallUsage, estimated: int):
+        """
+        Account one billed or served call: run telemetry, the rate budget, and the
+        per-item token totals in item.metadata['usage'] (summed over samples).
+        """
+        self.telemetry.record_call(usage)
+        if self.rate_budget is not None:
+            # Cached and coalesced calls used no tokens; refund their estimate
+            actual = (usage.prompt_tokens + usage.completion_tokens + usage.reasoning_tokens
+                      if usage.billed else 0)
+            self.rate_budget.reconcile(estimated, actual)
+        totals = item.metadata.setdefault('usage', {
+            'prompt_tokens': 0, 'completion_tokens': 0, 'cached_tokens': 0,
+            'reasoning_tokens': 0, 'latency_s': 0.0, 'calls': 0, 'billed_calls': 0})
+        totals['prompt_tokens'] += usage.prompt_tokens
+        totals['completion_tokens'] += usage.completion_tokens
+        totals['cached_tokens'] += usage.cached_tokens
+        totals['reasoning_tokens'] += usage.reasoning_tokens
+        totals['latency_s'] += usage.latency_s
+        totals['calls'] += 1
+        totals['billed_calls'] += int(usage.billed)
+
+    async def _infer_self_consistent(
+        self,
+        benchmark: Benchmark[TResponse, TEvaluation],
+        item: EvaluationItem[TResponse, TEvaluation]
+    ) -> TResponse:
+        """
+        Draw samples concurrently and return the majority-vote response.
+
+        Samples are drawn in concurrent waves. After each wave the votes (keyed
+        by benchmark.vote_key) are tallied and drawing stops as soon as either
+        - the leader can no longer be overtaken: leader > runner-up + samples left, or
+        - the leader's vote share reaches the confidence threshold (once
+          min_samples have been drawn), or
+        - the sample budget is exhausted.
+        Each follow-up wave is the smallest number of samples that could end
+        the vote, so easy questions stop early and contested ones keep drawing.
+
+        Votes, samples used and early-stop status are stored in item.metadata.
+
+        Returns:
+            The first response that voted for the winning answer
+        """
+        config = self.self_consistency
+        votes: Counter = Counter()
+        first_response: Dict[Any, TResponse] = {}
+        drawn = 0
+        failed = 0
+        last_error: Optional[Exception] = None
+
+        wave = config.first_wave()
+        while True:
+            wave = min(wave, config.max_samples - drawn)
+            outcomes = await asyncio.gather(
+                *(self._infer(benchmark, item, sample_index=drawn + j) for j in range(wave)),
+                return_exceptions=True
+            )
+            drawn += wave
+            for outcome in outcomes:
+                if isinstance(outcome, BaseException):
+                    failed += 1
+                    last_error = outcome
+                    continue
+                key = benchmark.vote_key(outcome)
+                votes[key] += 1
+                first_response.setdefault(key, outcome)
+
+            remaining = config.max_samples - drawn
+            ranked = votes.most_common(2)
+            leader = ranked[0][1] if ranked else 0
+            runner_up = ranked[1][1] if len(ranked) > 1 else 0
+            valid = drawn - failed
+
+            if remaining == 0 or leader > runner_up + remaining:
+                break
+            if (config.confidence is not None and valid and drawn >= config.min_samples
+                    and leader / valid >= config.confidence):
+                break
+            wave = config.next_wave(leader, runner_up, valid, remaining)
+
+        item.metadata['votes'] = {str(k): v for k, v in votes.items()}
+        item.metadata['samples_used'] = drawn
+        item.metadata['samples_failed'] = failed
+        item.metadata['early_stopped'] = drawn < config.max_samples
 
-            return item
+        if not votes:
+            raise last_error
+        winner = votes.most_common(1)[0][0]
+        item.metadata['vote_share'] = votes[winner] / (drawn - failed)
+        return first_response[winner]
@@ -0,0 +1,194 @@
+"""
+Multi-process and multi-host sharded execution.
+
+A dataset is split into N shards by a stable hash of each example's id, so
+every process (on any host) computes the same partition without
+coordination. Shard i of N writes its results to its own file next to the
+final output (see shard_path()), which makes shards independently resumable
+and lets hosts that share a filesystem run different shards. A shard that
+runs to completion writes a `<shard results>.done` marker last, after its
+metrics and aggregates; merge_shards() concatenates the shard results and
+combines their metrics only once every shard has its marker.
+
+Usage:
+    # All shards locally, one process each, then merge
+    python -m src.run_eval mcq baseline data.jsonl results/mcq.jsonl --shards 8
+
+    # One shard per host, then merge from anywhere
+    python -m src.run_eval mcq baseline data.jsonl results/mcq.jsonl --shards 8 --shard-index 3
+    python -m src.sharding merge results/mcq.jsonl --shards 8
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, List, Optional
+
+from .aggregates import merge_aggregates
+from .checkpoint import iter_checkpoint_rows
+from .telemetry import RunTelemetry
+
+if TYPE_CHECKING:
+    from .runner import RunStats
+
+
+def shard_of(key: str, num_shards: int) -> int:
+    """
+    Shard index of an example id.
+
+    Uses CRC32 rather than hash(), which is randomized per process.
+    """
+    return zlib.crc32(key.encode('utf-8')) % num_shards
+
+
+def shard_path(output_path: str, shard_index: int, num_shards: int) -> str:
+    """Results file of one shard, e.g. results/mcq.shard-03-of-08.jsonl."""
+    root, ext = os.path.splitext(output_path)
+    width = len(str(num_shards))
+    return f"{root}.shard-{shard_index:0{width}d}-of-{num_shards:0{width}d}{ext or '.jsonl'}"
+
+
+def done_marker_path(shard_results_path: str) -> str:
+    """Completion marker of a shard's results file."""
+    return shard_results_path + '.done'
+
+
+def clear_shard_done(shard_results_path: str):
+    """Remove a shard's completion marker (when the shard starts or resumes)."""
+    try:
+        os.remove(done_marker_path(shard_results_path))
+    except FileNotFoundError:
+        pass
+
+
+def mark_shard_done(shard_results_path: str):
+    """Write a shard's completion marker; call it after everything else the shard writes."""
+    with open(done_marker_path(shard_results_path), 'w', encoding='utf-8') as f:
+        f.write(f"{time.time():.3f}\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def incomplete_shards(output_path: str, num_shards: int) -> List[int]:
+    """Indices of shards that have not finished, i.e. have no completion marker."""
+    return [i for i in range(num_shards)
+            if not os.path.exists(done_marker_path(shard_path(output_path, i, num_shards)))]
+
+
+def merge_shards(output_path: str, num_shards: int) -> 'RunStats':
+    """
+    Concatenate shard results into output_path and merge their metrics.
+
+    Shard metrics (`<shard>.metrics.json`) are combined into
+    `<output_path>.metrics.json` when every shard wrote one, and the shards'
+    result aggregates into the merged file's aggregate sidecar.
+
+    Args:
+        output_path: Final results path the shards were derived from
+        num_shards: Number of shards
+
+    Returns:
+        RunStats over the merged results
+
+    Raises:
+        RuntimeError: If any shard has not finished (no completion marker),
+            even if its results file exists
+    """
+    # Imported here because the runner imports shard_of() from this module
+    from .runner import RunStats
+
+    incomplete = incomplete_shards(output_path, num_shards)
+    if incomplete:
+        raise RuntimeError(f"Shard(s) {incomplete} of {num_shards} have not finished "
+                           f"(no .done marker); run or resume them before merging")
+
+    stats = RunStats()
+    telemetry: Optional[RunTelemetry] = None
+    have_all_metrics = True
+    tmp_path = output_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as out:
+        for i in range(num_shards):
+            path = shard_path(output_path, i, num_shards)
+            for row in iter_checkpoint_rows(path):
+                stats.record_row(row)
+            with open(path, 'r', encoding='utf-8') as f:
+                shutil.copyfileobj(f, out)
+
+            metrics_path = path + '.metrics.json'
+            if not os.path.exists(metrics_path):
+                have_all_metrics = False
+                continue
+            shard_telemetry = RunTelemetry.read_json(metrics_path)
+            if telemetry is None:
+                telemetry = shard_telemetry
+            else:
+                telemetry.merge(shard_telemetry)
+    os.replace(tmp_path, output_path)
+    merge_aggregates([shard_path(output_path, i, num_shards) for i in range(num_shards)],
+                     output_path)
+
+    if telemetry is not None and have_all_metrics:
+        telemetry.write_json(output_path + '.metrics.json')
+    return stats
+
+
+def launch_shards(argv: List[str],
+                  output_path: str,
+                  num_shards: int,
+                  max_workers: Optional[int] = None) -> List[int]:
+    """
+    Run every shard of a run_eval command as a separate local process.
+
+    Each shard process has its own event loop and client. Shard output goes
+    to `<shard results>.log`.
+
+    Args:
+        argv: run_eval arguments (including --shards, excluding --shard-index)
+        output_path: Final results path (used to name shard logs)
+        num_shards: Number of shards
+        max_workers: Maximum shard processes running at once (default: all)
+
+    Returns:
+        Exit code of each shard process, by shard index
+    """
+    def run(index: int) -> int:
+        log_path = shard_path(output_path, index, num_shards) + '.log'
+        with open(log_path, 'w', encoding='utf-8') as log:
+            proc = subprocess.run(
+                [sys.executable, "-m", "src.run_eval", *argv, "--shard-index", str(index)],
+                stdout=log, stderr=subprocess.STDOUT)
+        status = "done" if proc.returncode == 0 else f"failed (exit {proc.returncode}, see {log_path})"
+        print(f"Shard {index + 1}/{num_shards} {status}")
+        return proc.returncode
+
+    # Threads only wait on the child processes; the work happens in the children
+    with ThreadPoolExecutor(max_workers=max_workers or num_shards) as pool:
+        return list(pool.map(run, range(num_shards)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge sharded evaluation results")
+    sub = parser.add_subparsers(dest="command", required=True)
+    merge = sub.add_parser("merge", help="Combine shard results and metrics")
+    merge.add_argument("output_path", help="Final results path passed to the sharded runs")
+    merge.add_argument("--shards", type=int, required=True, help="Number of shards")
+    args = parser.parse_args()
+
+    try:
+        stats = merge_shards(args.output_path, args.shards)
+    except RuntimeError as e:
+        print(f"Not merging: {e}")
+        return 1
+    acc, lo, hi, n = stats.binary_accuracy()
+    print(f"Merged {args.shards} shards ({stats.n_items} items) into {args.output_path}")
+    print(f"Accuracy: {acc:.4f} (95% CI {lo:.4f}-{hi:.4f}, n={n})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,272 @@
+"""
+Live progress of a running evaluation, served over a local HTTP endpoint.
+
+The runner feeds a RunProgress with every item it starts and finishes.
+StatusServer exposes it together with the run's telemetry:
+- GET /status (or /): JSON with completed / total items, items in flight,
+  completion rate over the last minute, ETA, errors by class, running
+  accuracy with a Wilson CI, concurrency, evaluation (judge) queue, token
+  throughput and cost, and the utilization of pooled API connections
+- GET /metrics: the same as Prometheus text
+
+The server listens on a TCP port (localhost by default) or a Unix socket,
+uses only asyncio streams, and runs on the evaluation's event loop; each
+request just reads counters, so polling it does not slow the run down.
+
+Usage:
+    python -m src.run_eval mcq robust data.jsonl results/mcq.jsonl --status-port 8765
+    curl -s localhost:8765/status
+"""
+
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from .metrics import wilson_ci
+
+# Rolling window over which the current completion rate is measured
+RATE_WINDOW_S = 60
+
+
+class RunProgress:
+    """Counters describing how far the current benchmark run has got."""
+
+    def __init__(self):
+        self.start()
+
+    def start(self, benchmark: Optional[str] = None, total: Optional[int] = None):
+        """
+        Reset the counters for a new run.
+
+        Args:
+            benchmark: Benchmark name
+            total: Items the run will produce, if known up front (None in streaming mode)
+        """
+        self.benchmark = benchmark
+        self.total = total
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.completed = 0
+        self.restored = 0         # Completed by an earlier run (resume)
+        self.in_flight = 0        # Items between dequeue and completion
+        self.n_evaluated = 0
+        self.n_true = 0
+        self.errors: Dict[str, int] = {}
+        self.stop_reason: Optional[str] = None   # Set when the run stopped early
+        # [second, completions] pairs for the rolling completion rate
+        self._recent: Deque[List[int]] = deque()
+
+    def finish(self):
+        """Mark the run as finished."""
+        self.finished_at = time.time()
+
+    def item_started(self):
+        self.in_flight += 1
+
+    def item_finished(self):
+        self.in_flight -= 1
+
+    def record(self, evaluation: Any, metadata: Dict[str, Any], restored: bool = False):
+        """
+        Count one completed item.
+
+        Args:
+            evaluation: The item's evaluation (None if it failed)
+            metadata: The item's metadata (error and error_class on failure)
+            restored: The item was completed by an earlier run and is being resumed
+        """
+        self.completed += 1
+        if restored:
+            self.restored += 1
+        else:
+            second = int(time.monotonic())
+            if self._recent and self._recent[-1][0] == second:
+                self._recent[-1][1] += 1
+            else:
+                self._recent.append([second, 1])
+        if metadata.get('error') is not None:
+            error_class = metadata.get('error_class', 'fatal')
+            self.errors[error_class] = self.errors.get(error_class, 0) + 1
+        if evaluation is not None:
+            self.n_evaluated += 1
+            self.n_true += bool(evaluation)
+
+    def rate(self) -> float:
+        """Items completed per second over the last RATE_WINDOW_S seconds."""
+        now = time.monotonic()
+        while self._recent and self._recent[0][0] <= now - RATE_WINDOW_S:
+            self._recent.popleft()
+        # Early in the run the window only spans the time since the start
+        window = min(RATE_WINDOW_S, time.time() - self.started_at)
+        return sum(n for _, n in self._recent) / window if window > 0 else 0.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        """JSON-serializable view of the counters."""
+        elapsed = (self.finished_at or time.time()) - self.started_at
+        rate = self.rate() if self.finished_at is None else 0.0
+        remaining = None if self.total is None else max(0, self.total - self.completed)
+        n = self.n_evaluated
+        acc = self.n_true / n if n else 0.0
+        lo, hi = wilson_ci(acc, n)
+        return {
+            "benchmark": self.benchmark,
+            "state": "finished" if self.finished_at is not None else "running",
+            "stop_reason": self.stop_reason,
+            "elapsed_s": elapsed,
+            "total": self.total,
+            "completed": self.completed,
+            "restored": self.restored,
+            "remaining": remaining,
+            "in_flight": self.in_flight,
+            "completed_per_s": rate,
+            "overall_per_s": (self.completed - self.restored) / elapsed if elapsed else 0.0,
+            "eta_s": remaining / rate if remaining is not None and rate else None,
+            "errors": dict(sorted(self.errors.items())),
+            "accuracy": {"value": acc, "ci_low": lo, "ci_high": hi, "n": n},
+        }
+
+
+def run_status(runner) -> Dict[str, Any]:
+    """Progress, telemetry and concurrency of a runner, as served on /status."""
+    summary = runner.telemetry.summary()
+    pool = getattr(getattr(runner, 'client', None), 'pool', None)
+    return {
+        **runner.progress.snapshot(),
+        "connections": pool.stats() if pool is not None else None,
+        "concurrency": runner.limiter.stats(),
+        "evaluation": runner.evaluator.stats(),
+        "calls": summary["calls"],
+        "tokens_per_s": summary["tokens_per_s"],
+        "prompt_cache_ratio": summary["prompt_cache_ratio"],
+        "latency_s": summary["latency_s"],
+        "cost_usd": summary["cost_usd"],
+    }
+
+
+def progress_prometheus(status: Dict[str, Any], prefix: str = "grok_eval") -> str:
+    """Prometheus gauges for the progress part of a status snapshot."""
+    gauges = [
+        ("items_completed", "Items completed in the current run", status["completed"]),
+        ("items_total_expected", "Items the current run will produce", status["total"]),
+        ("items_in_flight", "Items being processed", status["in_flight"]),
+        ("items_per_second", f"Completion rate over the last {RATE_WINDOW_S}s",
+         status["completed_per_s"]),
+        ("eta_seconds", "Estimated seconds until the run completes", status["eta_s"]),
+        ("accuracy", "Running accuracy over evaluated items", status["accuracy"]["value"]),
+        ("accuracy_ci_low", "Lower bound of the 95% Wilson interval", status["accuracy"]["ci_low"]),
+        ("accuracy_ci_high", "Upper bound of the 95% Wilson interval", status["accuracy"]["ci_high"]),
+        ("concurrency_limit", "Current concurrency limit", status["concurrency"]["limit"]),
+        ("items_evaluating", "Items being evaluated (including judge calls)",
+         status["evaluation"]["in_flight"]),
+        ("items_awaiting_evaluation", "Items with a response waiting for evaluation",
+         status["evaluation"]["queued"]),
+    ]
+    if status.get("connections") is not None:
+        connections = status["connections"]
+        gauges += [
+            ("api_streams_in_flight", "Calls in flight on pooled API connections", connections["in_flight"]),
+            ("api_stream_capacity", "Concurrent calls the pooled API connections carry",
+             connections["capacity"]),
+            ("api_stream_utilization", "Share of pooled stream capacity in use",
+             connections["utilization"]),
+            ("api_stream_waits", "Calls that waited for a free stream", connections["waited_leases"]),
+        ]
+    lines = []
+    for name, help_text, value in gauges:
+        if value is None:
+            continue
+        lines.append(f"# HELP {prefix}_{name} {help_text}")
+        lines.append(f"# TYPE {prefix}_{name} gauge")
+        lines.append(f"{prefix}_{name} {value}")
+    return "\n".join(lines) + "\n"
+
+
+class StatusServer:
+    """
+    Minimal HTTP/1.0 server exposing a runner's live status.
+
+    Only GET requests for /status, / and /metrics are answered; every
+    response closes the connection.
+    """
+
+    def __init__(self, runner, port: Optional[int] = None, host: str = "127.0.0.1",
+                 socket_path: Optional[str] = None):
+        """
+        Args:
+            runner: EvaluationRunner whose progress and telemetry are served
+            port: TCP port to listen on (0 picks a free port)
+            host: Interface to bind for TCP
+            socket_path: Listen on this Unix socket instead of TCP
+        """
+        if port is None and socket_path is None:
+            raise ValueError("StatusServer needs a port or a socket_path")
+        self.runner = runner
+        self.port = port
+        self.host = host
+        self.socket_path = socket_path
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self):
+        """Start listening; the bound port is available as self.port afterwards."""
+        if self.socket_path is not None:
+            self._server = await asyncio.start_unix_server(self._handle, path=self.socket_path)
+        else:
+            self._server = await asyncio.start_server(self._handle, self.host, self.port)
+            self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        """Stop listening."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+            if self.socket_path is not None and os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+
+    @property
+    def address(self) -> str:
+        """Where the server listens, for log messages."""
+        if self.socket_path is not None:
+            return f"unix:{self.socket_path}"
+        return f"http://{self.host}:{self.port}/status"
+
+    async def __aenter__(self) -> 'StatusServer':
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.stop()
+
+    def _respond(self, path: str):
+        if path in ("/", "/status"):
+            return "200 OK", "application/json", json.dumps(run_status(self.runner), indent=2)
+        if path == "/metrics":
+            body = (self.runner.telemetry.to_prometheus()
+                    + progress_prometheus(run_status(self.runner)))
+            return "200 OK", "text/plain; version=0.0.4", body
+        return "404 Not Found", "text/plain", f"Unknown path {path}; try /status or /metrics\n"
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), timeout=5)
+            # Skip the headers; requests have no body we care about
+            while (await asyncio.wait_for(reader.readline(), timeout=5)) not in (b'\r\n', b'\n', b''):
+                pass
+            parts = request_line.decode('latin-1').split()
+            if len(parts) < 2 or parts[0] != "GET":
+                status, content_type, body = "405 Method Not Allowed", "text/plain", "GET only\n"
+            else:
+                status, content_type, body = self._respond(parts[1].split('?', 1)[0])
+            payload = body.encode('utf-8')
+            writer.write(f"HTTP/1.0 {status}\r\nContent-Type: {content_type}\r\n"
+                         f"Content-Length: {len(payload)}\r\nConnection: close\r\n\r\n"
+                         .encode('latin-1') + payload)
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
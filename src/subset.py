@@ -0,0 +1,345 @@
+"""
+Stratified subsets of a dataset for cheap regression runs.
+
+A subset index names the examples to run and how to weight them so that
+their accuracy estimates the accuracy on the full dataset:
+- Examples are stratified by example fields (e.g. subject, difficulty) and,
+  given previous result files, by their track record across those runs:
+  'always' (every past answer correct), 'never', 'mixed' (the runs
+  disagreed) or 'new' (no history).
+- The sample size is split between strata by Neyman allocation,
+  proportional to stratum size times the outcome standard deviation
+  expected from the history (each example's record shrunk towards 1/2, so
+  two agreeing runs do not make an example look settled). Strata where
+  many models agree get few items and contested strata get many. Every
+  stratum keeps at least `min_per_stratum` items.
+- estimate() combines per-stratum accuracies with the stratum weights
+  (share of the full dataset) into a full-set estimate whose standard
+  error includes the finite-population correction.
+
+The index is a JSON file, reusable across runs and models. When history is
+given, build_subset() also backtests it: for each past run, the subset
+estimate is compared with that run's full-set accuracy.
+
+Usage:
+    python -m src.subset build data/mmlu.jsonl subsets/mmlu-5pct.json --fraction 0.05 \\
+        --strata subject --history results/grok-3.jsonl results/grok-4.jsonl
+    python -m src.run_eval mcq baseline data/mmlu.jsonl results/nightly.jsonl \\
+        --subset subsets/mmlu-5pct.json
+    python -m src.subset estimate subsets/mmlu-5pct.json results/nightly.jsonl
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import sys
+from dataclasses import asdict, dataclass, field
+from statistics import NormalDist
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .datasets.indexed import IndexedJsonl
+from .stats import Outcomes, load_outcomes
+
+# Lower bound on the outcome standard deviation used for allocation, so
+# strata where past models all agreed still get sampled
+MIN_STRATUM_SD = 0.1
+
+
+@dataclass
+class SubsetIndex:
+    """
+    Selected examples and the stratum weights needed to reweight their results.
+
+    `strata` maps each stratum name to its full-dataset size ('size'),
+    number of selected examples ('sampled') and past accuracy ('past_acc',
+    None without history).
+    """
+    dataset: str
+    n_examples: int
+    strata_fields: List[str]
+    strata: Dict[str, Dict[str, Any]]
+    stratum_of: Dict[str, str]              # Selected example id -> stratum
+    seed: int = 0
+    predicted_margin: Optional[float] = None
+    backtest: List[Dict[str, Any]] = field(default_factory=list)
+
+    @property
+    def ids(self) -> List[str]:
+        """Selected example ids."""
+        return list(self.stratum_of)
+
+    def save(self, path: str):
+        """Write the index as JSON."""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(asdict(self), f, indent=1)
+            f.write('\n')
+
+    @classmethod
+    def load(cls, path: str) -> 'SubsetIndex':
+        """Read an index written by save()."""
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(**json.load(f))
+
+    def estimate(self, outcomes: Outcomes, confidence: float = 0.95) -> Dict[str, Any]:
+        """
+        Estimate full-dataset accuracy from the outcomes of a subset run.
+
+        Each example's score is the mean correctness of its items (several
+        with permutations or samples); stratum means are weighted by the
+        strata's share of the full dataset.
+
+        Args:
+            outcomes: Outcomes keyed by example id (load_outcomes(path, by='group'))
+            confidence: Confidence level of the interval
+
+        Returns:
+            Dict with the estimate, its standard error and interval, the
+            examples used, and the subset's unweighted accuracy
+        """
+        scores = _example_scores(outcomes)
+        by_stratum: Dict[str, List[float]] = {}
+        for example_id, stratum in self.stratum_of.items():
+            if example_id in scores:
+                by_stratum.setdefault(stratum, []).append(scores[example_id])
+
+        # Strata with no results keep their weight via the remaining strata
+        covered = {name: s for name, s in self.strata.items() if by_stratum.get(name)}
+        covered_size = sum(s["size"] for s in covered.values())
+        acc = variance = 0.0
+        for name, s in covered.items():
+            values = np.array(by_stratum[name])
+            weight = s["size"] / covered_size
+            n, size = len(values), s["size"]
+            sd2 = values.var(ddof=1) if n > 1 else 0.25
+            acc += weight * values.mean()
+            variance += weight ** 2 * sd2 / n * (1 - n / size)
+        se = math.sqrt(max(variance, 0.0))
+        z = NormalDist().inv_cdf((1 + confidence) / 2)
+        n_used = sum(len(v) for v in by_stratum.values())
+        return {
+            "accuracy": float(acc),
+            "se": se,
+            "ci_low": float(max(0.0, acc - z * se)),
+            "ci_high": float(min(1.0, acc + z * se)),
+            "n_examples": n_used,
+            "missing_examples": len(self.stratum_of) - n_used,
+            "missing_strata": sorted(set(self.strata) - set(covered)),
+            "unweighted_accuracy": float(np.mean([v for vs in by_stratum.values() for v in vs]))
+                                   if n_used else 0.0,
+        }
+
+
+def _example_scores(outcomes: Outcomes) -> Dict[str, float]:
+    """Mean correctness per example id (outcome keys)."""
+    keys, inverse = np.unique(outcomes.keys.astype(str), return_inverse=True)
+    hits = np.bincount(inverse, weights=outcomes.correct, minlength=len(keys))
+    counts = np.bincount(inverse, minlength=len(keys))
+    return dict(zip(keys.tolist(), (hits / counts).tolist()))
+
+
+def _history_profiles(history: Sequence[Outcomes]) -> Dict[str, Tuple[int, int]]:
+    """Per example id: (correct, total) item outcomes across all past runs."""
+    profile: Dict[str, List[int]] = {}
+    for outcomes in history:
+        for key, ok in zip(outcomes.keys.astype(str).tolist(), outcomes.correct.tolist()):
+            entry = profile.setdefault(key, [0, 0])
+            entry[0] += ok
+            entry[1] += 1
+    return {key: (c, t) for key, (c, t) in profile.items()}
+
+
+def _track_record(profile: Optional[Tuple[int, int]]) -> str:
+    if profile is None:
+        return "new"
+    correct, total = profile
+    return "always" if correct == total else "never" if correct == 0 else "mixed"
+
+
+def _allocate(sizes: Dict[str, int], sds: Dict[str, float], n: int,
+              min_per_stratum: int) -> Dict[str, int]:
+    """Neyman allocation of n items over strata, at least min_per_stratum each (if available)."""
+    alloc = {name: min(size, min_per_stratum) for name, size in sizes.items()}
+    remaining = n - sum(alloc.values())
+    # Repeatedly hand out the remaining budget proportionally to N_h * S_h,
+    # capping strata at their size and redistributing the excess
+    while remaining > 0:
+        open_strata = {h: sizes[h] * sds[h] for h in sizes if alloc[h] < sizes[h]}
+        total = sum(open_strata.values())
+        if not open_strata or total == 0:
+            break
+        given = 0
+        for h, share in sorted(open_strata.items(), key=lambda kv: -kv[1]):
+            extra = min(sizes[h] - alloc[h], max(1, round(remaining * share / total)),
+                        remaining - given)
+            alloc[h] += extra
+            given += extra
+            if given >= remaining:
+                break
+        remaining -= given
+    return alloc
+
+
+def _predicted_margin(sizes: Dict[str, int], sds: Dict[str, float], alloc: Dict[str, int],
+                      confidence: float) -> float:
+    n_total = sum(sizes.values())
+    variance = sum((sizes[h] / n_total) ** 2 * sds[h] ** 2 / alloc[h] * (1 - alloc[h] / sizes[h])
+                   for h in sizes if alloc[h])
+    return NormalDist().inv_cdf((1 + confidence) / 2) * math.sqrt(variance)
+
+
+def build_subset(dataset_path: str,
+                 size: Optional[int] = None,
+                 fraction: Optional[float] = None,
+                 margin: Optional[float] = None,
+                 strata_fields: Sequence[str] = (),
+                 history_paths: Sequence[str] = (),
+                 min_per_stratum: int = 2,
+                 confidence: float = 0.95,
+                 seed: int = 0) -> SubsetIndex:
+    """
+    Select a stratified subset of a dataset.
+
+    Exactly one of size, fraction and margin sets the subset size; with
+    margin, the smallest subset whose predicted CI half-width is at most
+    margin is chosen.
+
+    Args:
+        dataset_path: JSONL dataset
+        size: Number of examples to select
+        fraction: Share of the dataset to select
+        margin: Target CI half-width of the full-set accuracy estimate
+        strata_fields: Example fields to stratify by (e.g. 'subject')
+        history_paths: Previous results (JSONL or columnar) to stratify by track
+            record and to estimate per-stratum variability
+        min_per_stratum: Minimum examples selected per stratum
+        confidence: Confidence level for margin and predicted_margin
+        seed: Seed of the random selection within strata
+
+    Returns:
+        SubsetIndex (backtested against each history run)
+    """
+    if sum(x is not None for x in (size, fraction, margin)) != 1:
+        raise ValueError("Give exactly one of size, fraction or margin")
+
+    history = [load_outcomes(path, by="group") for path in history_paths]
+    profiles = _history_profiles(history)
+
+    members: Dict[str, List[str]] = {}
+    with IndexedJsonl(dataset_path) as dataset:
+        for example_id, example in dataset.identified():
+            parts = [f"{name}={example.get(name)}" for name in strata_fields]
+            if history:
+                parts.append(f"past={_track_record(profiles.get(example_id))}")
+            members.setdefault("|".join(parts) or "all", []).append(example_id)
+    n_examples = sum(len(ids) for ids in members.values())
+
+    sizes = {name: len(ids) for name, ids in members.items()}
+    past_acc: Dict[str, Optional[float]] = {}
+    sds: Dict[str, float] = {}
+    for name, ids in members.items():
+        known = [profiles[i] for i in ids if i in profiles]
+        if known:
+            past_acc[name] = sum(c for c, _ in known) / sum(t for _, t in known)
+            # A few past runs are weak evidence about a new model: shrink each
+            # example's record towards 1/2 (Laplace) before taking the spread
+            p = sum((c + 1) / (t + 2) for c, t in known) / len(known)
+            sds[name] = max(MIN_STRATUM_SD, math.sqrt(p * (1 - p)))
+        else:
+            past_acc[name] = None
+            sds[name] = 0.5
+
+    if margin is not None:
+        # Smallest n meeting the target, by bisection on the allocation
+        lo, hi = 1, n_examples
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if _predicted_margin(sizes, sds, _allocate(sizes, sds, mid, min_per_stratum),
+                                 confidence) <= margin:
+                hi = mid
+            else:
+                lo = mid + 1
+        n = lo
+    else:
+        n = size if size is not None else math.ceil(fraction * n_examples)
+    n = max(1, min(n, n_examples))
+    alloc = _allocate(sizes, sds, n, min_per_stratum)
+
+    rng = random.Random(seed)
+    stratum_of: Dict[str, str] = {}
+    for name in sorted(members):
+        for example_id in rng.sample(members[name], alloc[name]):
+            stratum_of[example_id] = name
+
+    index = SubsetIndex(
+        dataset=dataset_path,
+        n_examples=n_examples,
+        strata_fields=list(strata_fields),
+        strata={name: {"size": sizes[name], "sampled": alloc[name], "past_acc": past_acc[name]}
+                for name in sorted(members)},
+        stratum_of=stratum_of,
+        seed=seed,
+        predicted_margin=_predicted_margin(sizes, sds, alloc, confidence),
+    )
+    for path, outcomes in zip(history_paths, history):
+        scores = _example_scores(outcomes)
+        full = float(np.mean(list(scores.values()))) if scores else 0.0
+        est = index.estimate(outcomes, confidence)
+        index.backtest.append({"run": path, "full_accuracy": full,
+                               "subset_estimate": est["accuracy"],
+                               "error": est["accuracy"] - full})
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stratified dataset subsets")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("build", help="Select a subset and write its index")
+    build.add_argument("dataset_path", help="JSONL dataset")
+    build.add_argument("index_path", help="Output index (JSON)")
+    group = build.add_mutually_exclusive_group(required=True)
+    group.add_argument("--size", type=int, help="Number of examples to select")
+    group.add_argument("--fraction", type=float, help="Share of the dataset to select")
+    group.add_argument("--margin", type=float,
+                       help="Smallest subset whose predicted 95%% CI half-width is at most this")
+    build.add_argument("--strata", nargs="*", default=[], metavar="FIELD",
+                       help="Example fields to stratify by (e.g. subject)")
+    build.add_argument("--history", nargs="*", default=[], metavar="PATH",
+                       help="Previous results used to stratify by track record and to allocate")
+    build.add_argument("--min-per-stratum", type=int, default=2,
+                       help="Minimum examples per stratum")
+    build.add_argument("--seed", type=int, default=0, help="Selection seed")
+
+    estimate = sub.add_parser("estimate", help="Estimate full-set accuracy from subset results")
+    estimate.add_argument("index_path", help="Subset index")
+    estimate.add_argument("results_path", help="Results of a run over the subset")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        index = build_subset(args.dataset_path, size=args.size, fraction=args.fraction,
+                             margin=args.margin, strata_fields=args.strata,
+                             history_paths=args.history, min_per_stratum=args.min_per_stratum,
+                             seed=args.seed)
+        index.save(args.index_path)
+        n = len(index.stratum_of)
+        print(f"Selected {n} of {index.n_examples} examples ({n / index.n_examples:.1%}) "
+              f"in {len(index.strata)} strata; predicted 95% CI half-width "
+              f"{index.predicted_margin:.4f}")
+        for row in index.backtest:
+            print(f"  backtest {row['run']}: full {row['full_accuracy']:.4f}, "
+                  f"subset estimate {row['subset_estimate']:.4f} ({row['error']:+.4f})")
+        return 0
+
+    index = SubsetIndex.load(args.index_path)
+    est = index.estimate(load_outcomes(args.results_path, by="group"))
+    print(json.dumps(est, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
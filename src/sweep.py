@@ -0,0 +1,275 @@
+"""
+Multi-model, multi-config sweeps on one event loop.
+
+A sweep file extends a run config (configs/config.example.json) with a
+`matrix` of values to vary and a list of `benchmarks` to run; every
+combination is one cell:
+
+    {
+      "output_dir": "results/sweep",
+      "temperature": 0.2,
+      "matrix": {
+        "model": ["grok-4", "grok-3-mini"],
+        "temperature": [0.0, 0.7]
+      },
+      "benchmarks": [
+        {"benchmark": "mcq", "mode": "robust", "dataset": "data/mmlu_sample.jsonl",
+         "matrix": {"prompt_template_path": [null, "prompts/mcq_terse.txt"]}},
+        {"benchmark": "gsm8k", "mode": "baseline", "dataset": "data/gsm8k_sample.jsonl"}
+      ],
+      "model_limits": {"grok-4": 32, "grok-3-mini": 64}
+    }
+
+A benchmark entry's own matrix adds axes for that benchmark only (prompt
+templates are benchmark-specific, for instance).
+
+All cells run concurrently in streaming mode. Cells of the same model share
+that model's concurrency limit (model_limits, default --max-parallel)
+through a FairShareLimiter, so free slots go to whichever cell has the
+fewest calls in flight and no cell starves the others. With the xai
+backend, all cells make their calls on one shared ClientPool of connections
+(--connections).
+
+Each cell writes to <output_dir>/<benchmark>/<config hash>/: its config
+(config.json), results.jsonl with its aggregate and metrics sidecars. Cells
+are resumed from there, so rerunning a sweep only runs missing work, and
+cells shared between sweeps are not run twice. <output_dir>/sweep.json
+indexes the cells of the last run with their summaries.
+
+Usage:
+    python -m src.sweep configs/sweep.example.json
+    python -m src.sweep configs/sweep.example.json --dry-run
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from .aggregates import update_aggregate
+from .cache import ResponseCache
+from .config import RunConfig, config_hash
+from .offline import MockClient
+from .pool import ClientPool
+from .ratelimit import FairShareLimiter
+from .runner import EvaluationRunner, PermutationConfig, RunStats, SelfConsistencyConfig
+
+MODES = ("baseline", "robust", "self_consistency")
+# Benchmark entry keys other than the benchmark name, mode and dataset
+_MODE_OPTIONS = ("num_shuffles", "strategy", "samples", "min_samples", "confidence")
+
+
+@dataclass
+class SweepCell:
+    """One benchmark run of a sweep: a benchmark entry under one run config."""
+    benchmark: str
+    mode: str
+    dataset: str
+    config: RunConfig
+    options: Dict[str, Any]
+
+    def identity(self) -> Dict[str, Any]:
+        """Everything that determines the cell's results (hashed into its directory name)."""
+        return {"benchmark": self.benchmark, "mode": self.mode, "dataset": os.path.normpath(self.dataset),
+                "options": self.options, "config": self.config.identity()}
+
+    @property
+    def hash(self) -> str:
+        return config_hash(self.identity())
+
+    def directory(self, output_dir: str) -> str:
+        return os.path.join(output_dir, self.benchmark, self.hash)
+
+    def label(self) -> str:
+        template = os.path.basename(self.config.prompt_template_path or "default")
+        return (f"{self.benchmark}/{self.mode} {self.config.model} "
+                f"T={self.config.temperature} template={template}")
+
+
+def expand_sweep(spec: Dict[str, Any]) -> List[SweepCell]:
+    """
+    Cells of a sweep spec: every benchmark entry under every matrix combination.
+
+    Raises:
+        ValueError: On unknown config keys, benchmarks or modes
+    """
+    base = {k: v for k, v in spec.items()
+            if k not in ("output_dir", "matrix", "benchmarks", "model_limits")}
+    cells = []
+    for entry in spec.get("benchmarks") or []:
+        entry = dict(entry)
+        benchmark, dataset = entry.pop("benchmark"), entry.pop("dataset")
+        mode = entry.pop("mode", "baseline")
+        matrix = {**(spec.get("matrix") or {}), **entry.pop("matrix", {})}
+        if mode not in MODES:
+            raise ValueError(f"Unknown mode {mode!r}; expected one of {MODES}")
+        unknown = sorted(set(entry) - set(_MODE_OPTIONS))
+        if unknown:
+            raise ValueError(f"Unknown benchmark options {unknown}; expected some of {_MODE_OPTIONS}")
+        axes = sorted(matrix)
+        for values in itertools.product(*(matrix[axis] for axis in axes)):
+            config = RunConfig.from_dict({**base, **dict(zip(axes, values))})
+            config.make_benchmark(benchmark)  # Validates the name and prompt files early
+            cells.append(SweepCell(benchmark, mode, dataset, config, entry))
+    return cells
+
+
+class SweepScheduler:
+    """Runs the cells of a sweep concurrently with per-model fair-share concurrency limits."""
+
+    def __init__(self,
+                 cells: List[SweepCell],
+                 output_dir: str,
+                 model_limits: Optional[Dict[str, int]] = None,
+                 default_limit: int = 10,
+                 backend: str = "xai",
+                 cache: Optional[ResponseCache] = None,
+                 pool: Optional[ClientPool] = None):
+        """
+        Args:
+            cells: Cells to run (see expand_sweep())
+            output_dir: Root of the results tree
+            model_limits: Concurrent calls allowed per model, shared by its cells
+            default_limit: Limit for models missing from model_limits
+            backend: 'xai' for the live API, 'mock' for the simulated backend
+            cache: Response cache shared by all cells (xai backend)
+            pool: Connections shared by all cells (xai backend; default: ClientPool())
+        """
+        self.cells = cells
+        self.output_dir = output_dir
+        self.backend = backend
+        self.cache = cache
+        self.pool = (pool or ClientPool()) if backend == "xai" else None
+        model_limits = model_limits or {}
+        self.limiters = {model: FairShareLimiter(model_limits.get(model, default_limit))
+                         for model in sorted({cell.config.model for cell in cells})}
+        self.runners: Dict[str, EvaluationRunner] = {}
+
+    def _make_runner(self, cell: SweepCell) -> EvaluationRunner:
+        config = cell.config
+        if self.backend == "mock":
+            client = MockClient(model=config.model, max_tokens=config.max_output_tokens, seed=config.seed,
+                                stream=config.stream, token_budget=config.token_budget,
+                                stall_timeout=config.stall_timeout_s)
+        else:
+            client = config.make_client(self.cache, self.pool)
+        limiter = self.limiters[config.model]
+        runner = EvaluationRunner(client, max_parallel=int(limiter.limit),
+                                  limiter=limiter.share(cell.hash))
+        options = cell.options
+        if cell.mode == "robust":
+            runner.permutations = PermutationConfig(num_permutations=options.get("num_shuffles"),
+                                                    strategy=options.get("strategy", "cyclic"),
+                                                    seed=config.seed)
+        elif cell.mode == "self_consistency":
+            runner.self_consistency = SelfConsistencyConfig(max_samples=options.get("samples", 5),
+                                                            min_samples=options.get("min_samples", 3),
+                                                            confidence=options.get("confidence"))
+        return runner
+
+    async def run_cell(self, cell: SweepCell) -> RunStats:
+        """Run (or resume) one cell into its directory."""
+        directory = cell.directory(self.output_dir)
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, "config.json"), 'w', encoding='utf-8') as f:
+            json.dump(cell.identity(), f, indent=2)
+        output_path = os.path.join(directory, "results.jsonl")
+        runner = self.runners[cell.hash] = self._make_runner(cell)
+        stats = await runner.stream_benchmark(cell.config.make_benchmark(cell.benchmark), cell.dataset,
+                                              output_path, resume=os.path.exists(output_path))
+        runner.telemetry.write_json(output_path + '.metrics.json')
+        update_aggregate(output_path)
+        return stats
+
+    async def run(self) -> List[Dict[str, Any]]:
+        """
+        Run all cells concurrently and write the sweep index.
+
+        A failing cell does not stop the others; its error is reported in
+        its index entry.
+
+        Returns:
+            One index entry per cell: label, hash, path, config and summary (or error)
+        """
+        if self.pool is not None:
+            await self.pool.start()
+        try:
+            outcomes = await asyncio.gather(*(self.run_cell(cell) for cell in self.cells),
+                                            return_exceptions=True)
+        finally:
+            if self.pool is not None:
+                await self.pool.close()
+        index = []
+        for cell, outcome in zip(self.cells, outcomes):
+            output_path = os.path.join(cell.directory(self.output_dir), "results.jsonl")
+            entry = {"label": cell.label(), "hash": cell.hash, "results": output_path,
+                     **cell.identity()}
+            if isinstance(outcome, BaseException):
+                entry["error"] = f"{type(outcome).__name__}: {outcome}"
+            else:
+                entry["summary"] = update_aggregate(output_path).summary()
+            index.append(entry)
+        os.makedirs(self.output_dir, exist_ok=True)
+        with open(os.path.join(self.output_dir, "sweep.json"), 'w', encoding='utf-8') as f:
+            json.dump(index, f, indent=2)
+        return index
+
+
+def print_sweep(index: List[Dict[str, Any]]):
+    """Print one line per cell: accuracy with its CI, or the cell's error."""
+    width = max((len(entry["label"]) for entry in index), default=0)
+    for entry in index:
+        if "error" in entry:
+            print(f"{entry['label']:<{width}}  {entry['hash']}  failed: {entry['error']}")
+            continue
+        summary = entry["summary"]
+        lo, hi = summary["acc_ci"]
+        print(f"{entry['label']:<{width}}  {entry['hash']}  acc {summary['mean_acc']:.4f} "
+              f"({lo:.4f}-{hi:.4f}, n={summary['n']}, errors={summary['n_errors']})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a sweep of models, configs and benchmarks")
+    parser.add_argument("sweep", help="Sweep JSON file (see module docstring)")
+    parser.add_argument("--output-dir", default=None,
+                        help="Results tree root (default: the sweep's output_dir, else results/sweep)")
+    parser.add_argument("--max-parallel", type=int, default=10,
+                        help="Concurrent calls per model not listed in model_limits")
+    parser.add_argument("--backend", choices=["xai", "mock"], default="xai",
+                        help="Live xAI API or the simulated mock backend")
+    parser.add_argument("--cache", metavar="PATH",
+                        help="SQLite response cache shared by all cells")
+    parser.add_argument("--connections", type=int, default=2,
+                        help="API connections shared by all cells (xai backend)")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="List the cells and their result directories without running them")
+    args = parser.parse_args()
+
+    with open(args.sweep, 'r', encoding='utf-8') as f:
+        spec = json.load(f)
+    output_dir = args.output_dir or spec.get("output_dir", os.path.join("results", "sweep"))
+    cells = expand_sweep(spec)
+    if args.dry_run:
+        for cell in cells:
+            print(f"{cell.label()}  ->  {cell.directory(output_dir)}")
+        print(f"{len(cells)} cells")
+        return 0
+
+    scheduler = SweepScheduler(cells, output_dir,
+                               model_limits=spec.get("model_limits"),
+                               default_limit=args.max_parallel,
+                               backend=args.backend,
+                               cache=ResponseCache(args.cache) if args.cache else None,
+                               pool=ClientPool(connections=args.connections) if args.backend == "xai" else None)
+    print(f"Running {len(cells)} cells over {len(scheduler.limiters)} models into {output_dir}")
+    index = asyncio.run(scheduler.run())
+    print_sweep(index)
+    print(f"Index written to {os.path.join(output_dir, 'sweep.json')}")
+    return 1 if any("error" in entry for entry in index) else 0
+
+
+if __name__ == "__main__":
+    exit(main())
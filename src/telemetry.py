@@ -0,0 +1,404 @@
+"""
+Token, latency and cost accounting for evaluation runs.
+
+RunTelemetry aggregates per-call usage (prompt, completion, cached and
+reasoning tokens, latency, cache/coalescing status) into run-level metrics:
+throughput in tokens/sec, latency percentiles, time to first token and
+inter-token latency of streamed calls, truncated generations, response-cache
+and provider prompt-cache hit ratios, and dollar cost. It exports a JSON summary and a
+Prometheus text exposition.
+
+Latencies go into a fixed log-scale histogram rather than a list, so memory
+stays constant on arbitrarily long runs and telemetry from separate runs or
+shards can be merged exactly.
+"""
+
+import json
+import math
+import os
+import time
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, List, Optional
+
+# Default prices in USD per million tokens, as published by xAI.
+# Keys are model-name prefixes; the longest matching prefix wins.
+# Override for any model via XAI_PRICE_INPUT / XAI_PRICE_CACHED_INPUT / XAI_PRICE_OUTPUT.
+DEFAULT_PRICING: Dict[str, Dict[str, float]] = {
+    "grok-4-fast": {"input": 0.20, "cached_input": 0.05, "output": 0.50},
+    "grok-4": {"input": 3.00, "cached_input": 0.75, "output": 15.00},
+    "grok-3-mini": {"input": 0.30, "cached_input": 0.075, "output": 0.50},
+    "grok-3": {"input": 3.00, "cached_input": 0.75, "output": 15.00},
+}
+
+
+def pricing_for(model: Optional[str]) -> Optional[Dict[str, float]]:
+    """
+    Look up per-million-token prices for a model.
+
+    Environment overrides take precedence; otherwise the longest matching
+    prefix in DEFAULT_PRICING is used.
+
+    Returns:
+        Dict with 'input', 'cached_input' and 'output' prices, or None if unknown
+    """
+    if os.getenv("XAI_PRICE_INPUT") and os.getenv("XAI_PRICE_OUTPUT"):
+        price_input = float(os.environ["XAI_PRICE_INPUT"])
+        return {
+            "input": price_input,
+            "cached_input": float(os.getenv("XAI_PRICE_CACHED_INPUT", price_input)),
+            "output": float(os.environ["XAI_PRICE_OUTPUT"]),
+        }
+    if not model:
+        return None
+    matches = [prefix for prefix in DEFAULT_PRICING if model.startswith(prefix)]
+    return DEFAULT_PRICING[max(matches, key=len)] if matches else None
+
+
+@dataclass
+class CallUsage:
+    """Usage and timing of a single model call."""
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0          # Prompt tokens served from the provider's prompt cache
+    reasoning_tokens: int = 0
+    latency_s: float = 0.0
+    from_cache: bool = False        # Served by the local response cache (no API call)
+    coalesced: bool = False         # Answered by an identical in-flight call (no API call)
+    ttft_s: Optional[float] = None          # Time to first token (streamed calls)
+    inter_token_s: Optional[float] = None   # Mean gap between streamed chunks
+    truncated: bool = False         # Stopped at max_tokens or aborted at the token budget
+
+    @property
+    def billed(self) -> bool:
+        """Whether this call reached the API and was paid for."""
+        return not (self.from_cache or self.coalesced)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class LatencyHistogram:
+    """
+    Mergeable log-scale latency histogram.
+
+    Bucket upper bounds grow geometrically from 1 ms by `growth` per bucket,
+    so percentiles are accurate to within one bucket width (~10% by default).
+    """
+
+    def __init__(self, min_s: float = 0.001, max_s: float = 3600.0, growth: float = 1.1):
+        self.bounds: List[float] = []
+        bound = min_s
+        while bound < max_s:
+            self.bounds.append(bound)
+            bound *= growth
+        self.bounds.append(math.inf)
+        self.counts = [0] * len(self.bounds)
+        self.count = 0
+        self.total = 0.0
+        self._log_min = math.log(min_s)
+        self._log_growth = math.log(growth)
+
+    def observe(self, value: float):
+        """Record one latency in seconds."""
+        if value <= self.bounds[0]:
+            index = 0
+        else:
+            index = min(len(self.bounds) - 1,
+                        math.ceil((math.log(value) - self._log_min) / self._log_growth))
+            # Guard against floating point landing one bucket low
+            while self.bounds[index] < value:
+                index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+
+    def percentile(self, q: float) -> float:
+        """Approximate q-th percentile (0-100), as the upper bound of its bucket."""
+        if self.count == 0:
+            return 0.0
+        rank = q / 100.0 * self.count
+        seen = 0
+        for bound, n in zip(self.bounds, self.counts):
+            seen += n
+            if seen >= rank and n:
+                return bound if math.isfinite(bound) else self.bounds[-2]
+        return self.bounds[-2]
+
+    def merge(self, other: 'LatencyHistogram'):
+        """Add another histogram with the same bucket layout into this one."""
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.total += other.total
+
+
+def _percentiles(hist: LatencyHistogram) -> Dict[str, float]:
+    return {
+        "mean": hist.total / hist.count if hist.count else 0.0,
+        "p50": hist.percentile(50),
+        "p95": hist.percentile(95),
+        "p99": hist.percentile(99),
+    }
+
+
+def _histogram_state(name: str, hist: LatencyHistogram) -> Dict[str, Any]:
+    return {f"{name}_buckets": {str(i): n for i, n in enumerate(hist.counts) if n},
+            f"{name}_total": hist.total}
+
+
+class RunTelemetry:
+    """
+    Aggregated usage, latency and cost metrics for one run.
+
+    The runner calls record_call() for every model call and record_item()
+    for every finished item; summary(), write_json() and to_prometheus()
+    report the totals.
+    """
+
+    def __init__(self, model: Optional[str] = None):
+        """
+        Args:
+            model: Model name used to look up pricing
+        """
+        self.model = model
+        self.calls = 0              # All calls made by the runner
+        self.billed_calls = 0       # Calls that reached the API
+        self.cache_hits = 0         # Served by the local response cache
+        self.coalesced = 0          # Shared an identical in-flight call
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cached_tokens = 0
+        self.reasoning_tokens = 0
+        self.items = 0
+        self.item_errors: Dict[str, int] = {}
+        self.truncated = 0          # Generations cut off at max_tokens or the token budget
+        self.latency = LatencyHistogram()
+        self.ttft = LatencyHistogram()          # Streamed calls only
+        self.inter_token = LatencyHistogram()   # Mean chunk gap per streamed call
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def start(self):
+        """Mark the start of the measured wall-clock window (first call wins)."""
+        if self.started_at is None:
+            self.started_at = time.time()
+
+    def stop(self):
+        """Mark the end of the measured wall-clock window."""
+        self.finished_at = time.time()
+
+    def record_call(self, usage: CallUsage):
+        """Add one call's usage."""
+        self.calls += 1
+        if usage.from_cache:
+            self.cache_hits += 1
+        elif usage.coalesced:
+            self.coalesced += 1
+        else:
+            self.billed_calls += 1
+            self.latency.observe(usage.latency_s)
+            if usage.ttft_s is not None:
+                self.ttft.observe(usage.ttft_s)
+            if usage.inter_token_s is not None:
+                self.inter_token.observe(usage.inter_token_s)
+        self.truncated += int(usage.truncated)
+        self.prompt_tokens += usage.prompt_tokens
+        self.completion_tokens += usage.completion_tokens
+        self.cached_tokens += usage.cached_tokens
+        self.reasoning_tokens += usage.reasoning_tokens
+
+    def record_item(self, metadata: Dict[str, Any]):
+        """Count a finished item and classify its error, if any."""
+        self.items += 1
+        if 'error' in metadata:
+            error_class = metadata.get('error_class', 'fatal')
+            self.item_errors[error_class] = self.item_errors.get(error_class, 0) + 1
+
+    def elapsed(self) -> float:
+        """Seconds between start() and stop() (or now, while running)."""
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+    def cost_usd(self) -> Optional[float]:
+        """
+        Dollar cost of billed tokens, or None if the model has no known pricing.
+
+        Cached prompt tokens are charged at the cached-input rate, the rest of
+        the prompt at the input rate; reasoning tokens are billed as output
+        (the API reports them on top of completion tokens).
+        """
+        prices = pricing_for(self.model)
+        if prices is None:
+            return None
+        uncached = max(0, self.prompt_tokens - self.cached_tokens)
+        output = self.completion_tokens + self.reasoning_tokens
+        return (uncached * prices["input"]
+                + self.cached_tokens * prices["cached_input"]
+                + output * prices["output"]) / 1e6
+
+    def summary(self) -> Dict[str, Any]:
+        """JSON-serializable summary of the run."""
+        elapsed = self.elapsed()
+        tokens = self.prompt_tokens + self.completion_tokens + self.reasoning_tokens
+        return {
+            "model": self.model,
+            "elapsed_s": elapsed,
+            "items": self.items,
+            "items_per_s": self.items / elapsed if elapsed else 0.0,
+            "item_errors": dict(self.item_errors),
+            "calls": self.calls,
+            "billed_calls": self.billed_calls,
+            "response_cache_hits": self.cache_hits,
+            "response_cache_hit_ratio": self.cache_hits / self.calls if self.calls else 0.0,
+            "coalesced_calls": self.coalesced,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cached_prompt_tokens": self.cached_tokens,
+            "reasoning_tokens": self.reasoning_tokens,
+            "prompt_cache_ratio": self.cached_tokens / self.prompt_tokens if self.prompt_tokens else 0.0,
+            "tokens_per_s": tokens / elapsed if elapsed else 0.0,
+            "latency_s": _percentiles(self.latency),
+            "ttft_s": _percentiles(self.ttft),
+            "inter_token_s": _percentiles(self.inter_token),
+            "truncated_calls": self.truncated,
+            "cost_usd": self.cost_usd(),
+        }
+
+    def state(self) -> Dict[str, Any]:
+        """Raw counters and histogram buckets, sufficient to merge runs exactly."""
+        return {
+            "model": self.model,
+            "calls": self.calls,
+            "billed_calls": self.billed_calls,
+            "cache_hits": self.cache_hits,
+            "coalesced": self.coalesced,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cached_tokens": self.cached_tokens,
+            "reasoning_tokens": self.reasoning_tokens,
+            "items": self.items,
+            "item_errors": dict(self.item_errors),
+            "truncated": self.truncated,
+            **_histogram_state("latency", self.latency),
+            **_histogram_state("ttft", self.ttft),
+            **_histogram_state("inter_token", self.inter_token),
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> 'RunTelemetry':
+        """Rebuild telemetry from state()."""
+        telemetry = cls(model=state.get("model"))
+        for name in ("calls", "billed_calls", "cache_hits", "coalesced", "prompt_tokens",
+                     "completion_tokens", "cached_tokens", "reasoning_tokens", "items", "truncated"):
+            setattr(telemetry, name, state.get(name, 0))
+        telemetry.item_errors = dict(state.get("item_errors", {}))
+        for name in ("latency", "ttft", "inter_token"):
+            histogram = getattr(telemetry, name)
+            for index, n in state.get(f"{name}_buckets", {}).items():
+                histogram.counts[int(index)] = n
+            histogram.count = sum(histogram.counts)
+            histogram.total = state.get(f"{name}_total", 0.0)
+        telemetry.started_at = state.get("started_at")
+        telemetry.finished_at = state.get("finished_at")
+        return telemetry
+
+    def merge(self, other: 'RunTelemetry'):
+        """
+        Add another run's telemetry (e.g. a parallel shard) into this one.
+
+        The measured window becomes the span from the earliest start to the
+        latest finish, so throughput reflects the combined wall-clock time.
+        """
+        for name in ("calls", "billed_calls", "cache_hits", "coalesced", "prompt_tokens",
+                     "completion_tokens", "cached_tokens", "reasoning_tokens", "items", "truncated"):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        for error_class, count in other.item_errors.items():
+            self.item_errors[error_class] = self.item_errors.get(error_class, 0) + count
+        self.latency.merge(other.latency)
+        self.ttft.merge(other.ttft)
+        self.inter_token.merge(other.inter_token)
+        starts = [t for t in (self.started_at, other.started_at) if t is not None]
+        finishes = [t for t in (self.finished_at, other.finished_at) if t is not None]
+        self.started_at = min(starts) if starts else None
+        self.finished_at = max(finishes) if finishes else None
+        self.model = self.model or other.model
+
+    def write_json(self, path: str):
+        """Write summary() as pretty-printed JSON, with the raw state needed to merge runs."""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({**self.summary(), "state": self.state()}, f, indent=2)
+            f.write('\n')
+
+    @classmethod
+    def read_json(cls, path: str) -> 'RunTelemetry':
+        """Load telemetry written by write_json()."""
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_state(json.load(f)["state"])
+
+    def to_prometheus(self, prefix: str = "grok_eval") -> str:
+        """
+        Render metrics in the Prometheus text exposition format.
+
+        Counters cover calls, tokens, items, errors and truncations; latency
+        (and, for streamed calls, time to first token and inter-token latency)
+        is exported as a histogram (non-empty buckets only, plus +Inf) with
+        _sum and _count.
+        """
+        model = self.model or "unknown"
+        label = f'{{model="{model}"}}'
+        lines = []
+
+        def metric(name: str, kind: str, help_text: str, value: Any, labels: str = label):
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+            lines.append(f"{prefix}_{name}{labels} {value}")
+
+        metric("calls_total", "counter", "Model calls made by the runner", self.calls)
+        metric("billed_calls_total", "counter", "Calls that reached the API", self.billed_calls)
+        metric("response_cache_hits_total", "counter", "Calls served by the local response cache",
+               self.cache_hits)
+        metric("coalesced_calls_total", "counter", "Calls answered by an identical in-flight call",
+               self.coalesced)
+        for kind, value in [("prompt", self.prompt_tokens), ("completion", self.completion_tokens),
+                            ("cached_prompt", self.cached_tokens), ("reasoning", self.reasoning_tokens)]:
+            metric(f"{kind}_tokens_total", "counter", f"{kind.replace('_', ' ').capitalize()} tokens",
+                   value)
+        metric("items_total", "counter", "Finished evaluation items", self.items)
+        metric("truncated_calls_total", "counter",
+               "Generations cut off at max_tokens or the token budget", self.truncated)
+
+        lines.append(f"# HELP {prefix}_item_errors_total Failed items by error class")
+        lines.append(f"# TYPE {prefix}_item_errors_total counter")
+        for error_class, count in sorted(self.item_errors.items()):
+            lines.append(f'{prefix}_item_errors_total{{model="{model}",class="{error_class}"}} {count}')
+
+        cost = self.cost_usd()
+        if cost is not None:
+            metric("cost_usd_total", "counter", "Estimated spend in USD", f"{cost:.6f}")
+
+        def histogram(name: str, help_text: str, hist: LatencyHistogram):
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} histogram")
+            cumulative = 0
+            for bound, n in zip(hist.bounds, hist.counts):
+                cumulative += n
+                if n == 0 and math.isfinite(bound):
+                    continue
+                le = "+Inf" if not math.isfinite(bound) else f"{bound:.6g}"
+                lines.append(f'{prefix}_{name}_bucket{{model="{model}",le="{le}"}} {cumulative}')
+            lines.append(f"{prefix}_{name}_sum{label} {hist.total:.6f}")
+            lines.append(f"{prefix}_{name}_count{label} {hist.count}")
+
+        histogram("call_latency_seconds", "Latency of billed calls", self.latency)
+        if self.ttft.count:
+            histogram("time_to_first_token_seconds", "Time to first token of streamed calls", self.ttft)
+            histogram("inter_token_latency_seconds", "Mean gap between streamed chunks, per call",
+                      self.inter_token)
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str):
+        """Write to_prometheus() output to a file (e.g. for node_exporter's textfile collector)."""
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.to_prometheus())
@@ -0,0 +1,97 @@
+"""BatchRunner end to end against the in-process LocalBatchServer and the mock backend."""
+
+import asyncio
+import json
+
+from src.batch import COMPLETED, BatchRunner, FileBatchBackend, LocalBatchServer
+from src.benchmarks.mcq import MCQBenchmark
+from src.checkpoint import iter_checkpoint_rows
+from src.offline import LatencyModel, MockClient
+
+
+def write_dataset(path, n):
+    """MCQ dataset of n questions with ids q0..q{n-1}."""
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(n):
+            f.write(json.dumps({"id": f"q{i}", "question": f"Question {i}?",
+                                "options": ["a", "b", "c", "d"], "answer_idx": i % 4}) + "\n")
+    return str(path)
+
+
+def run_with_server(runner, backend, coro):
+    """Run `coro` while a LocalBatchServer with a MockClient fulfils the runner's jobs."""
+    client = MockClient(latency=LatencyModel("constant", 0.001), seed=1)
+    server = LocalBatchServer(backend, client, max_parallel=8)
+
+    async def main():
+        serve_task = asyncio.create_task(server.serve_forever(poll_interval=0.01))
+        try:
+            return await coro
+        finally:
+            serve_task.cancel()
+
+    return asyncio.run(main())
+
+
+def test_batch_run_evaluates_every_item(tmp_path):
+    dataset = write_dataset(tmp_path / "mcq.jsonl", 7)
+    backend = FileBatchBackend(str(tmp_path / "jobs"))
+    runner = BatchRunner(backend, batch_size=3, poll_interval=0.01)
+
+    results = run_with_server(runner, backend,
+                              runner.run_benchmark(MCQBenchmark(), dataset, str(tmp_path / "out.jsonl")))
+
+    assert sorted(item.item_id for item in results.items) == sorted(f"q{i}" for i in range(7))
+    assert all(item.parsed_response is not None and item.evaluation is not None
+               for item in results.items)
+    # 7 items in jobs of at most 3
+    assert len(backend.list_jobs(COMPLETED)) == 3
+    assert len(list(iter_checkpoint_rows(str(tmp_path / "out.jsonl")))) == 7
+
+
+def test_batch_runner_forwards_runner_options(tmp_path):
+    dataset = write_dataset(tmp_path / "mcq.jsonl", 10)
+    backend = FileBatchBackend(str(tmp_path / "jobs"))
+    runner = BatchRunner(backend, batch_size=4, poll_interval=0.01,
+                         dedupe_prompts=True, example_ids=["q1", "q2", "q5"])
+    assert runner.dedupe_prompts
+    assert runner.example_ids == {"q1", "q2", "q5"}
+
+    results = run_with_server(runner, backend, runner.run_benchmark(MCQBenchmark(), dataset))
+
+    assert sorted(item.item_id for item in results.items) == ["q1", "q2", "q5"]
+
+
+def test_batch_resume_skips_completed_items(tmp_path):
+    dataset = write_dataset(tmp_path / "mcq.jsonl", 5)
+    output = str(tmp_path / "out.jsonl")
+    backend = FileBatchBackend(str(tmp_path / "jobs"))
+    runner = BatchRunner(backend, batch_size=2, poll_interval=0.01, example_ids=["q0", "q1"])
+    run_with_server(runner, backend, runner.run_benchmark(MCQBenchmark(), dataset, output))
+
+    runner = BatchRunner(backend, batch_size=2, poll_interval=0.01)
+    results = run_with_server(runner, backend,
+                              runner.run_benchmark(MCQBenchmark(), dataset, output, resume=True))
+
+    assert sorted(item.item_id for item in results.items) == [f"q{i}" for i in range(5)]
+    # The resumed run submitted only q2..q4: one job for q0, q1 and two more
+    assert len(backend.list_jobs(COMPLETED)) == 3
+
+
+def test_competing_workers_run_each_job_once(tmp_path):
+    backend = FileBatchBackend(str(tmp_path / "jobs"))
+    request = {"prompt": "Question?", "system_prompt": None,
+               "response_model": "src.benchmarks.mcq:MCQResponse"}
+    clients = [MockClient(latency=LatencyModel("constant", 0.001), seed=i) for i in range(2)]
+    servers = [LocalBatchServer(backend, client) for client in clients]
+
+    async def main():
+        for job in range(4):
+            await backend.submit([dict(request, custom_id=f"{job}-{i}") for i in range(3)])
+        return await asyncio.gather(*(server.process_pending() for server in servers))
+
+    ran = asyncio.run(main())
+
+    assert sum(ran) == 4
+    assert sum(client.calls for client in clients) == 12
+    assert len(backend.list_jobs(COMPLETED)) == 4
@@ -0,0 +1,85 @@
+"""ResponseCache bounds, LRU order and in-memory totals."""
+
+import pytest
+
+from src.cache import CacheMissError, ResponseCache
+
+
+def db_totals(cache):
+    return cache._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+
+
+def test_entry_bound_evicts_least_recently_used(tmp_path):
+    cache = ResponseCache(str(tmp_path / "c.sqlite"), max_entries=3)
+    for key in "abc":
+        cache.put(key, key * 10)
+    # A hit on 'a' is only buffered, but the next write must still see it
+    assert cache.get("a") == "a" * 10
+    cache.put("d", "d" * 10)
+
+    assert cache.get("b") is None
+    assert all(cache.get(key) is not None for key in "acd")
+    assert cache.evictions == 1
+    assert (cache._entries, cache._bytes) == db_totals(cache) == (3, 30)
+
+
+def test_byte_bound_and_replaced_entries(tmp_path):
+    cache = ResponseCache(str(tmp_path / "c.sqlite"), max_bytes=100)
+    cache.put("a", "x" * 40)
+    cache.put("a", "x" * 20)   # Replacing an entry counts only its new size
+    cache.put("b", "x" * 40)
+    assert (cache._entries, cache._bytes) == db_totals(cache) == (2, 60)
+
+    cache.put("c", "x" * 50)
+    assert cache.get("a") is None
+    assert (cache._entries, cache._bytes) == db_totals(cache) == (2, 90)
+
+
+def test_totals_are_counted_on_open(tmp_path):
+    path = str(tmp_path / "c.sqlite")
+    cache = ResponseCache(path)
+    for i in range(5):
+        cache.put(str(i), "v" * i)
+    cache.close()
+
+    reopened = ResponseCache(path, max_entries=4)
+    assert (reopened._entries, reopened._bytes) == (5, 10)
+    reopened.put("5", "v")
+    assert len(reopened) == 4
+
+
+def test_hits_are_written_in_batches(tmp_path):
+    cache = ResponseCache(str(tmp_path / "c.sqlite"))
+    cache.put("a", "1")
+    (before,) = cache._conn.execute("SELECT last_access FROM responses").fetchone()
+    cache.get("a")
+    assert cache._conn.execute("SELECT last_access FROM responses").fetchone() == (before,)
+    cache.flush()
+    (after,) = cache._conn.execute("SELECT last_access FROM responses").fetchone()
+    assert after >= before and not cache._touched
+    assert cache.stats()["hits"] == 1
+
+
+def test_replay_mode_raises_on_miss(tmp_path):
+    path = str(tmp_path / "c.sqlite")
+    ResponseCache(path).close()
+    with pytest.raises(CacheMissError):
+        ResponseCache(path, read_only=True).get("missing")
+
+
+def test_replay_from_a_read_only_file_leaves_it_untouched(tmp_path):
+    path = tmp_path / "c.sqlite"
+    cache = ResponseCache(str(path))
+    cache.put("a", "1")
+    cache.close()
+    path.chmod(0o444)
+    before = sorted(p.name for p in tmp_path.iterdir()), path.read_bytes()
+
+    replay = ResponseCache(str(path), read_only=True)
+    assert replay.get("a") == "1"
+    with pytest.raises(CacheMissError):
+        replay.get("b")
+    assert replay.stats()["entries"] == 1
+    replay.close()
+
+    assert (sorted(p.name for p in tmp_path.iterdir()), path.read_bytes()) == before
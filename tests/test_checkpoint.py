@@ -0,0 +1,57 @@
+"""Compaction of checkpoint files on resume."""
+
+import asyncio
+import json
+
+from src.benchmarks.mcq import MCQBenchmark
+from src.checkpoint import iter_checkpoint_rows, prepare_resume
+from src.offline import LatencyModel, MockClient
+from src.runner import EvaluationRunner
+
+
+def row(item_id, answer=None, error=None):
+    metadata = {"error": error} if error else {}
+    return json.dumps({"item_id": item_id, "parsed_response": answer, "metadata": metadata})
+
+
+def test_prepare_resume_keeps_latest_successful_rows(tmp_path):
+    path = tmp_path / "results.jsonl"
+    path.write_text("\n".join([
+        row("a", answer="old"),
+        row("b", error="503"),
+        row("a", answer="new"),
+        row("c", answer="x"),
+        row("c", error="429"),   # A later failure means c is rerun
+        row("d", error="503"),
+        row("d", answer="ok"),   # A later success supersedes the failure
+    ]) + "\n" + '{"item_id": "e", "pars')  # Torn trailing line
+
+    kept = list(prepare_resume(str(path)))
+
+    assert [(r["item_id"], r["parsed_response"]) for r in kept] == [("a", "new"), ("d", "ok")]
+    # The file itself was compacted, so appends continue from a clean state
+    assert list(iter_checkpoint_rows(str(path))) == kept
+    assert path.read_text().endswith("\n")
+
+
+def test_prepare_resume_of_missing_file(tmp_path):
+    assert list(prepare_resume(str(tmp_path / "missing.jsonl"))) == []
+    assert not (tmp_path / "missing.jsonl").exists()
+
+
+def test_run_results_file_is_the_checkpoint(tmp_path):
+    dataset = tmp_path / "mcq.jsonl"
+    dataset.write_text("".join(json.dumps({"id": f"q{i}", "question": "?", "options": ["a", "b"],
+                                           "answer_idx": 0}) + "\n" for i in range(6)))
+    output = str(tmp_path / "out.jsonl")
+
+    def run(**kwargs):
+        runner = EvaluationRunner(MockClient(latency=LatencyModel("constant", 0.001)), **kwargs)
+        return asyncio.run(runner.run_benchmark(MCQBenchmark(), str(dataset), output, resume=True))
+
+    run(example_ids=["q0", "q1", "q2"])
+    results = run()
+
+    assert len(results.items) == 6
+    ids = [row["item_id"] for row in iter_checkpoint_rows(output)]
+    assert sorted(ids) == [f"q{i}" for i in range(6)]
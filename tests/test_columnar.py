@@ -0,0 +1,38 @@
+"""Columnar results read back for analysis."""
+
+import json
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from src.aggregates import update_aggregate
+from src.columnar import iter_rows, jsonl_to_columnar
+
+
+def result_row(i, error=None):
+    metadata = {"usage": {"prompt_tokens": 10, "completion_tokens": 2, "cached_tokens": 4,
+                          "calls": 1, "billed_calls": 1},
+                "samples_used": 3}
+    if error:
+        metadata.update(error=error, error_class="transient")
+    return {"item_id": f"q{i}", "group_id": f"q{i}", "example": {"answer_idx": 1},
+            "prompt": "p", "metadata": metadata,
+            "parsed_response": None if error else {"answer": "B"},
+            "evaluation": None if error else True}
+
+
+def test_columnar_rows_keep_metadata_and_aggregates_match(tmp_path):
+    jsonl = tmp_path / "results.jsonl"
+    jsonl.write_text("".join(json.dumps(result_row(i, error="503" if i == 3 else None)) + "\n"
+                             for i in range(5)))
+    columnar = jsonl_to_columnar(str(jsonl))
+
+    rows = {row["item_id"]: row for row in iter_rows(columnar)}
+    assert rows["q0"]["metadata"]["usage"]["prompt_tokens"] == 10
+    assert rows["q0"]["metadata"]["samples_used"] == 3
+    assert rows["q3"]["metadata"]["error_class"] == "transient"
+
+    summary = update_aggregate(str(jsonl)).summary()
+    assert update_aggregate(columnar).summary() == summary
+    assert update_aggregate(str(jsonl)).cached_prompt_tokens == 4 * 5
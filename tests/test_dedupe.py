@@ -0,0 +1,87 @@
+"""Prompt dedupe pre-pass in the runner and single-flight coalescing in GrokClient."""
+
+import asyncio
+
+from src.api import GrokClient
+from src.benchmarks.mcq import MCQBenchmark, MCQResponse
+from src.offline import LatencyModel, MockClient
+from src.runner import EvaluationRunner
+from src.telemetry import CallUsage
+
+
+def examples(n_prompts, copies):
+    """`copies` examples per distinct question, with distinct ids and gold answers."""
+    return [{"id": f"q{p}-{c}", "question": f"Question {p}?", "options": ["a", "b", "c", "d"],
+             "answer_idx": c % 4}
+            for p in range(n_prompts) for c in range(copies)]
+
+
+async def collect(runner, rows, stop=None, max_in_flight=None):
+    return [item async for item in runner.iter_results(MCQBenchmark(), rows, stop=stop,
+                                                        max_in_flight=max_in_flight)]
+
+
+def test_duplicates_share_the_primary_answer():
+    client = MockClient(latency=LatencyModel("constant", 0.001))
+    runner = EvaluationRunner(client, dedupe_prompts=True)
+
+    items = asyncio.run(collect(runner, examples(2, 3)))
+
+    assert client.calls == 2 and runner.calls_saved == 4
+    assert len(items) == 6
+    by_prompt = {}
+    for item in items:
+        by_prompt.setdefault(item.prompt, set()).add(item.parsed_response.answer)
+    assert all(len(answers) == 1 for answers in by_prompt.values())
+    duplicates = [item for item in items if 'duplicate_of' in item.metadata]
+    assert len(duplicates) == 4
+    # Each copy is graded against its own gold answer
+    for item in items:
+        gold = "ABCD"[item.example["answer_idx"]]
+        assert item.evaluation == (item.parsed_response.answer == gold)
+
+
+def test_early_stop_drops_duplicates_of_unstarted_primaries():
+    client = MockClient(latency=LatencyModel("constant", 0.001))
+    runner = EvaluationRunner(client, dedupe_prompts=True)
+    stop = asyncio.Event()
+
+    async def run():
+        items = []
+        async for item in runner.iter_results(MCQBenchmark(), examples(6, 3), stop=stop,
+                                              max_in_flight=1):
+            items.append(item)
+            stop.set()
+        return items
+
+    items = asyncio.run(run())
+
+    assert client.calls < 6
+    # Every primary that ran came back with all of its duplicates; no duplicate is left parked
+    assert len(items) == 3 * client.calls
+    assert runner.calls_saved == 2 * client.calls
+    assert runner._duplicates == {}
+
+
+def test_concurrent_identical_calls_are_coalesced():
+    client = GrokClient(pool=object())
+    calls = []
+
+    async def sample(key, prompt, response_model, system_prompt):
+        calls.append(prompt)
+        await asyncio.sleep(0.01)
+        return response_model(answer="A"), CallUsage(prompt_tokens=10)
+
+    client._sample_structured = sample
+
+    async def main():
+        same = [client.complete_structured_with_usage("same", MCQResponse) for _ in range(5)]
+        other = client.complete_structured_with_usage("other", MCQResponse)
+        return await asyncio.gather(*same, other)
+
+    results = asyncio.run(main())
+
+    assert sorted(calls) == ["other", "same"]
+    assert client.coalesced_calls == 4
+    assert sum(usage.coalesced for _, usage in results) == 4
+    assert all(response.answer == "A" for response, _ in results)
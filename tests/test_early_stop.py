@@ -0,0 +1,57 @@
+"""Early stopping on the Wilson interval of the running accuracy."""
+
+import asyncio
+import json
+
+from src.benchmarks.mcq import MCQBenchmark
+from src.datasets.indexed import IndexedJsonl
+from src.offline import LatencyModel, MockClient
+from src.runner import EarlyStopConfig, EvaluationRunner
+
+
+def test_stops_once_the_interval_is_narrow_enough():
+    config = EarlyStopConfig(margin=0.05, min_items=100, check_every=50)
+    # At 50% accuracy the 95% Wilson half-width is about 0.052 at n=350 and 0.049 at n=400
+    assert config.should_stop(175, 350) is None
+    reason = config.should_stop(200, 400)
+    assert reason is not None and "within +/-0.05" in reason
+
+
+def test_no_checks_before_min_items_or_between_checks():
+    config = EarlyStopConfig(margin=0.5, min_items=100, check_every=50)
+    assert config.should_stop(99, 99) is None
+    assert config.should_stop(120, 120) is None     # Not a check point
+    assert config.should_stop(150, 150) is not None
+
+
+def test_stops_once_clearly_above_the_baseline():
+    config = EarlyStopConfig(baseline=0.5, min_items=100, check_every=50)
+    assert config.should_stop(55, 100) is None
+    assert "above baseline" in config.should_stop(180, 200)
+
+
+def test_processing_order_depends_only_on_the_seed(tmp_path):
+    examples = [{"id": f"q{i}"} for i in range(50)]
+    order = [e["id"] for e in EarlyStopConfig(seed=3).order(examples)]
+    assert order == [e["id"] for e in EarlyStopConfig(seed=3).order(examples)]
+    assert order != [e["id"] for e in EarlyStopConfig(seed=4).order(examples)]
+    assert sorted(order) == sorted(e["id"] for e in examples)
+
+    path = tmp_path / "d.jsonl"
+    path.write_text("".join(json.dumps(e) + "\n" for e in examples))
+    with IndexedJsonl(str(path), cache_dir=None) as dataset:
+        assert EarlyStopConfig(seed=3).order(dataset).ids == order
+
+
+def test_run_stops_before_the_end_of_the_dataset(tmp_path):
+    path = tmp_path / "mcq.jsonl"
+    path.write_text("".join(json.dumps({"id": f"q{i}", "question": f"Question {i}?",
+                                        "options": ["a", "b", "c", "d"], "answer_idx": i % 4}) + "\n"
+                            for i in range(2000)))
+    runner = EvaluationRunner(MockClient(latency=LatencyModel("constant", 0.0005)), max_parallel=8,
+                              early_stop=EarlyStopConfig(margin=0.1, min_items=50, check_every=25))
+
+    results = asyncio.run(runner.run_benchmark(MCQBenchmark(), str(path)))
+
+    assert 50 <= len(results.items) < 200
+    assert runner.progress.stop_reason is not None
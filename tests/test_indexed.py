@@ -0,0 +1,55 @@
+"""Indexed JSONL datasets and their on-disk index cache."""
+
+import json
+import os
+
+import numpy as np
+import pytest
+
+from src.datasets.indexed import DatasetFormatError, IndexedJsonl, load_index
+
+
+def write_jsonl(path, rows):
+    path.write_text("".join(json.dumps(r) + "\n" for r in rows))
+    return str(path)
+
+
+def test_examples_are_parsed_lazily_by_position_and_id(tmp_path):
+    path = write_jsonl(tmp_path / "d.jsonl", [{"id": f"e{i}", "x": i} for i in range(5)])
+    with IndexedJsonl(path, cache_dir=str(tmp_path / "cache")) as dataset:
+        assert len(dataset) == 5
+        assert dataset.ids == [f"e{i}" for i in range(5)]
+        assert dataset[3] == {"id": "e3", "x": 3}
+        assert dataset.get("e1")["x"] == 1
+        assert [row["x"] for row in dataset.take([4, 0])] == [4, 0]
+    # Leaving the block released the map
+    assert dataset._mm is None
+
+
+def test_index_cache_is_plain_arrays_and_json(tmp_path):
+    path = write_jsonl(tmp_path / "d.jsonl", [{"id": f"e{i}"} for i in range(3)])
+    cache_dir = str(tmp_path / "cache")
+    index = load_index(path, cache_dir=cache_dir)
+
+    (cache_file,) = os.listdir(cache_dir)
+    with np.load(os.path.join(cache_dir, cache_file), allow_pickle=False) as data:
+        assert json.loads(data["meta"].tobytes())["ids"] == ["e0", "e1", "e2"]
+
+    cached = load_index(path, cache_dir=cache_dir)
+    assert cached["ids"] == index["ids"]
+    assert list(cached["starts"]) == list(index["starts"])
+
+
+def test_changed_file_is_reindexed(tmp_path):
+    path = write_jsonl(tmp_path / "d.jsonl", [{"id": "a"}])
+    cache_dir = str(tmp_path / "cache")
+    load_index(path, cache_dir=cache_dir)
+    write_jsonl(tmp_path / "d.jsonl", [{"id": "a"}, {"id": "bb"}])
+    assert load_index(path, cache_dir=cache_dir)["ids"] == ["a", "bb"]
+
+
+def test_malformed_line_names_the_line(tmp_path):
+    path = tmp_path / "d.jsonl"
+    path.write_text('{"id": "a"}\n{"id": \n')
+    with pytest.raises(DatasetFormatError, match="line 2"):
+        load_index(str(path), cache_dir=None)
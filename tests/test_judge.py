@@ -0,0 +1,75 @@
+"""Routing of Benchmark.judge() calls to the evaluation stage running evaluate()."""
+
+import asyncio
+
+import pytest
+from pydantic import BaseModel
+
+from src.benchmark import Benchmark
+from src.judge import EvaluationStage
+from src.runner import EvaluationItem
+
+
+class Answer(BaseModel):
+    answer: str
+
+
+class Verdict(BaseModel):
+    correct: bool
+
+
+class JudgeClient:
+    """Judge client that records its calls and approves every answer."""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def complete_structured(self, prompt, response_model, system_prompt=None):
+        self.calls += 1
+        await asyncio.sleep(0.001)
+        return response_model(correct=True)
+
+
+class JudgedBenchmark(Benchmark[Answer, bool]):
+    uses_judge = True
+
+    def load_dataset(self, path):
+        return []
+
+    def format_prompt(self, example):
+        return example["question"]
+
+    def response_schema(self):
+        return Answer
+
+    async def evaluate(self, response, example):
+        verdict = await self.judge(f"Is {response.answer} right?", Verdict)
+        return verdict.correct
+
+    @property
+    def name(self):
+        return "judged"
+
+
+def make_item(i):
+    return EvaluationItem(item_id=f"q{i}", group_id=None, example={"question": f"q{i}"},
+                          prompt=f"q{i}", parsed_response=Answer(answer="a"), evaluation=None,
+                          metadata={})
+
+
+def test_concurrent_stages_sharing_a_benchmark_use_their_own_judge():
+    benchmark = JudgedBenchmark()
+    clients = [JudgeClient(), JudgeClient()]
+    stages = [EvaluationStage(judge_client=client) for client in clients]
+
+    async def main():
+        # Interleave both stages' evaluate() calls on the same benchmark instance
+        await asyncio.gather(*(stages[i % 2].evaluate(benchmark, make_item(i)) for i in range(10)))
+
+    asyncio.run(main())
+    assert [client.calls for client in clients] == [5, 5]
+
+
+def test_judge_outside_an_evaluation_stage_raises():
+    with pytest.raises(RuntimeError):
+        asyncio.run(JudgedBenchmark().judge("prompt", Verdict))
@@ -0,0 +1,41 @@
+"""Streaming limits of the mock backend."""
+
+import asyncio
+
+import pytest
+from pydantic import BaseModel
+
+from src.api import GenerationAborted
+from src.offline import LatencyModel, MockClient
+
+
+class Answer(BaseModel):
+    reasoning: str
+    answer: str
+
+
+def call(client):
+    return asyncio.run(client.complete_structured_with_usage("prompt", Answer))
+
+
+def test_generations_over_the_token_budget_are_aborted_at_the_budget():
+    client = MockClient(latency=LatencyModel("constant", 0.001), stream=True, token_budget=2)
+    with pytest.raises(GenerationAborted) as aborted:
+        call(client)
+    assert aborted.value.error_class == "truncated"
+    assert aborted.value.usage.completion_tokens == 2
+    assert aborted.value.usage.truncated
+
+
+def test_calls_without_a_first_token_before_the_stall_timeout_stall():
+    client = MockClient(latency=LatencyModel("constant", 1.0), stream=True, stall_timeout=0.01)
+    with pytest.raises(GenerationAborted) as aborted:
+        call(client)
+    assert aborted.value.error_class == "transient"
+    assert client.stalled == 1
+
+
+def test_limits_apply_only_when_streaming():
+    client = MockClient(latency=LatencyModel("constant", 0.05), token_budget=2, stall_timeout=0.01)
+    response, usage = call(client)
+    assert usage.completion_tokens > 2
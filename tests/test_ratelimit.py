@@ -0,0 +1,96 @@
+"""Error classification for retries."""
+
+import asyncio
+import time
+
+import pytest
+
+from src.offline import MockAPIError
+from src.ratelimit import (FATAL, RATE_LIMIT, TRANSIENT, AdaptiveConcurrencyLimiter, RateBudget,
+                           classify_error)
+
+
+@pytest.mark.parametrize("message", [
+    "status 429",
+    "HTTP/1.1 429 Too Many Requests",
+    "Too many requests, slow down",
+    "Rate limit exceeded for model grok-4",
+    "RESOURCE_EXHAUSTED: quota",
+])
+def test_rate_limit_messages(message):
+    assert classify_error(RuntimeError(message)) == RATE_LIMIT
+
+
+@pytest.mark.parametrize("message", [
+    "Expected 4 options, got 429",
+    "item 14290 failed validation",
+    "answer 1429 is not an option",
+])
+def test_messages_merely_containing_429_are_not_rate_limits(message):
+    assert classify_error(ValueError(message)) == FATAL
+
+
+def test_status_codes():
+    assert classify_error(MockAPIError("whatever", 429)) == RATE_LIMIT
+    assert classify_error(MockAPIError("whatever", 503)) == TRANSIENT
+    assert classify_error(asyncio.TimeoutError()) == TRANSIENT
+
+
+def test_aimd_increases_additively_and_decreases_multiplicatively():
+    async def main():
+        limiter = AdaptiveConcurrencyLimiter(initial=4, max_limit=6, backoff=0.5, cooldown=60)
+        for _ in range(4):
+            limiter.on_success(0.1)          # +1/limit per success: about +1 per window
+        assert int(limiter.limit) == 4 and limiter.limit > 4.9
+        limiter.on_success(0.1)
+        assert int(limiter.limit) == 5
+        before = limiter.limit
+        limiter.on_error(RATE_LIMIT)
+        assert limiter.limit == pytest.approx(before * 0.5) and limiter.decreases == 1
+        limiter.on_error(RATE_LIMIT)         # Within the cooldown: counted once
+        limiter.on_error(TRANSIENT)          # Not congestion
+        assert limiter.decreases == 1
+        for _ in range(100):
+            limiter.on_success(0.1)
+        assert limiter.limit == 6            # Capped at max_limit
+        await asyncio.sleep(0)               # Let the wake-up tasks run
+
+    asyncio.run(main())
+
+
+def test_slow_calls_count_as_congestion():
+    limiter = AdaptiveConcurrencyLimiter(initial=8, latency_target=1.0, cooldown=0)
+    limiter.on_success(2.0)
+    assert limiter.limit == 4
+
+
+def test_raised_limit_wakes_waiters():
+    async def main():
+        limiter = AdaptiveConcurrencyLimiter(initial=1, max_limit=4)
+        await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0.01)
+        assert not waiter.done()
+        limiter.on_success(0.1)              # limit 1 -> 2: a second slot opens
+        await asyncio.wait_for(waiter, 1.0)
+        assert limiter.in_flight == 2 and not limiter._wake_tasks
+
+    asyncio.run(main())
+
+
+def test_rate_budget_reserves_and_reconciles_tokens():
+    async def main():
+        budget = RateBudget(rpm=600, tpm=6000)
+        await budget.acquire(estimated_tokens=1000)
+        assert budget.requests.tokens == pytest.approx(599, abs=0.1)
+        assert budget.tokens.tokens == pytest.approx(5000, abs=1)
+        budget.reconcile(estimated_tokens=1000, actual_tokens=400)
+        assert budget.tokens.tokens == pytest.approx(5600, abs=1)
+
+        # The bucket is nearly empty: the next acquire waits for the refill (100 tokens/s)
+        budget.tokens.take(budget.tokens.tokens)
+        start = time.monotonic()
+        await budget.acquire(estimated_tokens=10)
+        assert time.monotonic() - start >= 0.05
+
+    asyncio.run(main())
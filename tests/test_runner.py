@@ -0,0 +1,25 @@
+"""Runner configuration validation."""
+
+import argparse
+
+import pytest
+
+from src.run_eval import positive_int
+from src.runner import PermutationConfig
+
+
+@pytest.mark.parametrize("num_permutations", [0, -2])
+def test_permutation_count_must_be_positive(num_permutations):
+    with pytest.raises(ValueError):
+        PermutationConfig(num_permutations=num_permutations)
+
+
+def test_default_and_positive_permutation_counts():
+    assert PermutationConfig().num_permutations is None
+    assert PermutationConfig(num_permutations=3).num_permutations == 3
+
+
+def test_positive_int_argument_type():
+    assert positive_int("4") == 4
+    with pytest.raises(argparse.ArgumentTypeError):
+        positive_int("0")
@@ -0,0 +1,76 @@
+"""Wave-based self-consistency voting."""
+
+import asyncio
+
+from src.benchmarks.mcq import MCQBenchmark
+from src.offline import LatencyModel, MockClient
+from src.runner import EvaluationRunner, SelfConsistencyConfig
+from src.telemetry import CallUsage
+
+EXAMPLE = {"id": "q0", "question": "Question?", "options": ["a", "b", "c", "d"], "answer_idx": 0}
+
+
+class ScriptedClient(MockClient):
+    """MockClient answering sample i with script[i]; an exception in the script is raised."""
+
+    def __init__(self, script):
+        super().__init__(latency=LatencyModel("constant", 0.001))
+        self.script = script
+        self.samples = []
+
+    async def complete_structured_with_usage(self, prompt, response_model, system_prompt=None,
+                                             sample_index=0):
+        self.samples.append(sample_index)
+        await self._call(prompt, system_prompt)
+        answer = self.script[sample_index]
+        if isinstance(answer, Exception):
+            raise answer
+        return response_model(answer=answer), CallUsage(prompt_tokens=10, completion_tokens=1)
+
+
+def vote(script, **config):
+    client = ScriptedClient(script)
+    runner = EvaluationRunner(client, self_consistency=SelfConsistencyConfig(**config))
+
+    async def run():
+        return [item async for item in runner.iter_results(MCQBenchmark(), [EXAMPLE])]
+
+    (item,) = asyncio.run(run())
+    return item, client
+
+
+def test_stops_once_the_leader_cannot_be_overtaken():
+    # First wave is a bare majority of 5; three agreeing samples decide the vote
+    item, client = vote(["A", "A", "A", "B", "B"], max_samples=5)
+    assert sorted(client.samples) == [0, 1, 2]
+    assert item.metadata["samples_used"] == 3 and item.metadata["early_stopped"]
+    assert item.parsed_response.answer == "A"
+
+
+def test_contested_vote_draws_the_smallest_deciding_wave():
+    # A:2 B:1 after the first wave; one more A makes A unbeatable with one sample left
+    item, client = vote(["A", "B", "A", "A", "B"], max_samples=5)
+    assert sorted(client.samples) == [0, 1, 2, 3]
+    assert item.metadata["votes"] == {"A": 3, "B": 1}
+
+
+def test_confidence_threshold_stops_early():
+    # 2/3 < 0.7 after min_samples; one more A gives 3/4 >= 0.7
+    item, client = vote(["A", "A", "B", "A"] + ["B"] * 6, max_samples=10, min_samples=3,
+                        confidence=0.7)
+    assert item.metadata["samples_used"] == 4
+    assert item.metadata["vote_share"] == 0.75
+
+
+def test_failed_samples_do_not_vote():
+    item, client = vote([ValueError("bad sample"), "B", "B", "B", "A"], max_samples=5)
+    assert item.metadata["samples_used"] == 4
+    assert item.metadata["samples_failed"] == 1
+    assert item.metadata["vote_share"] == 1.0
+    assert item.parsed_response.answer == "B"
+
+
+def test_all_samples_failing_records_the_error():
+    item, client = vote([ValueError("bad sample")] * 5, max_samples=5)
+    assert item.parsed_response is None
+    assert "bad sample" in item.metadata["error"]
@@ -0,0 +1,40 @@
+"""Merging shard results once every shard has finished."""
+
+import asyncio
+import json
+
+import pytest
+
+from src.benchmarks.mcq import MCQBenchmark
+from src.offline import LatencyModel, MockClient
+from src.runner import EvaluationRunner
+from src.sharding import incomplete_shards, mark_shard_done, merge_shards, shard_path
+
+
+def run_shard(dataset, output_path, index, num_shards):
+    client = MockClient(latency=LatencyModel("constant", 0.001), seed=1)
+    runner = EvaluationRunner(client, num_shards=num_shards, shard_index=index)
+    path = shard_path(output_path, index, num_shards)
+    asyncio.run(runner.run_benchmark(MCQBenchmark(), dataset, path))
+    return path
+
+
+def test_merge_waits_for_every_completion_marker(tmp_path):
+    dataset = tmp_path / "mcq.jsonl"
+    dataset.write_text("".join(json.dumps({"id": f"q{i}", "question": "?", "options": ["a", "b"],
+                                           "answer_idx": 0}) + "\n" for i in range(12)))
+    output = str(tmp_path / "results.jsonl")
+    paths = [run_shard(str(dataset), output, i, 3) for i in range(3)]
+
+    # Every results file exists, but none of the shards has said it finished
+    assert incomplete_shards(output, 3) == [0, 1, 2]
+    mark_shard_done(paths[0])
+    mark_shard_done(paths[2])
+    with pytest.raises(RuntimeError, match=r"\[1\]"):
+        merge_shards(output, 3)
+
+    mark_shard_done(paths[1])
+    stats = merge_shards(output, 3)
+    assert stats.n_items == 12
+    with open(output, encoding="utf-8") as f:
+        assert sorted(json.loads(line)["item_id"] for line in f) == sorted(f"q{i}" for i in range(12))
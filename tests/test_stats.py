@@ -0,0 +1,29 @@
+"""Vectorized metrics and paired comparisons."""
+
+import numpy as np
+
+from src.stats import Outcomes, align, mcnemar_test
+
+
+def outcomes(ids, correct):
+    return Outcomes(item_ids=np.array(ids, dtype=object), correct=np.array(correct, dtype=bool),
+                    keys=np.array(ids, dtype=object))
+
+
+def test_align_pairs_items_by_id():
+    a = outcomes(["q3", "q1", "q2"], [True, False, True])
+    b = outcomes(["q1", "q2", "q4"], [True, True, False])
+    left, right = align(a, b)
+    # Common ids q1, q2
+    assert left.tolist() == [False, True]
+    assert right.tolist() == [True, True]
+
+
+def test_align_uses_the_last_row_of_a_repeated_id():
+    # q1 failed, then an appended rerun got it right; q2 was also rerun in b
+    a = outcomes(["q1", "q2", "q1"], [False, True, True])
+    b = outcomes(["q2", "q1", "q2"], [True, True, False])
+    left, right = align(a, b)
+    assert left.tolist() == [True, True]
+    assert right.tolist() == [True, False]
+    assert mcnemar_test(left, right)["b10"] == 1
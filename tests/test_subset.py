@@ -0,0 +1,101 @@
+"""Stratified subsets: allocation, reweighted estimates and backtests."""
+
+import json
+import math
+
+import numpy as np
+import pytest
+
+from src.stats import Outcomes
+from src.subset import SubsetIndex, _allocate, build_subset
+
+
+def outcomes(scores):
+    ids = list(scores)
+    return Outcomes(item_ids=np.array(ids, dtype=object),
+                    correct=np.array([scores[i] for i in ids], dtype=bool),
+                    keys=np.array(ids, dtype=object))
+
+
+def index(stratum_of, sizes):
+    sampled = {}
+    for stratum in stratum_of.values():
+        sampled[stratum] = sampled.get(stratum, 0) + 1
+    return SubsetIndex(dataset="data.jsonl", n_examples=sum(sizes.values()), strata_fields=[],
+                       strata={name: {"size": size, "sampled": sampled.get(name, 0), "past_acc": None}
+                               for name, size in sizes.items()},
+                       stratum_of=stratum_of, seed=0, predicted_margin=0.0)
+
+
+def test_allocation_spends_the_budget_proportionally_to_size_times_sd():
+    sizes = {"a": 100, "b": 100, "c": 50}
+    sds = {"a": 0.5, "b": 0.1, "c": 0.5}
+    alloc = _allocate(sizes, sds, 40, min_per_stratum=2)
+    assert sum(alloc.values()) == 40
+    assert all(alloc[h] >= 2 for h in sizes)
+    # N_h * S_h is 50 : 10 : 25
+    assert alloc["a"] > alloc["c"] > alloc["b"]
+
+
+def test_allocation_caps_strata_at_their_size():
+    alloc = _allocate({"small": 3, "large": 100}, {"small": 0.5, "large": 0.5}, 50,
+                      min_per_stratum=5)
+    assert alloc == {"small": 3, "large": 47}
+    assert _allocate({"a": 4, "b": 6}, {"a": 0.5, "b": 0.1}, 20, min_per_stratum=2) == {"a": 4, "b": 6}
+
+
+def test_estimate_is_the_stratified_mean_with_finite_population_correction():
+    idx = index({"a1": "A", "a2": "A", "b1": "B", "b2": "B", "b3": "B"}, {"A": 10, "B": 30})
+    est = idx.estimate(outcomes({"a1": True, "a2": False, "b1": True, "b2": True, "b3": False}))
+
+    # Weights 1/4 and 3/4; sample variances 1/2 and 1/3
+    assert est["accuracy"] == pytest.approx(0.25 * 0.5 + 0.75 * 2 / 3)
+    variance = 0.25 ** 2 * 0.5 / 2 * (1 - 2 / 10) + 0.75 ** 2 * (1 / 3) / 3 * (1 - 3 / 30)
+    assert est["se"] == pytest.approx(math.sqrt(variance))
+    assert est["ci_low"] < est["accuracy"] < est["ci_high"]
+    assert est["unweighted_accuracy"] == pytest.approx(3 / 5)
+    assert est["n_examples"] == 5 and est["missing_examples"] == 0
+    assert est["missing_strata"] == []
+
+
+def test_estimate_renormalizes_over_strata_with_results():
+    idx = index({"a1": "A", "a2": "A", "b1": "B", "c1": "C", "c2": "C"},
+                {"A": 10, "B": 30, "C": 10})
+    est = idx.estimate(outcomes({"a1": True, "a2": False, "c1": True, "c2": True}))
+    # B has no results: A and C share the weight half and half
+    assert est["accuracy"] == pytest.approx(0.5 * 0.5 + 0.5 * 1.0)
+    assert est["missing_strata"] == ["B"]
+    assert est["missing_examples"] == 1
+    assert est["n_examples"] == 4
+
+
+def test_build_subset_backtests_against_history(tmp_path):
+    dataset = tmp_path / "data.jsonl"
+    subjects = ["math"] * 20 + ["law"] * 20
+    dataset.write_text("".join(json.dumps({"question": f"q{i}", "subject": s}) + "\n"
+                               for i, s in enumerate(subjects)))
+    history = tmp_path / "past.jsonl"
+    with open(history, "w") as f:
+        for i, s in enumerate(subjects):
+            ok = s == "math" or i % 4 == 0
+            f.write(json.dumps({"item_id": f"item_{i}", "group_id": f"item_{i}",
+                                "evaluation": ok}) + "\n")
+
+    idx = build_subset(str(dataset), size=12, strata_fields=["subject"],
+                       history_paths=[str(history)], min_per_stratum=2)
+    assert len(idx.stratum_of) == 12
+    assert sum(s["sampled"] for s in idx.strata.values()) == 12
+    assert sum(s["size"] for s in idx.strata.values()) == 40
+    assert sorted(idx.strata) == ["subject=law|past=always", "subject=law|past=never",
+                                  "subject=math|past=always"]
+    assert all(s["sampled"] >= 2 for s in idx.strata.values())
+    assert idx.strata["subject=law|past=always"]["past_acc"] == 1.0
+
+    [backtest] = idx.backtest
+    assert backtest["full_accuracy"] == pytest.approx((20 + 5) / 40)
+    assert backtest["error"] == pytest.approx(backtest["subset_estimate"] - backtest["full_accuracy"])
+    # 'always'/'never' strata are homogeneous, so the reweighted estimate is exact
+    assert backtest["error"] == pytest.approx(0.0)
+
+    full = build_subset(str(dataset), fraction=1.0, strata_fields=["subject"])
+    assert len(full.stratum_of) == 40